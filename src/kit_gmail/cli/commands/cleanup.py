@@ -39,19 +39,18 @@ def organize(
             task = progress.add_task("Organizing emails...", total=None)
             
             # Get recent emails for organization
-            messages = gmail_manager.get_messages(query="", max_results=batch_size)
-            progress.update(task, description=f"Processing {len(messages)} emails...")
+            message_ids = gmail_manager.get_message_ids(query="", max_results=batch_size)
+            progress.update(task, description=f"Processing {len(message_ids)} emails...")
             
-            message_details = gmail_manager.batch_get_messages([m["id"] for m in messages])
+            message_details = gmail_manager.batch_get_messages(message_ids)
             
             organized_count = 0
             categories = {"receipts": 0, "mailing_lists": 0, "critical": 0, "junk": 0}
+            processed_emails = []
             
             for message in message_details:
                 processed_email = gmail_manager.processor.process_email(message)
-                
-                if not dry_run:
-                    gmail_manager.organize_message(message, processed_email)
+                processed_emails.append(processed_email)
                 
                 # Count categories
                 if processed_email.is_receipt:
@@ -64,6 +63,9 @@ def organize(
                     categories["junk"] += 1
                 
                 organized_count += 1
+            
+            if not dry_run:
+                gmail_manager.organize_messages(processed_emails)
         
         # Show results
         result_table = Table(title="Organization Results")
@@ -121,17 +123,17 @@ def delete_old(
             
             # Get old emails
             query = f"older_than:{days}d"
-            old_messages = gmail_manager.get_messages(query=query, max_results=1000)
+            old_message_ids = gmail_manager.get_message_ids(query=query, max_results=1000)
             
-            progress.update(task, description=f"Analyzing {len(old_messages)} old emails...")
+            progress.update(task, description=f"Analyzing {len(old_message_ids)} old emails...")
             
-            if not old_messages:
+            if not old_message_ids:
                 console.print("[green]No old emails found to delete.[/green]")
                 return
             
-            message_details = gmail_manager.batch_get_messages([m["id"] for m in old_messages])
+            message_details = gmail_manager.batch_get_messages(old_message_ids)
             
-            delete_count = 0
+            to_delete = []
             categories = {"junk": 0, "old_promotional": 0, "other": 0}
             
             for message in message_details:
@@ -145,10 +147,7 @@ def delete_old(
                 )
                 
                 if should_delete:
-                    if not dry_run:
-                        gmail_manager.delete_message(message["id"])
-                    
-                    delete_count += 1
+                    to_delete.append(message["id"])
                     
                     if processed_email.is_junk:
                         categories["junk"] += 1
@@ -156,6 +155,10 @@ def delete_old(
                         categories["old_promotional"] += 1
                     else:
                         categories["other"] += 1
+            
+            delete_count = len(to_delete)
+            if not dry_run and to_delete:
+                gmail_manager.batch_delete_messages(to_delete)
         
         # Show results
         result_table = Table(title="Deletion Results")
@@ -202,8 +205,11 @@ def remove_duplicates(
             task = progress.add_task("Finding duplicate emails...", total=None)
             
             # Get recent emails to check for duplicates
-            messages = gmail_manager.get_messages(query="", max_results=500)
-            message_details = gmail_manager.batch_get_messages([m["id"] for m in messages])
+            message_ids = gmail_manager.get_message_ids(query="", max_results=500)
+            # Grouping only needs subject, sender and date
+            message_details = gmail_manager.batch_get_messages(
+                message_ids, full=False
+            )
             
             progress.update(task, description="Analyzing for duplicates...")
             
@@ -233,8 +239,7 @@ def remove_duplicates(
             delete_count = len(duplicates)
             
             if not dry_run and delete_count > 0:
-                for message, _ in duplicates:
-                    gmail_manager.delete_message(message["id"])
+                gmail_manager.batch_delete_messages([message["id"] for message, _ in duplicates])
         
         # Show results
         console.print(f"[bold]Found {len(email_groups)} unique email groups[/bold]")
@@ -280,18 +285,19 @@ def archive_old(
             
             # Get old emails in inbox
             query = f"in:inbox older_than:{days}d"
-            old_messages = gmail_manager.get_messages(query=query, max_results=1000)
+            old_message_ids = gmail_manager.get_message_ids(query=query, max_results=1000)
             
-            if not old_messages:
+            if not old_message_ids:
                 console.print("[green]No old emails found in inbox to archive.[/green]")
                 return
             
-            progress.update(task, description=f"Processing {len(old_messages)} emails...")
+            progress.update(task, description=f"Processing {len(old_message_ids)} emails...")
             
-            message_details = gmail_manager.batch_get_messages([m["id"] for m in old_messages])
+            message_details = gmail_manager.batch_get_messages(old_message_ids)
             
             archive_count = 0
             kept_important = 0
+            to_archive = []
             
             for message in message_details:
                 processed_email = gmail_manager.processor.process_email(message)
@@ -302,9 +308,11 @@ def archive_old(
                     kept_important += 1
                 
                 if should_archive:
-                    if not dry_run:
-                        gmail_manager.archive_message(message["id"])
+                    to_archive.append(message["id"])
                     archive_count += 1
+            
+            if not dry_run and to_archive:
+                gmail_manager.archive_messages(to_archive)
         
         # Show results
         result_table = Table(title="Archive Results")
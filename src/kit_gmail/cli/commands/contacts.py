@@ -122,10 +122,10 @@ def analyze(
                 
                 # Get recent emails
                 task = progress.add_task("Fetching emails...", total=None)
-                messages = gmail_manager.get_messages(query="", max_results=max_emails)
+                message_ids = gmail_manager.get_message_ids(query="", max_results=max_emails)
                 
-                progress.update(task, description=f"Processing {len(messages)} emails...")
-                message_details = gmail_manager.batch_get_messages([m["id"] for m in messages])
+                progress.update(task, description=f"Processing {len(message_ids)} emails...")
+                message_details = gmail_manager.batch_get_messages(message_ids)
                 
                 # Process emails for contacts
                 processed_emails = []
@@ -5,8 +5,9 @@ from typing import Optional
 
 import typer
 from rich.console import Console
+from rich.live import Live
 from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn
+from rich.spinner import Spinner
 
 from ...core import GmailManager
 from ...services import AIService
@@ -18,45 +19,77 @@ console = Console()
 app = typer.Typer(help="AI-powered email summarization")
 
 
-@app.command()
-def daily(
-    days: int = typer.Option(1, "--days", "-d", help="Number of days to summarize"),
-    provider: Optional[str] = typer.Option(None, "--provider", "-p", help="AI provider: anthropic, openai, xai"),
+async def _summary_impl(
+    days: int,
+    summary_type: str,
+    header: str,
+    title: str,
+    border_style: str,
+    provider: Optional[str],
+    save: Optional[str] = None,
 ) -> None:
-    """Generate a daily email summary."""
+    """Generate, display and optionally save an email summary."""
+    console.print(f"\n[bold blue]📧 {header}[/bold blue]\n")
     
-    async def _daily_summary():
-        console.print(f"\n[bold blue]📧 Daily Email Summary - Last {days} Day(s)[/bold blue]\n")
+    try:
+        gmail_manager = GmailManager()
         
-        try:
-            gmail_manager = GmailManager()
+        def render(text: str) -> Panel:
+            return Panel(text, title=f"📅 {title}", border_style=border_style, width=100)
+        
+        # Show the spinner until the first tokens arrive, then the growing summary
+        chunks = []
+        with Live(
+            Spinner("dots", text=f"[bold green]Generating {summary_type} summary..."),
+            console=console,
+        ) as live:
+            def show_chunk(text: str) -> None:
+                chunks.append(text)
+                live.update(render("".join(chunks)))
             
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                console=console,
-            ) as progress:
-                
-                task = progress.add_task("Generating daily summary...", total=None)
-                
-                summary = await gmail_manager.generate_email_summary(
-                    days=days,
-                    summary_type="daily",
-                    provider_name=provider
-                )
+            summary = await gmail_manager.generate_email_summary(
+                days=days,
+                summary_type=summary_type,
+                provider_name=provider,
+                stream_callback=show_chunk
+            )
+            live.update(render(summary))
+        
+        # Save to file if requested
+        if save:
+            from pathlib import Path
+            from datetime import datetime
             
-            console.print(Panel(
-                summary,
-                title=f"📅 Daily Email Summary ({days} day{'s' if days > 1 else ''})",
-                border_style="blue",
-                width=100
-            ))
+            output_path = Path(save)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
             
-        except Exception as e:
-            console.print(f"\n[red]Error generating daily summary: {str(e)}[/red]")
-            logger.error(f"Daily summary failed: {e}")
-    
-    asyncio.run(_daily_summary())
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(f"# {title}\n")
+                f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+                f.write(f"Provider: {provider or 'default'}\n\n")
+                f.write(summary)
+            
+            console.print(f"\n[bold green]✅ Summary saved to {output_path}[/bold green]")
+        
+    except Exception as e:
+        console.print(f"\n[red]Error generating {summary_type} summary: {str(e)}[/red]")
+        logger.error(f"{summary_type.title()} summary failed: {e}")
+
+
+@app.command()
+def daily(
+    days: int = typer.Option(1, "--days", "-d", help="Number of days to summarize"),
+    provider: Optional[str] = typer.Option(None, "--provider", "-p", help="AI provider: anthropic, openai, xai"),
+) -> None:
+    """Generate a daily email summary."""
+    asyncio.run(_summary_impl(
+        days,
+        "daily",
+        f"Daily Email Summary - Last {days} Day(s)",
+        f"Daily Email Summary ({days} day{'s' if days > 1 else ''})",
+        "blue",
+        provider,
+    ))
 
 
 @app.command()
@@ -65,40 +98,14 @@ def weekly(
     provider: Optional[str] = typer.Option(None, "--provider", "-p", help="AI provider: anthropic, openai, xai"),
 ) -> None:
     """Generate a weekly email summary."""
-    
-    async def _weekly_summary():
-        days = weeks * 7
-        console.print(f"\n[bold blue]📧 Weekly Email Summary - Last {weeks} Week(s)[/bold blue]\n")
-        
-        try:
-            gmail_manager = GmailManager()
-            
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                console=console,
-            ) as progress:
-                
-                task = progress.add_task("Generating weekly summary...", total=None)
-                
-                summary = await gmail_manager.generate_email_summary(
-                    days=days,
-                    summary_type="weekly",
-                    provider_name=provider
-                )
-            
-            console.print(Panel(
-                summary,
-                title=f"📅 Weekly Email Summary ({weeks} week{'s' if weeks > 1 else ''})",
-                border_style="green",
-                width=100
-            ))
-            
-        except Exception as e:
-            console.print(f"\n[red]Error generating weekly summary: {str(e)}[/red]")
-            logger.error(f"Weekly summary failed: {e}")
-    
-    asyncio.run(_weekly_summary())
+    asyncio.run(_summary_impl(
+        weeks * 7,
+        "weekly",
+        f"Weekly Email Summary - Last {weeks} Week(s)",
+        f"Weekly Email Summary ({weeks} week{'s' if weeks > 1 else ''})",
+        "green",
+        provider,
+    ))
 
 
 @app.command()
@@ -107,40 +114,14 @@ def monthly(
     provider: Optional[str] = typer.Option(None, "--provider", "-p", help="AI provider: anthropic, openai, xai"),
 ) -> None:
     """Generate a monthly email summary."""
-    
-    async def _monthly_summary():
-        days = months * 30  # Approximate
-        console.print(f"\n[bold blue]📧 Monthly Email Summary - Last {months} Month(s)[/bold blue]\n")
-        
-        try:
-            gmail_manager = GmailManager()
-            
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                console=console,
-            ) as progress:
-                
-                task = progress.add_task("Generating monthly summary...", total=None)
-                
-                summary = await gmail_manager.generate_email_summary(
-                    days=days,
-                    summary_type="monthly",
-                    provider_name=provider
-                )
-            
-            console.print(Panel(
-                summary,
-                title=f"📅 Monthly Email Summary ({months} month{'s' if months > 1 else ''})",
-                border_style="magenta",
-                width=100
-            ))
-            
-        except Exception as e:
-            console.print(f"\n[red]Error generating monthly summary: {str(e)}[/red]")
-            logger.error(f"Monthly summary failed: {e}")
-    
-    asyncio.run(_monthly_summary())
+    asyncio.run(_summary_impl(
+        months * 30,  # Approximate
+        "monthly",
+        f"Monthly Email Summary - Last {months} Month(s)",
+        f"Monthly Email Summary ({months} month{'s' if months > 1 else ''})",
+        "magenta",
+        provider,
+    ))
 
 
 @app.command()
@@ -151,55 +132,15 @@ def custom(
     save: Optional[str] = typer.Option(None, "--save", "-s", help="Save summary to file"),
 ) -> None:
     """Generate a custom email summary for specific time period."""
-    
-    async def _custom_summary():
-        console.print(f"\n[bold blue]📧 Custom Email Summary - Last {days} Days[/bold blue]\n")
-        
-        try:
-            gmail_manager = GmailManager()
-            
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                console=console,
-            ) as progress:
-                
-                task = progress.add_task("Generating custom summary...", total=None)
-                
-                summary = await gmail_manager.generate_email_summary(
-                    days=days,
-                    summary_type=summary_type,
-                    provider_name=provider
-                )
-            
-            console.print(Panel(
-                summary,
-                title=f"📅 {summary_type.title()} Email Summary ({days} days)",
-                border_style="cyan",
-                width=100
-            ))
-            
-            # Save to file if requested
-            if save:
-                from pathlib import Path
-                from datetime import datetime
-                
-                output_path = Path(save)
-                output_path.parent.mkdir(parents=True, exist_ok=True)
-                
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    f.write(f"# {summary_type.title()} Email Summary ({days} days)\n")
-                    f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    f.write(f"Provider: {provider or 'default'}\n\n")
-                    f.write(summary)
-                
-                console.print(f"\n[bold green]✅ Summary saved to {output_path}[/bold green]")
-            
-        except Exception as e:
-            console.print(f"\n[red]Error generating custom summary: {str(e)}[/red]")
-            logger.error(f"Custom summary failed: {e}")
-    
-    asyncio.run(_custom_summary())
+    asyncio.run(_summary_impl(
+        days,
+        summary_type,
+        f"Custom Email Summary - Last {days} Days",
+        f"{summary_type.title()} Email Summary ({days} days)",
+        "cyan",
+        provider,
+        save=save,
+    ))
 
 
 @app.command()
@@ -217,17 +158,10 @@ def insights(
             gmail_manager = GmailManager()
             ai_service = AIService()
             
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                console=console,
-            ) as progress:
-                
-                task = progress.add_task("Analyzing email patterns...", total=None)
-                
+            with console.status("[bold green]Analyzing email patterns...", spinner="dots") as status:
                 # Get recent emails
-                messages = gmail_manager.get_messages(query=f"newer_than:{days}d", max_results=200)
-                message_details = gmail_manager.batch_get_messages([m["id"] for m in messages])
+                message_ids = gmail_manager.get_message_ids(query=f"newer_than:{days}d", max_results=200)
+                message_details = gmail_manager.batch_get_messages(message_ids)
                 
                 # Process emails
                 processed_emails = []
@@ -235,7 +169,7 @@ def insights(
                     processed_email = gmail_manager.processor.process_email(message)
                     processed_emails.append(processed_email)
                 
-                progress.update(task, description="Generating insights...")
+                status.update("[bold green]Generating insights...")
                 
                 insights_data = await ai_service.get_email_insights(
                     processed_emails,
@@ -277,17 +211,10 @@ def analyze_batch(
             gmail_manager = GmailManager()
             ai_service = AIService()
             
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                console=console,
-            ) as progress:
-                
-                task = progress.add_task("Fetching emails for analysis...", total=None)
-                
+            with console.status("[bold green]Fetching emails for analysis...", spinner="dots") as status:
                 # Get recent emails
-                messages = gmail_manager.get_messages(query="", max_results=max_emails)
-                message_details = gmail_manager.batch_get_messages([m["id"] for m in messages])
+                message_ids = gmail_manager.get_message_ids(query="", max_results=max_emails)
+                message_details = gmail_manager.batch_get_messages(message_ids)
                 
                 # Process emails
                 processed_emails = []
@@ -295,7 +222,7 @@ def analyze_batch(
                     processed_email = gmail_manager.processor.process_email(message)
                     processed_emails.append(processed_email)
                 
-                progress.update(task, description=f"Analyzing {len(processed_emails)} emails...")
+                status.update(f"[bold green]Analyzing {len(processed_emails)} emails...")
                 
                 # Analyze with AI
                 analysis_results = await ai_service.analyze_batch_emails(
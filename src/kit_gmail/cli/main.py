@@ -1,6 +1,7 @@
 """Main CLI application entry point."""
 
 import asyncio
+import shlex
 from pathlib import Path
 from typing import Optional
 
@@ -8,6 +9,8 @@ import typer
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
+from rich.live import Live
+from rich.spinner import Spinner
 from rich import print as rprint
 
 from ..core import GmailManager
@@ -15,15 +18,11 @@ from ..services import ContactManager, AIService
 from ..utils import settings, get_logger, setup_logging
 from .commands import auth, cleanup, contacts, summarize, config
 
-# Set up logging
-setup_logging(
-    level=settings.log_level,
-    log_file=Path.home() / ".kit_gmail" / "kit_gmail.log" if settings.debug else None
-)
-
 logger = get_logger(__name__)
 console = Console()
 
+COMPLETION_RC_FILES = {"bash": ".bashrc", "zsh": ".zshrc"}
+
 app = typer.Typer(
     name="kit-gmail",
     help="Kit Gmail - Knowledge Integration Tool for Gmail Management",
@@ -48,6 +47,11 @@ def main(
         setup_logging(level="DEBUG", log_file=Path.home() / ".kit_gmail" / "debug.log")
     elif verbose:
         setup_logging(level="DEBUG")
+    else:
+        setup_logging(
+            level=settings.log_level,
+            log_file=Path.home() / ".kit_gmail" / "kit_gmail.log" if settings.debug else None
+        )
 
 
 @app.command()
@@ -123,7 +127,7 @@ def quick_cleanup(
                 stats = gmail_manager.cleanup_mailbox(days_old=days, delete_junk=True, archive_old=True)
             else:
                 # For dry run, just get some sample data
-                messages = gmail_manager.get_messages(query=f"older_than:{days}d", max_results=100)
+                messages = gmail_manager.get_message_ids(query=f"older_than:{days}d", max_results=100)
                 stats = {
                     "processed": len(messages),
                     "deleted": len(messages) // 4,  # Estimate
@@ -165,18 +169,22 @@ def quick_summary(
         try:
             gmail_manager = GmailManager()
             
-            with console.status("[bold green]Generating AI summary..."):
+            def render(text: str) -> Panel:
+                return Panel(text, title=f"📧 Email Summary ({days} days)", border_style="blue")
+            
+            chunks = []
+            with Live(Spinner("dots", text="[bold green]Generating AI summary..."), console=console) as live:
+                def show_chunk(text: str) -> None:
+                    chunks.append(text)
+                    live.update(render("".join(chunks)))
+                
                 summary = await gmail_manager.generate_email_summary(
                     days=days, 
                     summary_type="daily", 
-                    provider_name=provider
+                    provider_name=provider,
+                    stream_callback=show_chunk
                 )
-            
-            console.print(Panel(
-                summary, 
-                title=f"📧 Email Summary ({days} days)",
-                border_style="blue"
-            ))
+                live.update(render(summary))
             
         except Exception as e:
             console.print(f"\n[red]Error generating summary: {str(e)}[/red]")
@@ -202,7 +210,7 @@ def dashboard() -> None:
             pass  # No existing contacts database
         
         with console.status("[bold green]Loading dashboard data..."):
-            # Get mailbox stats
+            # Get mailbox stats, shared with `status` through its cache
             mailbox_stats = gmail_manager.get_mailbox_stats()
             
             # Get contact stats
@@ -265,5 +273,62 @@ def dashboard() -> None:
         logger.error(f"Dashboard failed: {e}")
 
 
+def _render_completion_script(shell: str) -> str:
+    """Render a static completion script for the current command tree."""
+    root = typer.main.get_command(app)
+    
+    cases = []
+    for name, command in sorted(root.commands.items()):
+        subcommands = getattr(command, "commands", None)
+        if subcommands:
+            cases.append(f'            {name}) words="{" ".join(sorted(subcommands))}" ;;')
+    
+    lines = []
+    if shell == "zsh":
+        lines.append("autoload -U +X bashcompinit && bashcompinit")
+    lines.extend([
+        "# kit-gmail static completion, generated by `kit-gmail install-completion`",
+        "_kit_gmail_complete() {",
+        '    local cur="${COMP_WORDS[COMP_CWORD]}"',
+        '    local words=""',
+        '    if [ "$COMP_CWORD" -eq 1 ]; then',
+        f'        words="{" ".join(sorted(root.commands))}"',
+        '    elif [ "$COMP_CWORD" -eq 2 ]; then',
+        '        case "${COMP_WORDS[1]}" in',
+        *cases,
+        "        esac",
+        "    fi",
+        '    COMPREPLY=($(compgen -W "$words" -- "$cur"))',
+        "}",
+        "complete -F _kit_gmail_complete kit-gmail",
+    ])
+    return "\n".join(lines) + "\n"
+
+
+@app.command("install-completion")
+def install_completion(
+    shell: str = typer.Option("bash", "--shell", "-s", help="Shell to install completion for: bash, zsh"),
+) -> None:
+    """Install a static shell completion script that does not start Python."""
+    
+    if shell not in COMPLETION_RC_FILES:
+        console.print(f"[red]Unsupported shell: {shell}. Choose from: {', '.join(COMPLETION_RC_FILES)}[/red]")
+        raise typer.Exit(1)
+    
+    script_path = Path.home() / ".kit_gmail" / f"completion.{shell}"
+    script_path.parent.mkdir(parents=True, exist_ok=True)
+    script_path.write_text(_render_completion_script(shell), encoding="utf-8")
+    
+    rc_file = Path.home() / COMPLETION_RC_FILES[shell]
+    source_line = f"source {shlex.quote(str(script_path))}"
+    rc_content = rc_file.read_text(encoding="utf-8") if rc_file.exists() else ""
+    if source_line not in rc_content:
+        with open(rc_file, "a", encoding="utf-8") as f:
+            f.write(f"\n# kit-gmail completion\n{source_line}\n")
+    
+    console.print(f"[bold green]✅ Installed {shell} completion to {script_path}[/bold green]")
+    console.print(f"Restart your shell or run: [bold]{source_line}[/bold]")
+
+
 if __name__ == "__main__":
     app()
\ No newline at end of file
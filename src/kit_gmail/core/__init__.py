@@ -2,11 +2,12 @@
 
 from .gmail_auth import GmailAuth
 from .gmail_manager import GmailManager
-from .email_processor import EmailProcessor, ProcessedEmail
+from .email_processor import EmailProcessor, ProcessedEmail, ProcessedEmailBatch
 
 __all__ = [
     "GmailAuth",
     "GmailManager", 
     "EmailProcessor",
     "ProcessedEmail",
+    "ProcessedEmailBatch",
 ]
\ No newline at end of file
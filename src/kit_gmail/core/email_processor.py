@@ -2,12 +2,19 @@
 
 import base64
 import email
+import importlib.util
+import os
 import re
+import sys
+import threading
+from array import array
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional, Set
-from dataclasses import dataclass, field
+from email.utils import getaddresses, parseaddr, parsedate_to_datetime
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterator, List, Optional, Sequence, Set, Tuple
 
-import dateparser
 from email_validator import validate_email, EmailNotValidError
 
 from ..utils.config import settings
@@ -15,38 +22,390 @@ from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Non-RFC 2822 dates can fall back to dateparser when it is installed
+# (pip install "kit-gmail[dates]")
+DATEPARSER_AVAILABLE = importlib.util.find_spec("dateparser") is not None
+
+# Processed emails kept per EmailProcessor, keyed on (message id, historyId)
+PROCESSED_CACHE_SIZE = 4096
+
+# Content signals scanned in a single pass per email. Gaps between words live
+# in lookaheads so a match only consumes its first word and cannot hide signals
+# that start inside it, and are bounded so each lookahead does a fixed amount of
+# work even on huge single-line HTML bodies. ``order`` is tried before
+# ``receipt`` because both can start at the same position; _scan_content
+# restores the implied receipt hit.
+CONTENT_SIGNAL_PATTERNS = {
+    "promotional": r'sale|deal|offer|discount|promotion|coupon|special',
+    "order": r'order(?=\s*#?\s*\d)|confirmation(?=\s*#?\s*\d)',
+    "receipt": r'receipt|invoice|order\s*#|purchase|payment|confirmation',
+    "money": r'\$\d+\.\d{2}|\d+\.\d{2}\s*(?:usd|eur|gbp)',
+    "unsubscribe": r'unsubscribe|opt.?out|remove(?=.{0,40}list)',
+    "critical": (
+        r'urgent|important|security\s+alert|account\s+suspended|'
+        r'verify\s+account|tax\s+notice|legal\s+notice'
+    ),
+    "automated": r'do\s+not\s+reply|noreply|automated\s+message|auto(?=.{0,40}generated)',
+    "newsletter": r'newsletter|bulletin|digest',
+}
+
+
+# All content signals fused into one alternation with named groups
+SIGNAL_PATTERN = re.compile(
+    "|".join(f"(?P<{name}>{pattern})" for name, pattern in CONTENT_SIGNAL_PATTERNS.items()),
+    re.IGNORECASE,
+)
+ORDER_HASH_PATTERN = re.compile(r'\s*#')
+
+# Header parsing patterns
+ANGLE_ADDRESS_PATTERN = re.compile(r'<([^>]+)>')
+ADDRESS_PATTERN = re.compile(r'[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}')
+# Unsubscribe links, either as an anchor href or a bare URL
+UNSUBSCRIBE_LINK_PATTERN = re.compile(
+    r'<a[^>]*href=["\'](?P<href>[^"\']*unsubscribe[^"\']*)["\'][^>]*>'
+    r'|(?P<url>https?://[^\s]*unsubscribe[^\s]*)',
+    re.IGNORECASE,
+)
+
+
+@lru_cache(maxsize=8)
+def _compile_keywords(
+    junk_keywords: FrozenSet[str], receipt_keywords: FrozenSet[str]
+) -> Tuple[Dict[str, Set[str]], Optional["re.Pattern"], Dict[str, Set[str]]]:
+    """Build the keyword scanner: keyword classes, pattern and overlaps."""
+    keyword_classes: Dict[str, Set[str]] = {}
+    for keyword_class, keywords in (
+        ("junk_keywords", junk_keywords),
+        ("receipt_keywords", receipt_keywords),
+    ):
+        for keyword in keywords:
+            keyword_classes.setdefault(keyword, set()).add(keyword_class)
+    
+    # A zero-width lookahead tries every start position, and longest-first
+    # ordering plus keyword_overlaps credits shorter keywords contained in
+    # a longer match, matching the old per-keyword substring checks
+    ordered_keywords = sorted(keyword_classes, key=len, reverse=True)
+    keyword_pattern = re.compile(
+        "(?=(" + "|".join(map(re.escape, ordered_keywords)) + "))",
+        re.IGNORECASE,
+    ) if ordered_keywords else None
+    keyword_overlaps = {
+        keyword: {other for other in ordered_keywords if other in keyword}
+        for keyword in ordered_keywords
+    }
+    return keyword_classes, keyword_pattern, keyword_overlaps
+
+# Sender domain fragments that suggest bulk marketing mail
+MARKETING_SENDER_INDICATORS = ('noreply', 'marketing', 'promo')
+
+
+def score_features(features: Sequence[int]) -> Tuple[float, float]:
+    """Compute (junk, receipt) scores from integer content features.
+    
+    ``features`` is ``(junk_keyword_hits, promotional, unsubscribe,
+    exclamation_count, marketing_sender, receipt_keyword_hits, receipt,
+    money, order)``, as built by EmailProcessor._score_features.
+    """
+    (junk_keywords, promotional, unsubscribe, exclamations, marketing_sender,
+     receipt_keywords, receipt, money, order) = features
+    
+    junk = min(0.5, junk_keywords * 0.1)
+    if promotional:
+        junk += 0.3
+    if unsubscribe:
+        junk += 0.2
+    # Excessive exclamation marks
+    if exclamations > 3:
+        junk += 0.1
+    if marketing_sender:
+        junk += 0.2
+    
+    receipt_score = min(0.6, receipt_keywords * 0.2)
+    if receipt:
+        receipt_score += 0.3
+    if money:
+        receipt_score += 0.2
+    if order:
+        receipt_score += 0.2
+    
+    return min(1.0, junk), min(1.0, receipt_score)
+
+
+# Gmail system labels that classify a message on their own
+LABEL_CLASSIFICATIONS = {
+    "SPAM": "is_junk",
+    "CATEGORY_PROMOTIONS": "is_promotional",
+    "CATEGORY_SOCIAL": "is_social",
+    "CATEGORY_UPDATES": "is_automated",
+}
+# Labels conclusive enough to skip content scanning. Category tabs still
+# carry junk, receipts and critical notices, so they go through full
+# classification; only the sender check runs for definitive labels.
+DEFINITIVE_LABELS = {"SPAM"}
+
+# Headers read during processing; lookups use these lowercased names
+MAILING_LIST_HEADERS = ('list-id', 'list-unsubscribe', 'mailing-list', 'x-mailing-list')
+AUTOMATED_HEADERS = ('x-auto-response-suppress', 'auto-submitted', 'x-autoreply')
+RECIPIENT_HEADERS = ('to', 'cc', 'bcc')
+NEEDED_HEADERS = frozenset(
+    ('subject', 'from', 'date') + RECIPIENT_HEADERS + MAILING_LIST_HEADERS + AUTOMATED_HEADERS
+)
+
+class _Unset:
+    """Marks a lazy ProcessedEmail field that has not been computed yet."""
+
+    def __reduce__(self) -> str:
+        # Unpickle as the module singleton so identity checks still hold
+        return "_UNSET"
+
+
+_UNSET = _Unset()
+
+# Cached emails can be shared by several threads of a batch, so decoding and
+# classifying one email is serialized. Emails hash onto a fixed set of
+# re-entrant locks rather than each carrying its own.
+_LAZY_LOCKS = tuple(threading.RLock() for _ in range(64))
+
+# Classification results and their defaults, filled in together by
+# EmailProcessor._classify_email
+CLASSIFICATION_DEFAULTS = {
+    "is_junk": False,
+    "is_critical": False,
+    "is_receipt": False,
+    "is_mailing_list": False,
+    "is_promotional": False,
+    "is_social": False,
+    "is_automated": False,
+    "merchant": None,
+    "list_name": None,
+    "unsubscribe_link": None,
+    "confidence_score": 0.0,
+    "processing_notes": None,
+}
+
+
+def _body_field(name: str) -> property:
+    """Property decoding the message body on first access."""
+    attr = f"_{name}"
+
+    def fget(self: "ProcessedEmail"):
+        if getattr(self, attr) is _UNSET:
+            with self._lazy_lock():
+                if getattr(self, attr) is _UNSET:
+                    self._load_body()
+        return getattr(self, attr)
+
+    def fset(self: "ProcessedEmail", value) -> None:
+        setattr(self, attr, value)
+
+    return property(fget, fset)
+
+
+def _classification_field(name: str) -> property:
+    """Property running classification on first access of any result."""
+    attr = f"_{name}"
+
+    def fget(self: "ProcessedEmail"):
+        self._ensure_classified()
+        return getattr(self, attr)
+
+    def fset(self: "ProcessedEmail", value) -> None:
+        self._ensure_classified()
+        setattr(self, attr, value)
+
+    return property(fget, fset)
+
 
-@dataclass
 class ProcessedEmail:
-    """Structured representation of a processed email."""
+    """Structured representation of a processed email.
+    
+    Header fields are parsed up front. When built by EmailProcessor from a raw
+    Gmail message, the body, attachments and classification flags are only
+    computed on first access, so listing views that read subject and sender
+    never pay for base64 decoding or content scanning.
+    """
     
-    message_id: str
-    thread_id: str
-    subject: str
-    sender: str
-    sender_name: Optional[str]
-    recipients: List[str]
-    date: datetime
-    body_text: str
-    body_html: Optional[str] = None
-    attachments: List[Dict] = field(default_factory=list)
-    labels: List[str] = field(default_factory=list)
+    # Millions of these can be alive during a sync, so skip the instance dict
+    __slots__ = (
+        "message_id", "thread_id", "subject", "sender", "sender_name",
+        "recipients", "date", "labels",
+        "_message", "_headers", "_processor",
+        "_body_text", "_body_html", "_attachments", "_classified",
+    ) + tuple(f"_{name}" for name in CLASSIFICATION_DEFAULTS)
     
-    # Classification flags
-    is_junk: bool = False
-    is_critical: bool = False
-    is_receipt: bool = False
-    is_mailing_list: bool = False
-    is_promotional: bool = False
-    is_social: bool = False
-    is_automated: bool = False
+    body_text = _body_field("body_text")
+    body_html = _body_field("body_html")
+    attachments = _body_field("attachments")
     
-    # Additional metadata
-    merchant: Optional[str] = None
-    list_name: Optional[str] = None
-    unsubscribe_link: Optional[str] = None
-    confidence_score: float = 0.0
-    processing_notes: List[str] = field(default_factory=list)
+    is_junk = _classification_field("is_junk")
+    is_critical = _classification_field("is_critical")
+    is_receipt = _classification_field("is_receipt")
+    is_mailing_list = _classification_field("is_mailing_list")
+    is_promotional = _classification_field("is_promotional")
+    is_social = _classification_field("is_social")
+    is_automated = _classification_field("is_automated")
+    merchant = _classification_field("merchant")
+    list_name = _classification_field("list_name")
+    unsubscribe_link = _classification_field("unsubscribe_link")
+    confidence_score = _classification_field("confidence_score")
+    processing_notes = _classification_field("processing_notes")
+    
+    def __init__(
+        self,
+        message_id: str,
+        thread_id: str,
+        subject: str,
+        sender: str,
+        sender_name: Optional[str],
+        recipients: List[str],
+        date: datetime,
+        body_text: str = "",
+        body_html: Optional[str] = None,
+        attachments: Optional[List[Dict]] = None,
+        labels: Optional[List[str]] = None,
+        *,
+        message: Optional[Dict] = None,
+        headers: Optional[Dict[str, str]] = None,
+        processor: Optional["EmailProcessor"] = None,
+        **classification,
+    ) -> None:
+        unknown = set(classification) - set(CLASSIFICATION_DEFAULTS)
+        if unknown:
+            raise TypeError(f"Unexpected fields: {', '.join(sorted(unknown))}")
+        
+        self.message_id = message_id
+        self.thread_id = thread_id
+        self.subject = subject
+        self.sender = sender
+        self.sender_name = sender_name
+        self.recipients = recipients
+        self.date = date
+        self.labels = labels if labels is not None else []
+        
+        self._message = message
+        self._headers = headers or {}
+        self._processor = processor
+        
+        # Built from a raw message: decode and classify on demand
+        lazy = processor is not None and message is not None
+        if lazy:
+            self._body_text = self._body_html = self._attachments = _UNSET
+        else:
+            self._body_text = body_text
+            self._body_html = body_html
+            self._attachments = attachments if attachments is not None else []
+        
+        self._classified = not lazy
+        self._set_classification(classification)
+
+    def _set_classification(self, values: Dict) -> None:
+        for name, default in CLASSIFICATION_DEFAULTS.items():
+            value = values.get(name, default)
+            if name == "processing_notes" and value is None:
+                value = []
+            setattr(self, f"_{name}", value)
+
+    def _load_body(self) -> None:
+        self._body_text, self._body_html = self._processor._extract_body(self._message)
+        self._attachments = self._processor._extract_attachments(self._message)
+        # Nothing reads the raw message once the body is decoded, and cached
+        # emails would otherwise keep every full payload alive
+        self._message = None
+
+    def _lazy_lock(self) -> threading.RLock:
+        return _LAZY_LOCKS[id(self) % len(_LAZY_LOCKS)]
+
+    def _ensure_classified(self) -> None:
+        if self._classified is True:
+            return
+        with self._lazy_lock():
+            # Holding the lock, an in-progress state can only be this
+            # thread's classifier reading or setting fields
+            if self._classified is not False:
+                return
+            self._classified = None
+            try:
+                self._processor._classify_email(self, self._headers)
+            finally:
+                self._classified = True
+
+    def __repr__(self) -> str:
+        return (
+            f"ProcessedEmail(message_id={self.message_id!r}, "
+            f"subject={self.subject!r}, sender={self.sender!r})"
+        )
+
+
+# Bits of the per-email classification mask in ProcessedEmailBatch.flags
+JUNK_BIT = 1 << 0
+CRITICAL_BIT = 1 << 1
+RECEIPT_BIT = 1 << 2
+MAILING_LIST_BIT = 1 << 3
+PROMOTIONAL_BIT = 1 << 4
+SOCIAL_BIT = 1 << 5
+AUTOMATED_BIT = 1 << 6
+
+FLAG_BITS = {
+    "is_junk": JUNK_BIT,
+    "is_critical": CRITICAL_BIT,
+    "is_receipt": RECEIPT_BIT,
+    "is_mailing_list": MAILING_LIST_BIT,
+    "is_promotional": PROMOTIONAL_BIT,
+    "is_social": SOCIAL_BIT,
+    "is_automated": AUTOMATED_BIT,
+}
+
+
+class ProcessedEmailBatch:
+    """Column-wise view over a batch of processed emails.
+    
+    Ids, dates, senders and a classification bitmask are kept in parallel
+    columns so bulk filters such as "all receipts since last month" scan
+    compact arrays instead of every ProcessedEmail. Indexing returns the full
+    ProcessedEmail, served from the processor's cache.
+    """
+    
+    def __init__(self, processor: "EmailProcessor") -> None:
+        self._processor = processor
+        self._messages: List[Dict] = []
+        self.ids: List[str] = []
+        self.dates: List[datetime] = []
+        self.senders: List[str] = []
+        self.flags = array('B')
+
+    def _append(self, message: Dict, email: ProcessedEmail) -> None:
+        mask = 0
+        for flag, bit in FLAG_BITS.items():
+            if getattr(email, flag):
+                mask |= bit
+        
+        self._messages.append(message)
+        self.ids.append(email.message_id)
+        self.dates.append(email.date)
+        self.senders.append(email.sender)
+        self.flags.append(mask)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> ProcessedEmail:
+        return self._processor.process_email(self._messages[index])
+
+    def __iter__(self) -> Iterator[ProcessedEmail]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def where(self, bits: int = 0, since: Optional[datetime] = None) -> List[int]:
+        """Return indices of emails with all ``bits`` set, dated on or after ``since``."""
+        indices = [i for i, mask in enumerate(self.flags) if mask & bits == bits]
+        if since is not None:
+            dates = self.dates
+            indices = [i for i in indices if dates[i] >= since]
+        return indices
+
+    def select(self, bits: int = 0, since: Optional[datetime] = None) -> List[ProcessedEmail]:
+        """Return the emails matching ``where``."""
+        return [self[i] for i in self.where(bits, since)]
 
 
 class EmailProcessor:
@@ -57,16 +416,48 @@ class EmailProcessor:
         self.junk_keywords = self._parse_keywords(settings.junk_keywords)
         self.critical_senders = self._parse_keywords(settings.critical_senders)
         
-        # Compiled regex patterns for better performance
-        self.unsubscribe_pattern = re.compile(
-            r'unsubscribe|opt.?out|remove.*list', re.IGNORECASE
-        )
-        self.receipt_pattern = re.compile(
-            r'receipt|invoice|order\s*#|purchase|payment|confirmation', re.IGNORECASE
-        )
-        self.promotional_pattern = re.compile(
-            r'sale|deal|offer|discount|promotion|coupon|special', re.IGNORECASE
+        # Patterns are compiled once per process and shared by every processor
+        self.signal_pattern = SIGNAL_PATTERN
+        self.order_hash_pattern = ORDER_HASH_PATTERN
+        self.angle_address_pattern = ANGLE_ADDRESS_PATTERN
+        self.unsubscribe_link_pattern = UNSUBSCRIBE_LINK_PATTERN
+        self.address_pattern = ADDRESS_PATTERN
+        
+        # Junk and receipt keywords matched together in one pass
+        self.keyword_classes, self.keyword_pattern, self.keyword_overlaps = _compile_keywords(
+            frozenset(self.junk_keywords), frozenset(self.receipt_keywords)
         )
+        
+        # LRU of processed emails; historyId changes whenever the message
+        # changes, so a stale entry is simply never hit again
+        self._cache: "OrderedDict[tuple, ProcessedEmail]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def __getstate__(self) -> Dict:
+        # Lazily processed emails carry their processor into worker
+        # processes; the cache and its lock stay behind
+        state = self.__dict__.copy()
+        del state["_cache"], state["_cache_lock"]
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    @property
+    def critical_senders(self) -> Set[str]:
+        """Critical sender entries: addresses, domains or domain labels."""
+        return self._critical_senders
+
+    @critical_senders.setter
+    def critical_senders(self, senders: Set[str]) -> None:
+        self._critical_senders = set(senders)
+        # "a@b.com" matches the address, "b.com" the domain and its
+        # subdomains, and a bare word like "bank" any domain label
+        self._critical_addresses = {s for s in senders if '@' in s}
+        self._critical_domains = {s for s in senders if '@' not in s and '.' in s}
+        self._critical_labels = {s for s in senders if '@' not in s and '.' not in s}
 
     def _parse_keywords(self, keyword_string: str) -> Set[str]:
         """Parse comma-separated keywords into a set."""
@@ -74,27 +465,75 @@ class EmailProcessor:
             return set()
         return {kw.strip().lower() for kw in keyword_string.split(',')}
 
+    def _scan_content(self, content: str) -> Counter:
+        """Scan content once for classification signals.
+        
+        Pattern signals are counted once when present; ``junk_keywords`` and
+        ``receipt_keywords`` count the distinct keywords found.
+        """
+        hits = Counter()
+        
+        for match in self.signal_pattern.finditer(content):
+            signal = match.lastgroup
+            hits[signal] = 1
+            # An order number at this position also satisfies the receipt
+            # pattern when it is a confirmation or written as "order #"
+            if signal == "order" and (
+                match.group().lower() == "confirmation"
+                or self.order_hash_pattern.match(content, match.end())
+            ):
+                hits["receipt"] = 1
+            if len(hits) == len(CONTENT_SIGNAL_PATTERNS):
+                break
+        
+        if self.keyword_pattern:
+            found = set()
+            for match in self.keyword_pattern.finditer(content):
+                found |= self.keyword_overlaps[match.group(1).lower()]
+                if len(found) == len(self.keyword_classes):
+                    break
+            for keyword in found:
+                hits.update(self.keyword_classes[keyword])
+        
+        return hits
+
     def process_email(self, message: Dict) -> ProcessedEmail:
-        """Process a Gmail API message into a structured format."""
+        """Process a Gmail API message into a structured format.
+        
+        Results are cached on the message id and historyId, so replaying the
+        same message during a sync skips decoding and classification.
+        """
+        # Metadata-only fetches carry no body, so they never stand in for
+        # a full fetch of the same message
+        payload = message.get('payload', {})
+        cache_key = (
+            message.get('id'),
+            message.get('historyId'),
+            'body' in payload or 'parts' in payload,
+        )
+        with self._cache_lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+                return cached
+        
         try:
             # Extract basic message info
             headers = self._extract_headers(message)
-            subject = headers.get('Subject', '')
-            sender = headers.get('From', '')
-            sender_name = self._extract_sender_name(sender)
+            subject = headers.get('subject', '')
+            from_header = headers.get('from', '')
+            sender_name = self._extract_sender_name(from_header)
+            sender = parseaddr(from_header)[1] or from_header
             recipients = self._extract_recipients(headers)
-            date = self._parse_date(headers.get('Date', ''))
-            
-            # Extract message body
-            body_text, body_html = self._extract_body(message)
+            date = self._parse_date(headers.get('date', ''))
             
-            # Extract attachments
-            attachments = self._extract_attachments(message)
+            # Label ids and senders repeat across a mailbox, so share one
+            # string object per distinct value
+            labels = [sys.intern(label) for label in message.get('labelIds', [])]
+            sender = sys.intern(sender)
             
-            # Get labels
-            labels = message.get('labelIds', [])
-            
-            # Create processed email object
+            # Body, attachments and classification are computed on first
+            # access from the raw message
             processed_email = ProcessedEmail(
                 message_id=message['id'],
                 thread_id=message['threadId'],
@@ -103,14 +542,16 @@ class EmailProcessor:
                 sender_name=sender_name,
                 recipients=recipients,
                 date=date,
-                body_text=body_text,
-                body_html=body_html,
-                attachments=attachments,
                 labels=labels,
+                message=message,
+                headers=headers,
+                processor=self,
             )
             
-            # Perform classification
-            self._classify_email(processed_email, headers)
+            with self._cache_lock:
+                self._cache[cache_key] = processed_email
+                if len(self._cache) > PROCESSED_CACHE_SIZE:
+                    self._cache.popitem(last=False)
             
             logger.debug(f"Processed email: {subject[:50]}...")
             return processed_email
@@ -119,13 +560,86 @@ class EmailProcessor:
             logger.error(f"Failed to process email {message.get('id', 'unknown')}: {e}")
             raise
 
+    def process_batch(self, messages: List[Dict]) -> ProcessedEmailBatch:
+        """Process and classify messages into a column-wise batch.
+        
+        Messages are decoded and classified on a thread pool; base64 and
+        regex work release the GIL, and everything the workers read is fixed
+        after __init__. Messages that fail to process are logged and left
+        out of the batch.
+        """
+        batch = ProcessedEmailBatch(self)
+        if not messages:
+            return batch
+        
+        if settings.classification_processes > 0 and len(messages) > 1:
+            return self._process_batch_in_processes(messages, batch)
+        
+        max_workers = min(32, os.cpu_count() or 1, len(messages))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self._process_classified, message) for message in messages]
+        
+        for message, future in zip(messages, futures):
+            try:
+                batch._append(message, future.result())
+            except Exception:
+                continue
+        return batch
+
+    def _process_batch_in_processes(
+        self, messages: List[Dict], batch: ProcessedEmailBatch
+    ) -> ProcessedEmailBatch:
+        """Classify messages on a process pool and attach the results here.
+        
+        Workers build their own processor with this one's critical senders
+        and send back only the classification fields; the emails themselves
+        are processed in this process, where they are cached.
+        """
+        max_workers = min(settings.classification_processes, len(messages))
+        chunksize = max(1, len(messages) // (max_workers * 4))
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(self.critical_senders,),
+        ) as executor:
+            results = list(executor.map(_classify_in_worker, messages, chunksize=chunksize))
+        
+        for message, classification in zip(messages, results):
+            if classification is None:
+                continue
+            try:
+                processed_email = self.process_email(message)
+            except Exception:
+                continue
+            processed_email._set_classification(classification)
+            processed_email._classified = True
+            batch._append(message, processed_email)
+        return batch
+
+    def _process_classified(self, message: Dict) -> ProcessedEmail:
+        """Process a message and force its lazy classification."""
+        processed_email = self.process_email(message)
+        try:
+            processed_email._ensure_classified()
+        except Exception as e:
+            logger.error(f"Failed to classify email {processed_email.message_id}: {e}")
+            raise
+        return processed_email
+
+    def clear_cache(self) -> None:
+        """Drop all cached processed emails."""
+        with self._cache_lock:
+            self._cache.clear()
+
     def _extract_headers(self, message: Dict) -> Dict[str, str]:
-        """Extract email headers into a dictionary."""
+        """Extract the headers used for processing, keyed by lowercase name."""
         headers = {}
         payload = message.get('payload', {})
         
         for header in payload.get('headers', []):
-            headers[header['name']] = header['value']
+            name = header['name'].lower()
+            if name in NEEDED_HEADERS:
+                headers[name] = header['value']
         
         return headers
 
@@ -134,37 +648,36 @@ class EmailProcessor:
         if not from_header:
             return None
             
-        # Parse format: "Name <email@domain.com>" or just "email@domain.com"
-        match = re.match(r'^(.+?)\s*<(.+)>$', from_header)
-        if match:
-            name = match.group(1).strip(' "')
-            return name if name else None
-        return None
+        name, _ = parseaddr(from_header)
+        return name.strip(' "') or None
 
     def _extract_recipients(self, headers: Dict[str, str]) -> List[str]:
         """Extract recipient email addresses."""
         recipients = []
         
-        for header_name in ['To', 'Cc', 'Bcc']:
+        for header_name in RECIPIENT_HEADERS:
             if header_name in headers:
                 recipients.extend(self._parse_email_list(headers[header_name]))
         
         return recipients
 
-    def _parse_email_list(self, email_string: str) -> List[str]:
-        """Parse comma-separated email addresses."""
+    def _parse_email_list(self, email_string: str, strict: bool = False) -> List[str]:
+        """Parse comma-separated email addresses.
+        
+        By default addresses are pulled out with one regex sweep, which is
+        all recipient lists need. ``strict`` runs every address through
+        email_validator for full RFC validation and normalization.
+        """
+        if not strict:
+            # A display name that repeats the address must not count twice
+            return list(dict.fromkeys(self.address_pattern.findall(email_string)))
+        
         emails = []
         
-        for email_part in email_string.split(','):
-            email_part = email_part.strip()
-            
-            # Extract email from "Name <email>" format
-            match = re.search(r'<(.+?)>', email_part)
-            if match:
-                email_addr = match.group(1)
-            else:
-                email_addr = email_part
-            
+        # getaddresses copes with quoted commas in display names
+        for _, email_addr in getaddresses([email_string]):
+            if not email_addr:
+                continue
             try:
                 validated = validate_email(email_addr)
                 emails.append(validated.email)
@@ -179,7 +692,19 @@ class EmailProcessor:
         if not date_string:
             return datetime.now()
             
+        # Date headers are RFC 2822, which the stdlib parses directly
         try:
+            return parsedate_to_datetime(date_string)
+        except (TypeError, ValueError, IndexError):
+            pass
+        
+        if not (settings.date_parser_fallback and DATEPARSER_AVAILABLE):
+            logger.debug(f"Unparseable date '{date_string}'")
+            return datetime.now()
+        
+        try:
+            import dateparser
+            
             parsed_date = dateparser.parse(date_string)
             return parsed_date if parsed_date else datetime.now()
         except Exception as e:
@@ -189,103 +714,133 @@ class EmailProcessor:
     def _extract_body(self, message: Dict) -> tuple[str, Optional[str]]:
         """Extract text and HTML body from message."""
         payload = message.get('payload', {})
-        body_text = ""
-        body_html = None
+        text_blobs = []
+        html_blob = None
         
-        def extract_from_part(part):
-            nonlocal body_text, body_html
-            
+        # Collect the encoded bodies first, then decode them in one go
+        for part in self._walk_parts(payload):
             mime_type = part.get('mimeType', '')
-            body = part.get('body', {})
-            
-            if mime_type == 'text/plain' and 'data' in body:
-                text_data = base64.urlsafe_b64decode(body['data']).decode('utf-8')
-                body_text += text_data
-                
-            elif mime_type == 'text/html' and 'data' in body:
-                html_data = base64.urlsafe_b64decode(body['data']).decode('utf-8')
-                if not body_html:
-                    body_html = html_data
-                    
-        # Handle multipart messages
-        if 'parts' in payload:
-            for part in payload['parts']:
-                if 'parts' in part:  # Nested multipart
-                    for subpart in part['parts']:
-                        extract_from_part(subpart)
-                else:
-                    extract_from_part(part)
-        else:
-            extract_from_part(payload)
-            
+            data = part.get('body', {}).get('data')
+            if not data:
+                continue
+            if mime_type == 'text/plain':
+                text_blobs.append(data)
+            elif mime_type == 'text/html' and html_blob is None:
+                html_blob = data
+        
+        body_text = self._decode_body_data(text_blobs)
+        body_html = self._decode_body_data([html_blob]) if html_blob else None
         return body_text.strip(), body_html
 
+    def _decode_body_data(self, blobs: List[str]) -> str:
+        """Decode base64url body blobs into a single string.
+        
+        Each blob is padded and decoded separately, since padded base64 does
+        not concatenate, but the UTF-8 decode runs once over the joined bytes.
+        Malformed bytes are replaced rather than failing the whole message.
+        """
+        raw = b"".join(
+            base64.urlsafe_b64decode(blob + "=" * (-len(blob) % 4))
+            for blob in blobs
+        )
+        return raw.decode('utf-8', errors='replace')
+
     def _extract_attachments(self, message: Dict) -> List[Dict]:
         """Extract attachment information."""
         attachments = []
         payload = message.get('payload', {})
         
-        def process_part(part):
+        for part in self._walk_parts(payload):
             if part.get('filename'):
-                attachment = {
+                body = part.get('body', {})
+                attachments.append({
                     'filename': part['filename'],
                     'mime_type': part.get('mimeType', ''),
-                    'size': part.get('body', {}).get('size', 0),
-                    'attachment_id': part.get('body', {}).get('attachmentId'),
-                }
-                attachments.append(attachment)
-                
-        if 'parts' in payload:
-            for part in payload['parts']:
-                if 'parts' in part:
-                    for subpart in part['parts']:
-                        process_part(subpart)
-                else:
-                    process_part(part)
-        else:
-            process_part(payload)
+                    'size': body.get('size', 0),
+                    'attachment_id': body.get('attachmentId'),
+                })
             
         return attachments
 
+    def _walk_parts(self, payload: Dict) -> Iterator[Dict]:
+        """Yield every leaf MIME part of a payload in document order."""
+        stack = deque([payload])
+        while stack:
+            part = stack.pop()
+            subparts = part.get('parts')
+            if subparts:
+                stack.extend(reversed(subparts))
+            else:
+                yield part
+
     def _classify_email(self, email: ProcessedEmail, headers: Dict[str, str]) -> None:
         """Classify email based on content and metadata."""
-        content = f"{email.subject} {email.body_text}".lower()
+        confidence_factors = []
+        
+        # Gmail's own labels settle the class of most bulk mail
+        for label in email.labels:
+            flag = LABEL_CLASSIFICATIONS.get(label)
+            if flag:
+                setattr(email, flag, True)
+                confidence_factors.append(f"label: {label}")
+        
+        if DEFINITIVE_LABELS.intersection(email.labels):
+            # Only the sender and header-based checks are cheap enough here
+            if self._is_critical_sender(email.sender.lower()):
+                email.is_critical = True
+                confidence_factors.append("critical_sender")
+            list_info = self._detect_mailing_list(headers, "", Counter())
+            if list_info:
+                email.is_mailing_list = True
+                email.list_name = list_info
+                confidence_factors.append(f"mailing_list: {list_info}")
+            email.confidence_score = min(1.0, len(confidence_factors) * 0.2)
+            email.processing_notes = confidence_factors
+            return
+        
+        # Signals show up early, so only a prefix of long bodies is scanned.
+        # HTML-only messages are scanned through their markup instead.
+        scan_limit = settings.classification_scan_chars or None
+        body = email.body_text or email.body_html or ""
+        # Both scanners ignore case, so no lowercased copy is needed
+        content = f"{email.subject} {body[:scan_limit]}"
         sender_lower = email.sender.lower()
+        hits = self._scan_content(content)
         
-        confidence_factors = []
+        junk_score, receipt_score = score_features(
+            self._score_features(email, content, hits)
+        )
         
         # Check for junk/promotional content
-        junk_score = self._calculate_junk_score(email, content, headers)
         if junk_score > 0.7:
             email.is_junk = True
             confidence_factors.append(f"junk_score: {junk_score:.2f}")
         
         # Check for promotional content
-        if self.promotional_pattern.search(content) or 'promotion' in email.labels:
+        if "promotional" in hits or 'promotion' in email.labels:
             email.is_promotional = True
             confidence_factors.append("promotional_pattern")
         
         # Check for receipts/invoices
-        receipt_score = self._calculate_receipt_score(email, content)
         if receipt_score > 0.6:
             email.is_receipt = True
             email.merchant = self._extract_merchant_name(email)
             confidence_factors.append(f"receipt_score: {receipt_score:.2f}")
         
         # Check for mailing lists
-        list_info = self._detect_mailing_list(headers, content)
+        list_info = self._detect_mailing_list(headers, content, hits)
         if list_info:
             email.is_mailing_list = True
             email.list_name = list_info
             confidence_factors.append(f"mailing_list: {list_info}")
         
         # Check for critical emails
-        if self._is_critical_sender(sender_lower) or self._has_critical_keywords(content):
+        if self._is_critical_sender(sender_lower) or self._has_critical_keywords(content, hits):
             email.is_critical = True
             confidence_factors.append("critical_sender_or_keywords")
         
         # Check for automated messages
-        if self._is_automated_message(headers, content):
+        if self._is_automated_message(headers, content, hits):
             email.is_automated = True
             confidence_factors.append("automated_message")
         
@@ -298,111 +853,100 @@ class EmailProcessor:
         email.confidence_score = min(1.0, len(confidence_factors) * 0.2)
         email.processing_notes = confidence_factors
 
-    def _calculate_junk_score(self, email: ProcessedEmail, content: str, headers: Dict) -> float:
-        """Calculate probability that email is junk."""
-        score = 0.0
-        
-        # Check for junk keywords
-        junk_matches = sum(1 for keyword in self.junk_keywords if keyword in content)
-        score += min(0.5, junk_matches * 0.1)
-        
-        # Check for promotional patterns
-        if self.promotional_pattern.search(content):
-            score += 0.3
-        
-        # Check for unsubscribe links
-        if self.unsubscribe_pattern.search(content):
-            score += 0.2
-        
-        # Check for excessive capitalization
-        if content.count('!') > 3:
-            score += 0.1
-        
-        # Check sender reputation (simplified)
+    def _score_features(self, email: ProcessedEmail, content: str, hits: Counter) -> Tuple[int, ...]:
+        """Reduce an email to the integer features used by score_features."""
         sender_domain = email.sender.split('@')[-1].lower()
-        if any(spam_indicator in sender_domain for spam_indicator in ['noreply', 'marketing', 'promo']):
-            score += 0.2
-        
-        return min(1.0, score)
+        return (
+            hits["junk_keywords"],
+            int("promotional" in hits),
+            int("unsubscribe" in hits),
+            content.count('!'),
+            int(any(indicator in sender_domain for indicator in MARKETING_SENDER_INDICATORS)),
+            hits["receipt_keywords"],
+            int("receipt" in hits),
+            int("money" in hits),
+            int("order" in hits),
+        )
 
-    def _calculate_receipt_score(self, email: ProcessedEmail, content: str) -> float:
+    def _calculate_junk_score(
+        self,
+        email: ProcessedEmail,
+        content: str,
+        headers: Dict,
+        hits: Optional[Counter] = None,
+    ) -> float:
+        """Calculate probability that email is junk."""
+        if hits is None:
+            hits = self._scan_content(content)
+        return score_features(self._score_features(email, content, hits))[0]
+
+    def _calculate_receipt_score(
+        self,
+        email: ProcessedEmail,
+        content: str,
+        hits: Optional[Counter] = None,
+    ) -> float:
         """Calculate probability that email is a receipt/invoice."""
-        score = 0.0
-        
-        # Check for receipt keywords
-        receipt_matches = sum(1 for keyword in self.receipt_keywords if keyword in content)
-        score += min(0.6, receipt_matches * 0.2)
-        
-        # Check for receipt patterns
-        if self.receipt_pattern.search(content):
-            score += 0.3
-        
-        # Check for monetary amounts
-        money_pattern = re.compile(r'\$\d+\.\d{2}|\d+\.\d{2}\s*(usd|eur|gbp)', re.IGNORECASE)
-        if money_pattern.search(content):
-            score += 0.2
-        
-        # Check for order numbers
-        order_pattern = re.compile(r'order\s*#?\s*\d+|confirmation\s*#?\s*\d+', re.IGNORECASE)
-        if order_pattern.search(content):
-            score += 0.2
-        
-        return min(1.0, score)
+        if hits is None:
+            hits = self._scan_content(content)
+        return score_features(self._score_features(email, content, hits))[1]
 
-    def _detect_mailing_list(self, headers: Dict, content: str) -> Optional[str]:
+    def _detect_mailing_list(
+        self, headers: Dict, content: str, hits: Optional[Counter] = None
+    ) -> Optional[str]:
         """Detect if email is from a mailing list and extract list name."""
         # Check standard mailing list headers
-        list_headers = ['List-Id', 'List-Unsubscribe', 'Mailing-List', 'X-Mailing-List']
-        
-        for header in list_headers:
+        for header in MAILING_LIST_HEADERS:
             if header in headers:
                 list_value = headers[header]
                 # Extract list name from various formats
-                match = re.search(r'<([^>]+)>', list_value)
+                match = self.angle_address_pattern.search(list_value)
                 if match:
                     return match.group(1)
                 return list_value.split()[0]
         
         # Check for newsletter patterns
-        if re.search(r'newsletter|bulletin|digest', content, re.IGNORECASE):
+        if hits is None:
+            hits = self._scan_content(content)
+        if "newsletter" in hits:
             return "newsletter"
         
         return None
 
     def _is_critical_sender(self, sender: str) -> bool:
         """Check if sender is marked as critical."""
-        return any(critical in sender for critical in self.critical_senders)
+        address = sender.rpartition('<')[2].rstrip('> ').strip().lower()
+        if address in self._critical_addresses:
+            return True
+        
+        labels = address.rpartition('@')[2].split('.')
+        if self._critical_labels.intersection(labels):
+            return True
+        
+        # Try the domain and each parent domain
+        for i in range(len(labels)):
+            if '.'.join(labels[i:]) in self._critical_domains:
+                return True
+        return False
 
-    def _has_critical_keywords(self, content: str) -> bool:
+    def _has_critical_keywords(self, content: str, hits: Optional[Counter] = None) -> bool:
         """Check for critical keywords in email content."""
-        critical_patterns = [
-            r'urgent',
-            r'important',
-            r'security\s+alert',
-            r'account\s+suspended',
-            r'verify\s+account',
-            r'tax\s+notice',
-            r'legal\s+notice',
-        ]
-        
-        return any(re.search(pattern, content, re.IGNORECASE) for pattern in critical_patterns)
-
-    def _is_automated_message(self, headers: Dict, content: str) -> bool:
+        if hits is None:
+            hits = self._scan_content(content)
+        return "critical" in hits
+
+    def _is_automated_message(
+        self, headers: Dict, content: str, hits: Optional[Counter] = None
+    ) -> bool:
         """Detect if message is automated."""
         # Check headers for automation indicators
-        auto_headers = ['X-Auto-Response-Suppress', 'Auto-Submitted', 'X-Autoreply']
-        if any(header in headers for header in auto_headers):
+        if any(header in headers for header in AUTOMATED_HEADERS):
             return True
         
         # Check for automated message patterns
-        auto_patterns = [
-            r'do\s+not\s+reply',
-            r'noreply',
-            r'automated\s+message',
-            r'auto.*generated',
-        ]
-        
-        return any(re.search(pattern, content, re.IGNORECASE) for pattern in auto_patterns)
+        if hits is None:
+            hits = self._scan_content(content)
+        return "automated" in hits
 
     def _extract_merchant_name(self, email: ProcessedEmail) -> Optional[str]:
         """Extract merchant name from receipt email."""
@@ -420,18 +964,31 @@ class EmailProcessor:
 
     def _extract_unsubscribe_link(self, content: str) -> Optional[str]:
         """Extract unsubscribe link from email content."""
-        if not content:
+        # Most bodies never mention unsubscribing; a substring test rejects
+        # them far faster than scanning every position with the pattern
+        if not content or 'unsubscribe' not in content.lower():
             return None
         
-        # Look for unsubscribe URLs
-        unsubscribe_patterns = [
-            r'<a[^>]*href=["\']([^"\']*unsubscribe[^"\']*)["\'][^>]*>',
-            r'https?://[^\s]*unsubscribe[^\s]*',
-        ]
-        
-        for pattern in unsubscribe_patterns:
-            match = re.search(pattern, content, re.IGNORECASE)
-            if match:
-                return match.group(1) if pattern.startswith('<a') else match.group(0)
-        
-        return None
\ No newline at end of file
+        match = self.unsubscribe_link_pattern.search(content)
+        if match:
+            return match.group('href') or match.group('url')
+        return None
+
+
+# Per-process state for EmailProcessor._process_batch_in_processes
+_worker_processor: Optional[EmailProcessor] = None
+
+
+def _init_worker(critical_senders: Set[str]) -> None:
+    global _worker_processor
+    _worker_processor = EmailProcessor()
+    _worker_processor.critical_senders = critical_senders
+
+
+def _classify_in_worker(message: Dict) -> Optional[Dict]:
+    """Classify a message and return its classification fields."""
+    try:
+        processed_email = _worker_processor._process_classified(message)
+    except Exception:
+        return None
+    return {name: getattr(processed_email, name) for name in CLASSIFICATION_DEFAULTS}
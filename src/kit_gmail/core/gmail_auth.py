@@ -6,10 +6,12 @@ from pathlib import Path
 from typing import Optional
 
 import keyring
+import orjson
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.model import JsonModel
 
 from ..utils.config import settings
 from ..utils.logger import get_logger
@@ -24,6 +26,24 @@ SCOPES = [
 ]
 
 
+
+class OrjsonModel(JsonModel):
+    """JsonModel that parses responses with orjson.
+    
+    Full-format messages carry large base64 payloads, and parsing them with
+    the stdlib json module is a noticeable share of fetch CPU time.
+    """
+
+    def deserialize(self, content):
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return super().deserialize(content)
+        if self._data_wrapper and isinstance(body, dict) and "data" in body:
+            body = body["data"]
+        return body
+
+
 class GmailAuth:
     """Handles Gmail API authentication and credential management."""
 
@@ -32,6 +52,11 @@ class GmailAuth:
         self.token_file = Path.home() / ".kit_gmail" / "token.json"
         self.credentials_file.parent.mkdir(exist_ok=True)
         self._creds: Optional[Credentials] = None
+        # Modification time of the token file the credentials were loaded from
+        self._token_mtime: Optional[float] = None
+        # Gmail service built for the current credentials
+        self._service = None
+        self._service_creds: Optional[Credentials] = None
 
     def setup_credentials(self, credentials_json_path: str) -> None:
         """Copy OAuth2 credentials from Google Cloud Console to local storage."""
@@ -85,14 +110,53 @@ class GmailAuth:
             logger.info("Saved new credentials")
 
         self._creds = creds
+        self._token_mtime = self._get_token_mtime()
         return creds
 
+    def _get_token_mtime(self) -> Optional[float]:
+        """Return the token file's modification time, or None if missing."""
+        try:
+            return self.token_file.stat().st_mtime
+        except OSError:
+            return None
+
     def get_gmail_service(self):
         """Get authenticated Gmail API service."""
         if not self._creds:
             self.authenticate()
         
-        service = build("gmail", "v1", credentials=self._creds)
+        # Building the service parses the discovery document, so reuse it
+        # until the credentials change
+        if self._service is None or self._service_creds is not self._creds:
+            self._service = self.build_gmail_service()
+            self._service_creds = self._creds
+        return self._service
+
+    def get_access_token(self) -> str:
+        """Return a valid OAuth2 access token for direct REST calls."""
+        if not self._creds:
+            self.authenticate()
+        if not self._creds.valid:
+            self._creds.refresh(Request())
+        return self._creds.token
+
+    def build_gmail_service(self):
+        """Build a new Gmail API service with its own HTTP connection.
+        
+        Services are not thread-safe; use this to give each worker thread
+        its own instance.
+        """
+        if not self._creds:
+            self.authenticate()
+        
+        service = build(
+            "gmail",
+            "v1",
+            credentials=self._creds,
+            cache_discovery=False,
+            static_discovery=True,
+            model=OrjsonModel(),
+        )
         logger.debug("Created Gmail API service")
         return service
 
@@ -112,19 +176,27 @@ class GmailAuth:
                 logger.info(f"Deleted {file_path}")
 
         self._creds = None
+        self._token_mtime = None
+        self._service = None
+        self._service_creds = None
 
     @property
     def is_authenticated(self) -> bool:
         """Check if user is currently authenticated."""
-        if not self._creds:
-            if self.token_file.exists():
-                try:
-                    self._creds = Credentials.from_authorized_user_file(
-                        str(self.token_file), SCOPES
-                    )
-                except Exception:
-                    return False
-            else:
+        token_mtime = self._get_token_mtime()
+        
+        # Only re-read the token file when it is new or has changed on disk
+        if not self._creds or (
+            token_mtime is not None and token_mtime != self._token_mtime
+        ):
+            if token_mtime is None:
+                return False
+            try:
+                self._creds = Credentials.from_authorized_user_file(
+                    str(self.token_file), SCOPES
+                )
+                self._token_mtime = token_mtime
+            except Exception:
                 return False
         
         return self._creds.valid if self._creds else False
\ No newline at end of file
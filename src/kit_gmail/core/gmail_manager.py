@@ -1,28 +1,150 @@
 """Main Gmail management functionality."""
 
 import asyncio
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Set, Tuple
-
+import math
+import queue
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+import httpx
+import orjson
 from googleapiclient.errors import HttpError
 
 from .gmail_auth import GmailAuth
-from .email_processor import EmailProcessor
+from .email_processor import CRITICAL_BIT, JUNK_BIT, MAILING_LIST_BIT, RECEIPT_BIT, EmailProcessor
 from ..services.ai_service import AIService
 from ..utils.config import settings
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Mailbox statistics are cached per account at module level so that separate
+# GmailManager instances in one process (e.g. ``status`` and ``dashboard``)
+# share a recent result instead of re-issuing every labels request.
+MAILBOX_STATS_TTL = 30.0
+_mailbox_stats_cache: Dict[str, Tuple[float, Dict]] = {}
+
+# Gmail rejects batch requests with more than 100 inner calls.
+GMAIL_BATCH_LIMIT = 100
+
+# messages.get costs 5 quota units; concurrent batch fetches are capped so
+# they stay under settings.gmail_quota_units_per_sec.
+MESSAGE_GET_QUOTA_UNITS = 5
+MAX_FETCH_WORKERS = 10
+
+# messages.batchModify and batchDelete accept at most 1000 ids per call
+GMAIL_BULK_LIMIT = 1000
+
+# Async message fetches go straight to the REST API over one pooled client
+GMAIL_API_URL = "https://gmail.googleapis.com/gmail/v1/users/me"
+
+# Rate limiting and transient server errors are retried with exponential
+# backoff and jitter; anything else fails immediately.
+RETRIABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+MAX_RETRIES = 6
+MAX_BACKOFF = 60.0
+
+# Cleanup processes at most this many of the newest matching messages
+CLEANUP_MAX_MESSAGES = 1000
+
+# Classification bits that _plan_labels turns into labels
+LABELLED_BITS = RECEIPT_BIT | MAILING_LIST_BIT | CRITICAL_BIT
+INBOX_ONLY = frozenset({"INBOX"})
+
+
+def _copy_stats(stats: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, int]]:
+    """Copy mailbox stats so callers never mutate the cached entry."""
+    return {name: dict(counts) for name, counts in stats.items()}
+
+
+def clear_mailbox_stats_cache() -> None:
+    """Drop any cached mailbox statistics."""
+    _mailbox_stats_cache.clear()
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Seconds to wait before retry number ``attempt`` (0-based)."""
+    return min(MAX_BACKOFF, 2 ** attempt + random.uniform(0, 1))
+
+
+def _is_retriable(error: Exception) -> bool:
+    """Whether a Gmail API error is worth retrying."""
+    return isinstance(error, HttpError) and error.resp.status in RETRIABLE_STATUSES
+
+
+class _QuotaPacer:
+    """Token bucket pacing async requests to the per-second quota.
+    
+    Used as an httpx request hook, so retries are paced too. The bucket
+    holds one second of quota, which allows a short initial burst.
+    """
+
+    def __init__(self, units_per_sec: float, units_per_request: int) -> None:
+        self._rate = float(units_per_sec)
+        self._cost = units_per_request
+        self._allowance = self._rate
+        self._updated = time.monotonic()
+        # Created on first use so it binds to the running loop (Python 3.9
+        # binds a lock to the loop current at construction)
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def wait(self, request: httpx.Request) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            now = time.monotonic()
+            self._allowance = min(self._rate, self._allowance + (now - self._updated) * self._rate)
+            self._updated = now
+            if self._allowance < self._cost:
+                await asyncio.sleep((self._cost - self._allowance) / self._rate)
+                self._allowance = self._cost
+                self._updated = time.monotonic()
+            self._allowance -= self._cost
+
+
+def _execute_with_retry(request, max_retries: int = MAX_RETRIES):
+    """Execute a Gmail API request, retrying rate limits and server errors."""
+    for attempt in range(max_retries + 1):
+        try:
+            return request.execute()
+        except HttpError as error:
+            if attempt == max_retries or not _is_retriable(error):
+                raise
+            delay = _backoff_delay(attempt)
+            logger.warning(
+                f"Gmail API returned {error.resp.status}, retrying in {delay:.1f}s"
+            )
+            time.sleep(delay)
+
 
 class GmailManager:
     """Main class for managing Gmail operations."""
 
+    # Partial responses for callers that only need headers and labels
+    METADATA_HEADERS = [
+        "From", "To", "Cc", "Bcc", "Subject", "Date",
+        "List-Id", "List-Unsubscribe", "Mailing-List", "X-Mailing-List",
+        "Auto-Submitted", "X-Auto-Response-Suppress", "X-Autoreply",
+    ]
+    METADATA_FIELDS = "id,threadId,historyId,labelIds,snippet,internalDate,sizeEstimate,payload/headers"
+
     def __init__(self) -> None:
         self.auth = GmailAuth()
         self.processor = EmailProcessor()
         self.ai_service = AIService()
         self._service = None
+        # Idle Gmail services for concurrent batch fetches. Each keeps its
+        # own keep-alive connection, so reusing them across calls skips a
+        # TLS handshake per worker
+        self._service_pool: "queue.SimpleQueue" = queue.SimpleQueue()
+        # Cached API resources, rebuilt whenever the service changes
+        self._resources_service = None
+        self._messages_resource = None
+        self._labels_resource = None
+        # Label name -> id, loaded on first use and kept current on create
+        self._label_cache: Optional[Dict[str, str]] = None
 
     @property
     def service(self):
@@ -31,6 +153,28 @@ class GmailManager:
             self._service = self.auth.get_gmail_service()
         return self._service
 
+    @property
+    def _messages(self):
+        """The users().messages() resource of the current service."""
+        self._ensure_resources()
+        return self._messages_resource
+
+    @property
+    def _labels(self):
+        """The users().labels() resource of the current service."""
+        self._ensure_resources()
+        return self._labels_resource
+
+    def _ensure_resources(self) -> None:
+        # Resource objects are built by reflection on every users() call, so
+        # keep them until the service itself is replaced
+        service = self.service
+        if self._resources_service is not service:
+            users = service.users()
+            self._messages_resource = users.messages()
+            self._labels_resource = users.labels()
+            self._resources_service = service
+
     def get_messages(
         self,
         query: str = "",
@@ -38,40 +182,76 @@ class GmailManager:
         label_ids: Optional[List[str]] = None,
     ) -> List[Dict]:
         """Retrieve messages from Gmail."""
+        messages = []
+        for page in self._iter_message_pages(query, max_results, label_ids):
+            messages.extend(page)
+
+        logger.info(f"Retrieved {len(messages)} messages")
+        return messages
+
+    def get_message_ids(
+        self,
+        query: str = "",
+        max_results: Optional[int] = 100,
+        label_ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        """Retrieve the ids of messages matching ``query``.
+        
+        Cheaper than get_messages when thread ids are not needed: the listing
+        response is trimmed to ids and no per-message dicts are kept.
+        """
+        message_ids: List[str] = []
+        for page in self._iter_message_pages(query, max_results, label_ids, ids_only=True):
+            message_ids.extend(page)
+
+        logger.info(f"Retrieved {len(message_ids)} message ids")
+        return message_ids
+
+    def _iter_message_pages(
+        self,
+        query: str = "",
+        max_results: Optional[int] = 100,
+        label_ids: Optional[List[str]] = None,
+        ids_only: bool = False,
+    ) -> Iterator[List]:
+        """Yield pages of at most 100 message stubs as they are listed.
+        
+        With ``ids_only`` pages are lists of message id strings.
+        """
+        fields = "messages/id,nextPageToken" if ids_only else None
         try:
-            messages = []
+            retrieved = 0
             page_token = None
             
-            while max_results is None or len(messages) < max_results:
+            while max_results is None or retrieved < max_results:
                 batch_size = 100
                 if max_results is not None:
-                    batch_size = min(100, max_results - len(messages))
+                    batch_size = min(100, max_results - retrieved)
                 
-                results = (
-                    self.service.users()
-                    .messages()
-                    .list(
+                results = _execute_with_retry(
+                    self._messages.list(
                         userId="me",
                         q=query,
                         labelIds=label_ids,
                         maxResults=batch_size,
                         pageToken=page_token,
+                        fields=fields,
                     )
-                    .execute()
                 )
 
                 batch_messages = results.get("messages", [])
                 if not batch_messages:
                     break
 
-                messages.extend(batch_messages)
+                retrieved += len(batch_messages)
+                if ids_only:
+                    yield [m["id"] for m in batch_messages]
+                else:
+                    yield batch_messages
                 page_token = results.get("nextPageToken")
                 if not page_token:
                     break
 
-            logger.info(f"Retrieved {len(messages)} messages")
-            return messages
-
         except HttpError as error:
             logger.error(f"Failed to retrieve messages: {error}")
             raise
@@ -85,17 +265,14 @@ class GmailManager:
     ) -> Dict:
         """Retrieve a single page of messages from Gmail."""
         try:
-            results = (
-                self.service.users()
-                .messages()
-                .list(
+            results = _execute_with_retry(
+                self._messages.list(
                     userId="me",
                     q=query,
                     labelIds=label_ids,
                     maxResults=max_results,
                     pageToken=page_token,
                 )
-                .execute()
             )
             
             batch_messages = results.get("messages", [])
@@ -110,42 +287,233 @@ class GmailManager:
             logger.error(f"Failed to retrieve messages: {error}")
             raise
 
-    def get_message_details(self, message_id: str) -> Dict:
+    def _message_params(self, full: bool) -> Dict:
+        """Query parameters for messages.get.
+        
+        ``full`` returns the whole MIME payload, which classification needs;
+        otherwise only headers, labels and the snippet are transferred.
+        """
+        if full:
+            return {"format": "full"}
+        return {
+            "format": "metadata",
+            "metadataHeaders": self.METADATA_HEADERS,
+            "fields": self.METADATA_FIELDS,
+        }
+
+    def get_message_details(self, message_id: str, full: bool = True) -> Dict:
         """Get detailed information about a specific message."""
         try:
-            message = (
-                self.service.users()
-                .messages()
-                .get(userId="me", id=message_id, format="full")
-                .execute()
+            message = _execute_with_retry(
+                self._messages.get(userId="me", id=message_id, **self._message_params(full))
             )
             return message
         except HttpError as error:
             logger.error(f"Failed to get message details for {message_id}: {error}")
             raise
 
-    def batch_get_messages(self, message_ids: List[str]) -> List[Dict]:
-        """Efficiently retrieve multiple message details."""
+    def batch_get_messages(self, message_ids: List[str], full: bool = True) -> List[Dict]:
+        """Efficiently retrieve multiple message details.
+        
+        Each chunk of ids is fetched in one batched HTTP request, and chunks
+        run concurrently on a small thread pool sized to the Gmail quota.
+        Messages that fail are logged and skipped. Results keep the order of
+        ``message_ids``. Pass ``full=False`` to fetch only metadata.
+        """
+        batch_size = max(1, min(settings.max_email_batch_size, GMAIL_BATCH_LIMIT))
+        chunks = [
+            message_ids[i : i + batch_size]
+            for i in range(0, len(message_ids), batch_size)
+        ]
+        if len(chunks) <= 1:
+            return self._fetch_message_chunk(self.service, chunks[0], 1, full) if chunks else []
+        
+        max_workers = min(
+            MAX_FETCH_WORKERS,
+            math.ceil(settings.gmail_quota_units_per_sec / MESSAGE_GET_QUOTA_UNITS),
+            len(chunks),
+        )
+        results: Dict[int, List[Dict]] = {}
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {
+                executor.submit(self._fetch_message_chunk_threaded, chunk, number, full): number
+                for number, chunk in enumerate(chunks, 1)
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        
         messages = []
-        batch_size = settings.max_email_batch_size
+        for number in range(1, len(chunks) + 1):
+            messages.extend(results[number])
+        return messages
+
+    async def abatch_get_messages(self, message_ids: List[str], full: bool = True) -> List[Dict]:
+        """Retrieve multiple message details concurrently without blocking the loop.
         
-        for i in range(0, len(message_ids), batch_size):
-            batch = message_ids[i : i + batch_size]
-            batch_messages = []
-            
-            for msg_id in batch:
-                try:
-                    message = self.get_message_details(msg_id)
-                    batch_messages.append(message)
-                except HttpError as e:
-                    logger.warning(f"Failed to get message {msg_id}: {e}")
-                    continue
-            
-            messages.extend(batch_messages)
-            logger.debug(f"Processed batch {i//batch_size + 1}, got {len(batch_messages)} messages")
+        Requests go to the Gmail REST API over a pooled async HTTP client.
+        Messages that fail are logged and skipped; results keep the order of
+        ``message_ids``.
+        """
+        if not message_ids:
+            return []
+        
+        token = await asyncio.to_thread(self.auth.get_access_token)
+        async with self._async_client(token) as client:
+            return await self._agather_messages(client, message_ids, full)
 
+    async def afetch_messages(
+        self, query: str = "", max_results: Optional[int] = 100
+    ) -> List[Dict]:
+        """List messages matching ``query`` and fetch their details.
+        
+        Listing runs in a worker thread and feeds pages through a small queue,
+        so details for one page are fetched while the next page is listed.
+        Results keep listing order.
+        """
+        pages: "asyncio.Queue[Optional[List[str]]]" = asyncio.Queue(maxsize=2)
+
+        async def produce() -> None:
+            page_iter = self._iter_message_pages(query, max_results, ids_only=True)
+            try:
+                while True:
+                    page = await asyncio.to_thread(next, page_iter, None)
+                    if page is None:
+                        break
+                    await pages.put(page)
+            finally:
+                await pages.put(None)
+
+        token = await asyncio.to_thread(self.auth.get_access_token)
+        async with self._async_client(token) as client:
+            producer = asyncio.create_task(produce())
+            fetches = []
+            while True:
+                page = await pages.get()
+                if page is None:
+                    break
+                fetches.append(asyncio.create_task(
+                    self._agather_messages(client, page)
+                ))
+            try:
+                await producer
+            finally:
+                results = await asyncio.gather(*fetches)
+        
+        messages = [message for page_messages in results for message in page_messages]
+        logger.info(f"Fetched {len(messages)} messages")
         return messages
 
+    def _async_client(self, token: str) -> httpx.AsyncClient:
+        """Create a pooled async client authorized for the Gmail REST API.
+        
+        Concurrency is capped by the connection pool and requests are paced
+        to the quota, so wide fan-outs saturate the quota instead of
+        tripping 429 retry storms.
+        """
+        pacer = _QuotaPacer(settings.gmail_quota_units_per_sec, MESSAGE_GET_QUOTA_UNITS)
+        return httpx.AsyncClient(
+            base_url=GMAIL_API_URL,
+            headers={"Authorization": f"Bearer {token}"},
+            limits=httpx.Limits(max_connections=settings.gmail_max_concurrent_requests),
+            event_hooks={"request": [pacer.wait]},
+            timeout=30.0,
+        )
+
+    async def _agather_messages(
+        self, client: httpx.AsyncClient, message_ids: List[str], full: bool = True
+    ) -> List[Dict]:
+        """Fetch messages concurrently, dropping the ones that failed."""
+        params = self._message_params(full)
+        results = await asyncio.gather(
+            *(self._aget_message(client, msg_id, params) for msg_id in message_ids)
+        )
+        messages = [message for message in results if message is not None]
+        logger.debug(f"Fetched {len(messages)} of {len(message_ids)} messages")
+        return messages
+
+    async def _aget_message(
+        self, client: httpx.AsyncClient, message_id: str, params: Dict
+    ) -> Optional[Dict]:
+        """Fetch one message with the async client, or None on failure."""
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                response = await client.get(f"/messages/{message_id}", params=params)
+                if response.status_code in RETRIABLE_STATUSES and attempt < MAX_RETRIES:
+                    await asyncio.sleep(_backoff_delay(attempt))
+                    continue
+                response.raise_for_status()
+                return orjson.loads(response.content)
+            except httpx.HTTPError as e:
+                logger.warning(f"Failed to get message {message_id}: {e}")
+                return None
+
+    def _fetch_message_chunk_threaded(
+        self, message_ids: List[str], chunk_number: int, full: bool = True
+    ) -> List[Dict]:
+        """Fetch a chunk using a Gmail service no other thread is using.
+        
+        The underlying httplib2 connection is not thread-safe, so services
+        are checked out of the pool for the duration of a chunk.
+        """
+        try:
+            service = self._service_pool.get_nowait()
+        except queue.Empty:
+            service = self.auth.build_gmail_service()
+        try:
+            return self._fetch_message_chunk(service, message_ids, chunk_number, full)
+        finally:
+            self._service_pool.put(service)
+
+    def _fetch_message_chunk(
+        self, service, message_ids: List[str], chunk_number: int, full: bool = True
+    ) -> List[Dict]:
+        """Fetch up to one batch of messages in a single batched HTTP request.
+        
+        Messages rejected with a retriable status are re-sent in a smaller
+        batch after a backoff delay.
+        """
+        results: Dict[int, Dict] = {}
+        pending = list(range(len(message_ids)))
+        messages_api = service.users().messages()
+        params = self._message_params(full)
+        
+        for attempt in range(MAX_RETRIES + 1):
+            retry: List[int] = []
+            final_attempt = attempt == MAX_RETRIES
+
+            def _collect(request_id, response, exception):
+                position = int(request_id)
+                if exception is None:
+                    results[position] = response
+                elif _is_retriable(exception) and not final_attempt:
+                    retry.append(position)
+                else:
+                    logger.warning(f"Failed to get message {message_ids[position]}: {exception}")
+
+            # Request ids are positions, since a batch rejects duplicate ids
+            batch = service.new_batch_http_request(callback=_collect)
+            for position in pending:
+                batch.add(
+                    messages_api.get(userId="me", id=message_ids[position], **params),
+                    request_id=str(position),
+                )
+            try:
+                batch.execute()
+            except HttpError as e:
+                if final_attempt or not _is_retriable(e):
+                    logger.warning(f"Failed to get batch {chunk_number}: {e}")
+                    break
+                retry = [position for position in pending if position not in results]
+            
+            if not retry:
+                break
+            pending = sorted(retry)
+            time.sleep(_backoff_delay(attempt))
+        
+        batch_messages = [results[position] for position in sorted(results)]
+        logger.debug(f"Processed batch {chunk_number}, got {len(batch_messages)} messages")
+        return batch_messages
+
     def cleanup_mailbox(
         self,
         days_old: int = 30,
@@ -162,41 +530,105 @@ class GmailManager:
             "organized": 0,
         }
 
-        # Get old messages
-        date_cutoff = datetime.now() - timedelta(days=days_old)
+        # Messages are streamed a page at a time: each page is fetched,
+        # classified and flushed before the next one, so only one page of
+        # full payloads is held in memory.
+        #
+        # The query only selects by age. Every listed message is labelled
+        # and counted, and deleting or archiving depends on the processor's
+        # critical-sender and content checks, so Gmail search operators such
+        # as category:promotions or -is:important cannot decide either
+        # action without losing mail the processor would keep.
         query = f"older_than:{days_old}d"
         
-        old_messages = self.get_messages(query=query, max_results=1000)
-        message_details = self.batch_get_messages([m["id"] for m in old_messages])
+        for page in self._iter_message_pages(
+            query=query, max_results=CLEANUP_MAX_MESSAGES, ids_only=True
+        ):
+            message_details = self.batch_get_messages(page)
+            self._cleanup_page(message_details, delete_junk, archive_old, stats)
+            del message_details
 
-        for message in message_details:
-            stats["processed"] += 1
-            
-            # Process message and determine action
-            processed_email = self.processor.process_email(message)
+        logger.info(f"Mailbox cleanup completed: {stats}")
+        return stats
+
+    def _cleanup_page(
+        self,
+        message_details: List[Dict],
+        delete_junk: bool,
+        archive_old: bool,
+        stats: Dict[str, int],
+    ) -> None:
+        """Classify one page of messages and apply its deletes and label changes.
+        
+        Actions are decided from the batch's flag column; only messages that
+        will be labelled are materialized for their merchant and list names.
+        """
+        batch = self.processor.process_batch(message_details)
+        ids, flags = batch.ids, batch.flags
+        delete_bits = JUNK_BIT if delete_junk else 0
+        stats["processed"] += len(batch)
+
+        # Label changes are grouped by (labels to add, label ids to remove) so
+        # each distinct change is applied with batchModify
+        plans: Dict[Tuple[FrozenSet[str], FrozenSet[str]], List[str]] = {}
+        to_delete: List[str] = []
+
+        for index, mask in enumerate(flags):
+            if mask & delete_bits:
+                to_delete.append(ids[index])
+                continue
             
-            if delete_junk and processed_email.is_junk:
-                self.delete_message(message["id"])
-                stats["deleted"] += 1
-                logger.debug(f"Deleted junk message: {processed_email.subject}")
-                
-            elif archive_old and not processed_email.is_critical:
-                self.archive_message(message["id"])
+            remove_label_ids = frozenset()
+            if archive_old and not mask & CRITICAL_BIT:
+                remove_label_ids = INBOX_ONLY
                 stats["archived"] += 1
-                logger.debug(f"Archived old message: {processed_email.subject}")
             
             # Organize non-deleted messages
-            if not (delete_junk and processed_email.is_junk):
-                self.organize_message(message, processed_email)
-                stats["organized"] += 1
+            add_labels = self._plan_labels(batch[index]) if mask & LABELLED_BITS else []
+            stats["organized"] += 1
+            
+            if add_labels or remove_label_ids:
+                key = (frozenset(add_labels), remove_label_ids)
+                plans.setdefault(key, []).append(ids[index])
+
+        if to_delete:
+            self.batch_delete_messages(to_delete)
+            stats["deleted"] += len(to_delete)
+        logger.debug(
+            f"Cleanup page: {len(to_delete)} to delete, {len(plans)} distinct label changes"
+        )
 
-        logger.info(f"Mailbox cleanup completed: {stats}")
-        return stats
+        self._apply_label_plans(plans)
+
+    def _apply_label_plans(
+        self, plans: Dict[Tuple[FrozenSet[str], FrozenSet[str]], List[str]]
+    ) -> None:
+        """Apply grouped label changes, one batchModify per distinct change."""
+        for (add_labels, remove_label_ids), message_ids in plans.items():
+            add_label_ids = [self.get_or_create_label(name) for name in sorted(add_labels)]
+            self.batch_modify_messages(message_ids, add_label_ids, sorted(remove_label_ids))
 
     def organize_message(self, message: Dict, processed_email) -> None:
         """Organize a message by applying appropriate labels."""
+        labels_to_add = self._plan_labels(processed_email)
+        
+        # Apply labels
+        if labels_to_add:
+            self.modify_message_labels(message["id"], labels_to_add, [])
+
+    def organize_messages(self, processed_emails: Iterable) -> None:
+        """Organize many messages, grouping those that get the same labels."""
+        plans: Dict[Tuple[FrozenSet[str], FrozenSet[str]], List[str]] = {}
+        for processed_email in processed_emails:
+            labels_to_add = self._plan_labels(processed_email)
+            if labels_to_add:
+                key = (frozenset(labels_to_add), frozenset())
+                plans.setdefault(key, []).append(processed_email.message_id)
+        self._apply_label_plans(plans)
+
+    def _plan_labels(self, processed_email) -> List[str]:
+        """Return the names of the labels a processed email should receive."""
         labels_to_add = []
-        labels_to_remove = []
 
         # Receipt organization
         if processed_email.is_receipt:
@@ -214,11 +646,33 @@ class GmailManager:
         if processed_email.is_critical:
             labels_to_add.append("Important")
 
-        # Apply labels
-        if labels_to_add or labels_to_remove:
-            self.modify_message_labels(
-                message["id"], labels_to_add, labels_to_remove
-            )
+        return labels_to_add
+
+    def batch_modify_messages(
+        self,
+        message_ids: List[str],
+        add_label_ids: Optional[List[str]] = None,
+        remove_label_ids: Optional[List[str]] = None,
+    ) -> None:
+        """Apply the same label change to many messages with batchModify."""
+        for i in range(0, len(message_ids), GMAIL_BULK_LIMIT):
+            chunk = message_ids[i : i + GMAIL_BULK_LIMIT]
+            try:
+                _execute_with_retry(
+                    self._messages.batchModify(
+                        userId="me",
+                        body={
+                            "ids": chunk,
+                            "addLabelIds": add_label_ids or [],
+                            "removeLabelIds": remove_label_ids or [],
+                        },
+                    )
+                )
+                logger.debug(f"Modified labels for {len(chunk)} messages")
+            except HttpError as error:
+                if error.resp.status == 404:
+                    self.clear_label_cache()
+                logger.error(f"Failed to modify labels for {len(chunk)} messages: {error}")
 
     def modify_message_labels(
         self,
@@ -245,26 +699,43 @@ class GmailManager:
                     remove_label_ids.append(label_id)
 
         try:
-            self.service.users().messages().modify(
-                userId="me",
-                id=message_id,
-                body={
-                    "addLabelIds": add_label_ids,
-                    "removeLabelIds": remove_label_ids,
-                },
-            ).execute()
+            _execute_with_retry(
+                self._messages.modify(
+                    userId="me",
+                    id=message_id,
+                    body={
+                        "addLabelIds": add_label_ids,
+                        "removeLabelIds": remove_label_ids,
+                    },
+                )
+            )
             logger.debug(f"Modified labels for message {message_id}")
         except HttpError as error:
+            if error.resp.status == 404:
+                # A cached label may have been deleted elsewhere
+                self.clear_label_cache()
             logger.error(f"Failed to modify labels for {message_id}: {error}")
 
+    def _ensure_label_cache(self) -> Dict[str, str]:
+        """Load the label name to id mapping if it is not cached yet."""
+        if self._label_cache is None:
+            labels = _execute_with_retry(self._labels.list(userId="me"))
+            self._label_cache = {
+                label["name"]: label["id"] for label in labels.get("labels", [])
+            }
+        return self._label_cache
+
+    def clear_label_cache(self) -> None:
+        """Forget cached labels so the next lookup refetches them."""
+        self._label_cache = None
+
     def get_or_create_label(self, label_name: str) -> str:
         """Get existing label ID or create new label."""
         try:
             # Try to get existing label
-            labels = self.service.users().labels().list(userId="me").execute()
-            for label in labels.get("labels", []):
-                if label["name"] == label_name:
-                    return label["id"]
+            label_id = self._ensure_label_cache().get(label_name)
+            if label_id:
+                return label_id
 
             # Create new label
             label_object = {
@@ -273,13 +744,11 @@ class GmailManager:
                 "messageListVisibility": "show",
             }
             
-            created_label = (
-                self.service.users()
-                .labels()
-                .create(userId="me", body=label_object)
-                .execute()
+            created_label = _execute_with_retry(
+                self._labels.create(userId="me", body=label_object)
             )
             
+            self._label_cache[label_name] = created_label["id"]
             logger.info(f"Created new label: {label_name}")
             return created_label["id"]
 
@@ -290,19 +759,31 @@ class GmailManager:
     def get_label_id(self, label_name: str) -> Optional[str]:
         """Get label ID by name."""
         try:
-            labels = self.service.users().labels().list(userId="me").execute()
-            for label in labels.get("labels", []):
-                if label["name"] == label_name:
-                    return label["id"]
-            return None
+            return self._ensure_label_cache().get(label_name)
         except HttpError as error:
             logger.error(f"Failed to get label ID for {label_name}: {error}")
             return None
 
+    def batch_delete_messages(self, message_ids: List[str]) -> None:
+        """Permanently delete many messages with batchDelete."""
+        for i in range(0, len(message_ids), GMAIL_BULK_LIMIT):
+            chunk = message_ids[i : i + GMAIL_BULK_LIMIT]
+            try:
+                _execute_with_retry(
+                    self._messages.batchDelete(
+                        userId="me", body={"ids": chunk}
+                    )
+                )
+                logger.debug(f"Deleted {len(chunk)} messages")
+            except HttpError as error:
+                logger.error(f"Failed to delete {len(chunk)} messages: {error}")
+
     def delete_message(self, message_id: str) -> None:
         """Permanently delete a message."""
         try:
-            self.service.users().messages().delete(userId="me", id=message_id).execute()
+            _execute_with_retry(
+                self._messages.delete(userId="me", id=message_id)
+            )
             logger.debug(f"Deleted message {message_id}")
         except HttpError as error:
             logger.error(f"Failed to delete message {message_id}: {error}")
@@ -310,62 +791,114 @@ class GmailManager:
     def archive_message(self, message_id: str) -> None:
         """Archive a message (remove from inbox)."""
         try:
-            self.service.users().messages().modify(
-                userId="me",
-                id=message_id,
-                body={"removeLabelIds": ["INBOX"]},
-            ).execute()
+            _execute_with_retry(
+                self._messages.modify(
+                    userId="me",
+                    id=message_id,
+                    body={"removeLabelIds": ["INBOX"]},
+                )
+            )
             logger.debug(f"Archived message {message_id}")
         except HttpError as error:
             logger.error(f"Failed to archive message {message_id}: {error}")
 
+    def archive_messages(self, message_ids: List[str]) -> None:
+        """Archive many messages with batchModify."""
+        self.batch_modify_messages(message_ids, remove_label_ids=["INBOX"])
+
     async def generate_email_summary(
-        self, days: int = 7, summary_type: str = "daily"
+        self,
+        days: int = 7,
+        summary_type: str = "daily",
+        provider_name: Optional[str] = None,
+        stream_callback: Optional[Callable[[str], None]] = None,
     ) -> str:
-        """Generate AI-powered email summary."""
+        """Generate AI-powered email summary.
+
+        ``stream_callback`` receives the summary text as it is generated.
+        """
         logger.info(f"Generating {summary_type} email summary for {days} days")
         
+        # Connect to the AI provider while the messages download
+        warmup = asyncio.ensure_future(self.ai_service.warmup(provider_name))
+
         # Get recent messages
         query = f"newer_than:{days}d"
-        messages = self.get_messages(query=query, max_results=200)
-        message_details = self.batch_get_messages([m["id"] for m in messages])
+        try:
+            message_details = await self.afetch_messages(query=query, max_results=200)
+        except BaseException:
+            warmup.cancel()
+            raise
+        await warmup
 
         # Process emails for summary
-        processed_emails = []
-        for message in message_details:
-            processed_email = self.processor.process_email(message)
-            processed_emails.append(processed_email)
+        processed_emails = list(self.processor.process_batch(message_details))
 
         # Generate AI summary
         summary = await self.ai_service.generate_email_summary(
-            processed_emails, days, summary_type
+            processed_emails,
+            days,
+            summary_type,
+            provider_name=provider_name,
+            stream_callback=stream_callback,
         )
         
         logger.info("Email summary generated successfully")
         return summary
 
-    def get_mailbox_stats(self) -> Dict[str, int]:
+    def get_labels_batch(self, label_ids: List[str]) -> Dict[str, Dict[str, int]]:
+        """Get statistics for several labels using batched HTTP requests."""
+        stats = {}
+
+        def _collect(request_id, response, exception):
+            if exception is not None:
+                logger.warning(f"Failed to get label {request_id}: {exception}")
+                return
+            stats[request_id] = {
+                "messages_total": response.get("messagesTotal", 0),
+                "messages_unread": response.get("messagesUnread", 0),
+                "threads_total": response.get("threadsTotal", 0),
+                "threads_unread": response.get("threadsUnread", 0),
+            }
+
+        for i in range(0, len(label_ids), GMAIL_BATCH_LIMIT):
+            batch = self.service.new_batch_http_request()
+            for label_id in label_ids[i : i + GMAIL_BATCH_LIMIT]:
+                batch.add(
+                    self._labels.get(userId="me", id=label_id),
+                    callback=_collect,
+                    request_id=label_id,
+                )
+            batch.execute()
+
+        return stats
+
+    def get_mailbox_stats(self, use_cache: bool = True) -> Dict[str, int]:
         """Get comprehensive mailbox statistics."""
+        cache_key = str(self.auth.token_file)
+        if use_cache:
+            cached = _mailbox_stats_cache.get(cache_key)
+            if cached and time.monotonic() - cached[0] < MAILBOX_STATS_TTL:
+                logger.debug("Using cached mailbox stats")
+                return _copy_stats(cached[1])
+
         stats = {}
         
         try:
-            # Get label statistics
-            labels = self.service.users().labels().list(userId="me").execute()
+            # Labels come from the label cache, listed at most once, and
+            # their counts from one batched round trip
+            if not use_cache:
+                self.clear_label_cache()
+            label_names = {
+                label_id: name for name, label_id in self._ensure_label_cache().items()
+            }
+            label_stats = self.get_labels_batch(list(label_names))
             
-            for label in labels.get("labels", []):
-                label_name = label["name"]
-                label_data = (
-                    self.service.users()
-                    .labels()
-                    .get(userId="me", id=label["id"])
-                    .execute()
-                )
-                stats[label_name] = {
-                    "messages_total": label_data.get("messagesTotal", 0),
-                    "messages_unread": label_data.get("messagesUnread", 0),
-                    "threads_total": label_data.get("threadsTotal", 0),
-                    "threads_unread": label_data.get("threadsUnread", 0),
-                }
+            for label_id, label_name in label_names.items():
+                if label_id in label_stats:
+                    stats[label_name] = label_stats[label_id]
+
+            _mailbox_stats_cache[cache_key] = (time.monotonic(), _copy_stats(stats))
 
         except HttpError as error:
             logger.error(f"Failed to get mailbox stats: {error}")
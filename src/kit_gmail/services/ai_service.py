@@ -1,14 +1,26 @@
 """AI service integration for email summarization and analysis."""
 
 import asyncio
+import copy
+import functools
+import hashlib
+import importlib.util
+import os
+import random
+import sqlite3
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, List, Optional, Union
-import json
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import re
 
 import anthropic
 import openai
 import httpx
+import orjson
 
 from ..core.email_processor import ProcessedEmail
 from ..utils.config import settings
@@ -16,244 +28,877 @@ from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# HTTP/2 lets concurrent xAI requests share one connection; it needs the
+# optional h2 package (pip install "kit-gmail[http2]")
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+RETRIABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+MAX_RETRY_DELAY = 30.0
+WARMUP_TIMEOUT = 5.0
+
+
+class _RateLimiter:
+    """Token bucket spacing out requests to one provider.
+    
+    The bucket holds a few seconds' worth of requests, which allows a short
+    burst before requests are paced at the configured rate.
+    """
+    
+    def __init__(self, requests_per_minute: float, burst: float = 5.0) -> None:
+        self._rate = requests_per_minute / 60.0
+        self._capacity = max(1.0, min(burst, float(requests_per_minute)))
+        self._allowance = self._capacity
+        self._updated = time.monotonic()
+        # Providers are built outside the event loop; on Python 3.9 a lock
+        # binds to the loop current when it is created
+        self._lock: Optional[asyncio.Lock] = None
+    
+    async def acquire(self) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            now = time.monotonic()
+            self._allowance = min(self._capacity, self._allowance + (now - self._updated) * self._rate)
+            self._updated = now
+            if self._allowance < 1.0:
+                await asyncio.sleep((1.0 - self._allowance) / self._rate)
+                self._allowance = 1.0
+                self._updated = time.monotonic()
+            self._allowance -= 1.0
+
+
+def _retry_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    """Seconds to wait before retry number ``attempt`` (0-based).
+    
+    A Retry-After header in seconds wins over jittered exponential backoff.
+    """
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(MAX_RETRY_DELAY, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+    return min(MAX_RETRY_DELAY, random.uniform(0, 2 ** (attempt + 1)))
+
+# Provider responses are cached on a hash of the model and everything the
+# prompt is built from, so resubmitting the same email or summary request
+# skips the API call. When settings.ai_response_cache_path is set, entries
+# are also written to an SQLite file so later runs of the CLI can reuse them.
+RESPONSE_CACHE_SIZE = 10_000
+RESPONSE_CACHE_TTL = 3600.0
+_response_cache: "OrderedDict[bytes, Tuple[float, Any]]" = OrderedDict()
+
+# Receives summary text chunks as the provider streams them
+StreamCallback = Callable[[str], None]
+
+
+class _DiskResponseCache:
+    """SQLite table keeping cached responses between runs.
+    
+    Entries carry a wall-clock expiry; expired rows are skipped on read and
+    deleted when the table is opened. Responses quote email content, so the
+    file is only readable by its owner, and the one connection is shared
+    between threads under a lock.
+    """
+    
+    def __init__(self, path: str) -> None:
+        self.path = str(Path(path).expanduser())
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+    
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            # SQLite creates its WAL and shared-memory files with the
+            # database file's permissions
+            os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600))
+            os.chmod(self.path, 0o600)
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key BLOB PRIMARY KEY, expires_at REAL NOT NULL, value BLOB NOT NULL)"
+            )
+            conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+            self._conn = conn
+        return self._conn
+    
+    def get(self, key: bytes) -> Any:
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT value FROM responses WHERE key = ? AND expires_at > ?", (key, time.time())
+                ).fetchone()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Response cache read failed: {e}")
+            return None
+        return orjson.loads(row[0]) if row else None
+    
+    def put(self, key: bytes, value: Any, ttl: float) -> None:
+        try:
+            data = orjson.dumps(value)
+            with self._lock:
+                self._connect().execute(
+                    "INSERT OR REPLACE INTO responses (key, expires_at, value) VALUES (?, ?, ?)",
+                    (key, time.time() + ttl, data),
+                )
+        except (sqlite3.Error, OSError, TypeError) as e:
+            logger.warning(f"Response cache write failed: {e}")
+    
+    def clear(self) -> None:
+        try:
+            with self._lock:
+                self._connect().execute("DELETE FROM responses")
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Response cache clear failed: {e}")
+
+
+_disk_caches: Dict[str, _DiskResponseCache] = {}
+
+
+def _disk_cache() -> Optional[_DiskResponseCache]:
+    """The persistent response cache, or None when it is disabled."""
+    path = settings.ai_response_cache_path
+    if not path:
+        return None
+    cache = _disk_caches.get(path)
+    if cache is None:
+        cache = _disk_caches[path] = _DiskResponseCache(path)
+    return cache
+
+
+def _cache_get(cache: "OrderedDict[bytes, Tuple[float, Any]]", key: bytes) -> Any:
+    """Look ``key`` up in a memory cache, then on disk."""
+    cached = cache.get(key)
+    if cached is not None and time.monotonic() - cached[0] < RESPONSE_CACHE_TTL:
+        cache.move_to_end(key)
+        return cached[1]
+    disk = _disk_cache()
+    value = disk.get(key) if disk is not None else None
+    if value is not None:
+        _cache_put(cache, key, value, persist=False)
+    return value
+
+
+def _cache_put(
+    cache: "OrderedDict[bytes, Tuple[float, Any]]", key: bytes, value: Any, persist: bool = True
+) -> None:
+    """Store ``value`` in a memory cache and, with ``persist``, on disk."""
+    cache[key] = (time.monotonic(), value)
+    cache.move_to_end(key)
+    if len(cache) > RESPONSE_CACHE_SIZE:
+        cache.popitem(last=False)
+    disk = _disk_cache() if persist else None
+    if disk is not None:
+        disk.put(key, value, RESPONSE_CACHE_TTL)
+
+
+def clear_response_cache(persistent: bool = False) -> None:
+    """Drop all cached provider responses, including the on-disk copies with ``persistent``."""
+    _response_cache.clear()
+    if persistent:
+        disk = _disk_cache()
+        if disk is not None:
+            disk.clear()
+
+
+def _response_cache_key(*parts: Any) -> bytes:
+    data = "\x1f".join(str(part) for part in parts).encode("utf-8", "surrogatepass")
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _cached_response(key_parts: Callable[..., tuple]):
+    """Cache a provider coroutine's results on the values ``key_parts`` returns.
+    
+    Error results are not cached, and callers get a copy so they can annotate
+    it freely. A cached summary is handed to ``stream_callback`` in one chunk.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            key = _response_cache_key(
+                type(self).__name__, *key_parts(self, *args, **kwargs)
+            )
+            cached = _cache_get(_response_cache, key)
+            if cached is not None:
+                stream_callback = kwargs.get("stream_callback")
+                if stream_callback is not None:
+                    stream_callback(cached)
+                return copy.copy(cached)
+            
+            result = await method(self, *args, **kwargs)
+            if not (isinstance(result, dict) and "error" in result):
+                _cache_put(_response_cache, key, result)
+            return copy.copy(result)
+        return wrapper
+    return decorator
+
+
+# Templated mail (receipts, newsletters) differs mostly in numbers: totals,
+# dates, order ids, per-recipient tracking links. Analyses are shared between
+# emails from the same sender whose subject and body match once URLs, digits
+# and whitespace are normalized.
+TEMPLATE_URL_PATTERN = re.compile(r'https?://\S+')
+TEMPLATE_NUMBER_PATTERN = re.compile(r'\d+')
+TEMPLATE_SPACE_PATTERN = re.compile(r'\s+')
+
+
+def _normalize_template(text: str) -> str:
+    text = TEMPLATE_URL_PATTERN.sub('<url>', text.lower())
+    text = TEMPLATE_NUMBER_PATTERN.sub('0', text)
+    return TEMPLATE_SPACE_PATTERN.sub(' ', text).strip()
+
+
+def _template_key(provider: "AIProvider", email: ProcessedEmail) -> bytes:
+    return _response_cache_key(
+        type(provider).__name__,
+        getattr(provider, "analysis_model", None),
+        email.sender.lower(),
+        _normalize_template(email.subject),
+        _normalize_template(_analysis_body(email)),
+    )
+
+
+# Emails the processor already classified with confidence get a rule-based
+# analysis; only critical and unclassified mail is sent to a provider
+AUTOMATED_SENDER_PATTERN = re.compile(
+    r'^(?:no[-_.]?reply|do[-_.]?not[-_.]?reply|notifications?|mailer-daemon)@', re.IGNORECASE
+)
+
+
+def _local_analysis(email: ProcessedEmail) -> Optional[Dict[str, any]]:
+    """A rule-based analysis for obvious emails, or None to ask a provider."""
+    if email.is_critical:
+        return None
+    if email.is_receipt:
+        category, topics, action = "automated", ["receipt"], "File for your records"
+        if email.merchant:
+            topics.append(email.merchant)
+    elif email.is_junk or email.is_promotional:
+        category, topics, action = "promotional", ["promotion"], "Archive or unsubscribe"
+    elif email.is_mailing_list:
+        category, topics, action = "promotional", ["newsletter"], "Read later or unsubscribe"
+        if email.list_name:
+            topics.append(email.list_name)
+    elif email.is_automated or AUTOMATED_SENDER_PATTERN.match(email.sender):
+        category, topics, action = "automated", ["notification"], "No action needed"
+    else:
+        return None
+    return {
+        "sentiment": "neutral",
+        "category": category,
+        "priority": "low",
+        "topics": topics,
+        "action": action,
+        "source": "local",
+    }
+
+
+# Static instructions go first, in the system prompt, and only the email itself
+# goes in the user message, so providers can reuse the cached prompt prefix
+ANALYST_SYSTEM_PROMPT = "You are an email analyst. Always return valid JSON."
+
+ANALYSIS_FIELDS = """- sentiment: positive/negative/neutral
+- category: personal/business/promotional/automated
+- priority: high/medium/low
+- topics: array of key topics
+- action: recommended action"""
+
+ANALYSIS_INSTRUCTIONS = f"""{ANALYST_SYSTEM_PROMPT}
+
+Analyze the email in the user message and return insights as a JSON object with:
+{ANALYSIS_FIELDS}"""
+
+BATCH_ANALYSIS_INSTRUCTIONS = f"""{ANALYST_SYSTEM_PROMPT}
+
+Analyze each of the numbered emails in the user message. Return a JSON object of
+the form {{"results": [...]}} where "results" holds exactly one object per email,
+in the order given, each with:
+{ANALYSIS_FIELDS}"""
+
+# Provider-native structured output, so replies always parse
+EMAIL_ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "sentiment": {"type": "string", "enum": ["positive", "negative", "neutral"]},
+        "category": {"type": "string", "enum": ["personal", "business", "promotional", "automated"]},
+        "priority": {"type": "string", "enum": ["high", "medium", "low"]},
+        "topics": {"type": "array", "items": {"type": "string"}},
+        "action": {"type": "string"},
+    },
+    "required": ["sentiment", "category", "priority", "topics", "action"],
+    "additionalProperties": False,
+}
+BATCH_ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {"results": {"type": "array", "items": EMAIL_ANALYSIS_SCHEMA}},
+    "required": ["results"],
+    "additionalProperties": False,
+}
+ANALYSIS_TOOL = {
+    "name": "record_analysis",
+    "description": "Record the analysis of the email.",
+    "input_schema": EMAIL_ANALYSIS_SCHEMA,
+}
+BATCH_ANALYSIS_TOOL = {
+    "name": "record_analyses",
+    "description": "Record the analysis of every email, in order.",
+    "input_schema": BATCH_ANALYSIS_SCHEMA,
+}
+
+
+def _json_schema_format(name: str, schema: Dict) -> Dict:
+    """OpenAI response_format enforcing ``schema``."""
+    return {"type": "json_schema", "json_schema": {"name": name, "schema": schema, "strict": True}}
+
+
+def _tool_input(message: Any) -> Optional[Dict]:
+    """The input of the first tool call in an Anthropic message, if any."""
+    for block in message.content:
+        if getattr(block, "type", None) == "tool_use" and isinstance(block.input, dict):
+            return block.input
+    return None
+
+
+EMAIL_FIELDS_TEMPLATE = "Subject: {subject}\nFrom: {sender} ({sender_name})\nDate: {date}\nContent: {body}..."
+
+ANALYSIS_BODY_CHARS = 800
+
+# Summary context layout, with short field tags to save input tokens.
+# Categories are listed by priority; the last ones are dropped first when the
+# context would exceed the token budget.
+CONTEXT_CATEGORIES = ("critical", "receipts", "personal", "business", "mailing_lists", "junk")
+# Tokens of max_context_tokens kept for the summary prompt
+CONTEXT_PROMPT_RESERVE_TOKENS = 1000
+# Emails listed per category, to stay within token limits
+CONTEXT_EMAILS_PER_CATEGORY = 10
+CONTEXT_SNIPPET_CHARS = 200
+CONTEXT_LEGEND = "Fields: S=subject, F=from, D=date, P=preview"
+CONTEXT_LINE_TEMPLATE = "{number}. S:{subject} F:{sender} D:{date}"
+CONTEXT_PREVIEW_TEMPLATE = "   P:{snippet}"
+
+SUMMARY_PROMPT_TEMPLATE = """Please analyze and summarize the following {email_count} emails from the past {days} days.
+
+Provide a comprehensive {summary_type} summary that includes:
+1. **Overview**: Total emails and key statistics
+2. **Important/Critical Items**: Urgent emails that need attention
+3. **Receipts & Financial**: Purchase confirmations, invoices, financial updates
+4. **Communication Highlights**: Key personal or business correspondence
+5. **Mailing Lists & Newsletters**: Subscriptions and automated updates
+6. **Action Items**: Emails requiring follow-up or response
+7. **Cleanup Opportunities**: Junk emails and unsubscribe suggestions
+
+Format the summary clearly with headers and bullet points for easy reading.
+Focus on actionable insights and prioritize important information."""
+
+# Summary prompts by type; other types get the daily wording
+SUMMARY_PROMPTS = {
+    "daily": SUMMARY_PROMPT_TEMPLATE,
+    "weekly": SUMMARY_PROMPT_TEMPLATE
+    + "\nProvide a week-over-week comparison if applicable and highlight trends.",
+    "monthly": SUMMARY_PROMPT_TEMPLATE
+    + "\nInclude monthly patterns and suggest organizational improvements.",
+}
+
+
+# Body text sent to providers drops quoted replies and footer boilerplate
+COMPRESS_SCAN_CHARS = 4000
+QUOTED_LINE_PATTERN = re.compile(r'^[ \t]*>.*\n?', re.MULTILINE)
+BOILERPLATE_LINE_PATTERN = re.compile(
+    r'^.*(?:unsubscribe|view (?:this email )?in (?:your |a )?browser|sent from my |'
+    r'you(?:\'re| are) receiving this|\bon\b.{1,100}\bwrote:).*\n?',
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token count, about four characters per token."""
+    return len(text) >> 2
+
+
+def _compress_snippet(text: str) -> str:
+    """Body text without quoted replies, footers or runs of whitespace."""
+    text = QUOTED_LINE_PATTERN.sub('', text[:COMPRESS_SCAN_CHARS])
+    text = BOILERPLATE_LINE_PATTERN.sub('', text)
+    return TEMPLATE_SPACE_PATTERN.sub(' ', text).strip()
+
+
+def _analysis_body(email: ProcessedEmail) -> str:
+    """The part of the body an analysis prompt includes."""
+    return _compress_snippet(email.body_text)[:ANALYSIS_BODY_CHARS]
+
+
+def _email_fields(email: ProcessedEmail) -> str:
+    """The per-email part of an analysis prompt."""
+    return EMAIL_FIELDS_TEMPLATE.format(
+        subject=email.subject,
+        sender=email.sender,
+        sender_name=email.sender_name or 'Unknown',
+        date=email.date,
+        body=_analysis_body(email),
+    )
+
+
+def _shorten(text: str, width: int) -> str:
+    """Cut ``text`` to ``width`` characters, marking the cut with an ellipsis."""
+    return text[:width] + "..." if len(text) > width else text
+
+
+def _batch_analysis_prompt(emails: List[ProcessedEmail]) -> str:
+    """Build the user message listing every email of a batch in order."""
+    return "\n\n".join(
+        f"[[{number}]]\n{_email_fields(email)}" for number, email in enumerate(emails, 1)
+    )
+
+
+def _anthropic_system(text: str) -> List[Dict]:
+    """System prompt marked for Anthropic prompt caching."""
+    return [{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}]
+
+
+def _parse_batch_analysis(response: Union[str, Dict], count: int) -> Optional[List[Dict]]:
+    """Split a batch analysis response, or None if it does not fit the batch.
+    
+    ``response`` is reply text, or an already structured tool call input.
+    """
+    if isinstance(response, dict):
+        data = response
+    else:
+        try:
+            data = orjson.loads(response)
+        except orjson.JSONDecodeError:
+            # Models sometimes wrap the JSON in prose or a code fence
+            start, end = response.find("{"), response.rfind("}")
+            try:
+                data = orjson.loads(response[start:end + 1]) if start != -1 else None
+            except orjson.JSONDecodeError:
+                return None
+    
+    results = data.get("results") if isinstance(data, dict) else data
+    if (
+        not isinstance(results, list)
+        or len(results) != count
+        or not all(isinstance(result, dict) for result in results)
+    ):
+        return None
+    return results
+
+
+def _summary_key(
+    provider: "AIProvider", prompt: str, context: str, stream_callback: Optional[StreamCallback] = None
+) -> tuple:
+    return (provider.summary_model, prompt, context)
+
+
+def _analysis_key(provider: "AIProvider", email: ProcessedEmail) -> tuple:
+    # Everything analyze_email puts in its prompt
+    return (
+        provider.analysis_model,
+        email.subject,
+        email.sender,
+        email.sender_name,
+        email.date,
+        _analysis_body(email),
+    )
+
 
 class AIProvider(ABC):
     """Abstract base class for AI service providers."""
     
+    summary_model: str
+    analysis_model: str
+    
     @abstractmethod
-    async def generate_summary(self, prompt: str, context: str) -> str:
-        """Generate a summary using the AI provider."""
+    async def generate_summary(
+        self, prompt: str, context: str, *, stream_callback: Optional[StreamCallback] = None
+    ) -> str:
+        """Generate a summary using the AI provider.
+        
+        With ``stream_callback`` the response is streamed and each text chunk
+        is passed to the callback as it arrives; the full text is still
+        returned.
+        """
         pass
     
     @abstractmethod
     async def analyze_email(self, email: ProcessedEmail) -> Dict[str, any]:
         """Analyze a single email for insights."""
         pass
+    
+    async def analyze_emails_batch(self, emails: List[ProcessedEmail]) -> List[Dict[str, any]]:
+        """Analyze several emails, in order, with as few requests as possible.
+        
+        Providers that implement _request_batch_analysis answer the whole
+        batch with one request; otherwise, or when the response does not
+        line up with the batch, each email is analyzed on its own.
+        """
+        if len(emails) > 1:
+            try:
+                response = await self._request_batch_analysis(
+                    _batch_analysis_prompt(emails), 500 * len(emails)
+                )
+            except NotImplementedError:
+                response = None
+            except Exception as e:
+                logger.error(f"Batch email analysis error: {e}")
+                return [{"error": str(e)} for _ in emails]
+            
+            if response is not None:
+                results = _parse_batch_analysis(response, len(emails))
+                if results is not None:
+                    return results
+                logger.warning("Batch analysis did not match the batch, analyzing emails one by one")
+        
+        return list(await asyncio.gather(*(self.analyze_email(email) for email in emails)))
+    
+    async def _request_batch_analysis(self, prompt: str, max_tokens: int) -> Union[str, Dict]:
+        """Send a batch analysis prompt and return the response text or structured data."""
+        raise NotImplementedError
+    
+    async def warmup(self) -> None:
+        """Open a connection to the provider ahead of the first real request."""
 
 
 class AnthropicProvider(AIProvider):
     """Anthropic Claude AI provider."""
     
+    summary_model = "claude-3-5-sonnet-20241022"
+    analysis_model = "claude-3-5-haiku-20241022"
+    
     def __init__(self, api_key: str) -> None:
-        self.client = anthropic.Anthropic(api_key=api_key)
+        # Native asyncio client: requests don't tie up a worker thread each.
+        # The SDK backs off on 429, 5xx and timeouts, honoring Retry-After.
+        self.client = anthropic.AsyncAnthropic(
+            api_key=api_key, max_retries=settings.ai_max_retries
+        )
+        self._limiter = _RateLimiter(settings.ai_requests_per_minute)
     
-    async def generate_summary(self, prompt: str, context: str) -> str:
+    @_cached_response(_summary_key)
+    async def generate_summary(
+        self, prompt: str, context: str, *, stream_callback: Optional[StreamCallback] = None
+    ) -> str:
         """Generate summary using Claude."""
+        request = dict(
+            model=self.summary_model,
+            max_tokens=1000,
+            messages=[
+                {
+                    "role": "user",
+                    "content": f"{prompt}\n\nContext:\n{context}"
+                }
+            ]
+        )
         try:
-            message = await asyncio.to_thread(
-                self.client.messages.create,
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=1000,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": f"{prompt}\n\nContext:\n{context}"
-                    }
-                ]
-            )
+            await self._limiter.acquire()
+            if stream_callback is not None:
+                chunks = []
+                async with self.client.messages.stream(**request) as stream:
+                    async for text in stream.text_stream:
+                        chunks.append(text)
+                        stream_callback(text)
+                return "".join(chunks)
+            message = await self.client.messages.create(**request)
             return message.content[0].text
         except Exception as e:
             logger.error(f"Anthropic API error: {e}")
             raise
     
+    @_cached_response(_analysis_key)
     async def analyze_email(self, email: ProcessedEmail) -> Dict[str, any]:
         """Analyze email using Claude."""
-        prompt = f"""
-        Analyze this email and provide insights:
-        
-        Subject: {email.subject}
-        From: {email.sender} ({email.sender_name or 'Unknown'})
-        Date: {email.date}
-        Content: {email.body_text[:1000]}...
-        
-        Please analyze and return:
-        1. Sentiment (positive/negative/neutral)
-        2. Category (personal/business/promotional/automated)
-        3. Priority level (high/medium/low)
-        4. Key topics/entities mentioned
-        5. Recommended action
-        
-        Return as JSON format.
-        """
-        
         try:
-            message = await asyncio.to_thread(
-                self.client.messages.create,
-                model="claude-3-5-haiku-20241022",
+            await self._limiter.acquire()
+            message = await self.client.messages.create(
+                model=self.analysis_model,
                 max_tokens=500,
-                messages=[{"role": "user", "content": prompt}]
+                system=_anthropic_system(ANALYSIS_INSTRUCTIONS),
+                tools=[ANALYSIS_TOOL],
+                tool_choice={"type": "tool", "name": ANALYSIS_TOOL["name"]},
+                messages=[{"role": "user", "content": _email_fields(email)}]
             )
             
+            analysis = _tool_input(message)
+            if analysis is not None:
+                return analysis
             response_text = message.content[0].text
             # Try to extract JSON from response
             try:
-                return json.loads(response_text)
-            except json.JSONDecodeError:
+                return orjson.loads(response_text)
+            except orjson.JSONDecodeError:
                 return {"analysis": response_text, "error": "Failed to parse JSON"}
                 
         except Exception as e:
             logger.error(f"Email analysis error: {e}")
             return {"error": str(e)}
+    
+    async def _request_batch_analysis(self, prompt: str, max_tokens: int) -> Union[str, Dict]:
+        """Request a batch analysis from Claude as a forced tool call."""
+        await self._limiter.acquire()
+        message = await self.client.messages.create(
+            model=self.analysis_model,
+            max_tokens=max_tokens,
+            system=_anthropic_system(BATCH_ANALYSIS_INSTRUCTIONS),
+            tools=[BATCH_ANALYSIS_TOOL],
+            tool_choice={"type": "tool", "name": BATCH_ANALYSIS_TOOL["name"]},
+            messages=[{"role": "user", "content": prompt}]
+        )
+        analyses = _tool_input(message)
+        return analyses if analyses is not None else message.content[0].text
+    
+    async def warmup(self) -> None:
+        """Open a connection with a free model listing request."""
+        await self.client.models.list(limit=1)
 
 
 class OpenAIProvider(AIProvider):
     """OpenAI GPT provider."""
     
+    summary_model = "gpt-4o-mini"
+    analysis_model = "gpt-4o-mini"
+    
     def __init__(self, api_key: str) -> None:
-        self.client = openai.AsyncOpenAI(api_key=api_key)
+        # The SDK backs off on 429, 5xx and timeouts, honoring Retry-After
+        self.client = openai.AsyncOpenAI(api_key=api_key, max_retries=settings.ai_max_retries)
+        self._limiter = _RateLimiter(settings.ai_requests_per_minute)
     
-    async def generate_summary(self, prompt: str, context: str) -> str:
+    @_cached_response(_summary_key)
+    async def generate_summary(
+        self, prompt: str, context: str, *, stream_callback: Optional[StreamCallback] = None
+    ) -> str:
         """Generate summary using GPT."""
+        request = dict(
+            model=self.summary_model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are an expert email analyst. Provide clear, concise summaries."
+                },
+                {
+                    "role": "user",
+                    "content": f"{prompt}\n\nContext:\n{context}"
+                }
+            ],
+            max_tokens=1000,
+            temperature=0.3
+        )
         try:
-            response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert email analyst. Provide clear, concise summaries."
-                    },
-                    {
-                        "role": "user",
-                        "content": f"{prompt}\n\nContext:\n{context}"
-                    }
-                ],
-                max_tokens=1000,
-                temperature=0.3
-            )
+            await self._limiter.acquire()
+            if stream_callback is not None:
+                chunks = []
+                stream = await self.client.chat.completions.create(**request, stream=True)
+                async for chunk in stream:
+                    text = chunk.choices[0].delta.content if chunk.choices else None
+                    if text:
+                        chunks.append(text)
+                        stream_callback(text)
+                return "".join(chunks)
+            response = await self.client.chat.completions.create(**request)
             return response.choices[0].message.content
         except Exception as e:
             logger.error(f"OpenAI API error: {e}")
             raise
     
+    @_cached_response(_analysis_key)
     async def analyze_email(self, email: ProcessedEmail) -> Dict[str, any]:
         """Analyze email using GPT."""
-        prompt = f"""
-        Analyze this email and return insights as JSON:
-        
-        Subject: {email.subject}
-        From: {email.sender} ({email.sender_name or 'Unknown'})
-        Date: {email.date}
-        Content: {email.body_text[:1000]}...
-        
-        Return JSON with:
-        - sentiment: positive/negative/neutral
-        - category: personal/business/promotional/automated
-        - priority: high/medium/low
-        - topics: array of key topics
-        - action: recommended action
-        """
-        
         try:
+            await self._limiter.acquire()
             response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
+                model=self.analysis_model,
                 messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an email analyst. Always return valid JSON."
-                    },
-                    {"role": "user", "content": prompt}
+                    {"role": "system", "content": ANALYSIS_INSTRUCTIONS},
+                    {"role": "user", "content": _email_fields(email)}
                 ],
                 max_tokens=500,
-                temperature=0.1
+                temperature=0.1,
+                response_format=_json_schema_format("email_analysis", EMAIL_ANALYSIS_SCHEMA)
             )
             
             response_text = response.choices[0].message.content
             try:
-                return json.loads(response_text)
-            except json.JSONDecodeError:
+                return orjson.loads(response_text)
+            except orjson.JSONDecodeError:
                 return {"analysis": response_text, "error": "Failed to parse JSON"}
                 
         except Exception as e:
             logger.error(f"Email analysis error: {e}")
             return {"error": str(e)}
+    
+    async def _request_batch_analysis(self, prompt: str, max_tokens: int) -> str:
+        """Request a batch analysis from GPT with a strict JSON schema."""
+        await self._limiter.acquire()
+        response = await self.client.chat.completions.create(
+            model=self.analysis_model,
+            messages=[
+                {"role": "system", "content": BATCH_ANALYSIS_INSTRUCTIONS},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_tokens,
+            temperature=0.1,
+            response_format=_json_schema_format("email_analyses", BATCH_ANALYSIS_SCHEMA)
+        )
+        return response.choices[0].message.content
+    
+    async def warmup(self) -> None:
+        """Open a connection with a free model lookup."""
+        await self.client.models.retrieve(self.analysis_model)
 
 
 class XAIProvider(AIProvider):
     """xAI Grok provider."""
     
+    summary_model = "grok-beta"
+    analysis_model = "grok-beta"
+    
     def __init__(self, api_key: str) -> None:
         self.api_key = api_key
         self.base_url = "https://api.x.ai/v1"
+        # Pooled keep-alive connections, with connection failures retried
         self.client = httpx.AsyncClient(
             base_url=self.base_url,
-            headers={"Authorization": f"Bearer {api_key}"}
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+            },
+            timeout=httpx.Timeout(60.0, connect=5.0),
+            transport=httpx.AsyncHTTPTransport(
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+                retries=2,
+            ),
         )
+        self._limiter = _RateLimiter(settings.ai_requests_per_minute)
     
-    async def generate_summary(self, prompt: str, context: str) -> str:
+    @_cached_response(_summary_key)
+    async def generate_summary(
+        self, prompt: str, context: str, *, stream_callback: Optional[StreamCallback] = None
+    ) -> str:
         """Generate summary using Grok."""
-        try:
-            response = await self.client.post(
-                "/chat/completions",
-                json={
-                    "model": "grok-beta",
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "You are an expert email analyst. Provide clear, concise summaries."
-                        },
-                        {
-                            "role": "user",
-                            "content": f"{prompt}\n\nContext:\n{context}"
-                        }
-                    ],
-                    "max_tokens": 1000,
-                    "temperature": 0.3
+        payload = {
+            "model": self.summary_model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are an expert email analyst. Provide clear, concise summaries."
+                },
+                {
+                    "role": "user",
+                    "content": f"{prompt}\n\nContext:\n{context}"
                 }
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data["choices"][0]["message"]["content"]
+            ],
+            "max_tokens": 1000,
+            "temperature": 0.3
+        }
+        try:
+            if stream_callback is not None:
+                return await self._chat_stream(payload, stream_callback)
+            return await self._chat(payload)
         except Exception as e:
             logger.error(f"xAI API error: {e}")
             raise
     
+    @_cached_response(_analysis_key)
     async def analyze_email(self, email: ProcessedEmail) -> Dict[str, any]:
         """Analyze email using Grok."""
-        prompt = f"""
-        Analyze this email and return insights as JSON:
-        
-        Subject: {email.subject}
-        From: {email.sender} ({email.sender_name or 'Unknown'})
-        Date: {email.date}
-        Content: {email.body_text[:1000]}...
-        
-        Return JSON with:
-        - sentiment: positive/negative/neutral
-        - category: personal/business/promotional/automated
-        - priority: high/medium/low
-        - topics: array of key topics
-        - action: recommended action
-        """
-        
         try:
-            response = await self.client.post(
-                "/chat/completions",
-                json={
-                    "model": "grok-beta",
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "You are an email analyst. Always return valid JSON."
-                        },
-                        {"role": "user", "content": prompt}
-                    ],
-                    "max_tokens": 500,
-                    "temperature": 0.1
-                }
-            )
-            response.raise_for_status()
-            data = response.json()
-            response_text = data["choices"][0]["message"]["content"]
+            response_text = await self._chat({
+                "model": self.analysis_model,
+                "messages": [
+                    {"role": "system", "content": ANALYSIS_INSTRUCTIONS},
+                    {"role": "user", "content": _email_fields(email)}
+                ],
+                "max_tokens": 500,
+                "temperature": 0.1,
+                "response_format": {"type": "json_object"}
+            })
             
             try:
-                return json.loads(response_text)
-            except json.JSONDecodeError:
+                return orjson.loads(response_text)
+            except orjson.JSONDecodeError:
                 return {"analysis": response_text, "error": "Failed to parse JSON"}
                 
         except Exception as e:
             logger.error(f"Email analysis error: {e}")
             return {"error": str(e)}
     
+    async def _request_batch_analysis(self, prompt: str, max_tokens: int) -> str:
+        """Request a batch analysis from Grok."""
+        return await self._chat({
+            "model": self.analysis_model,
+            "messages": [
+                {"role": "system", "content": BATCH_ANALYSIS_INSTRUCTIONS},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": max_tokens,
+            "temperature": 0.1,
+            "response_format": {"type": "json_object"}
+        })
+    
+    async def _chat(self, payload: Dict) -> str:
+        """Post a chat completion request and return the reply text."""
+        content = orjson.dumps(payload)
+        for attempt in range(settings.ai_max_retries + 1):
+            final_attempt = attempt == settings.ai_max_retries
+            await self._limiter.acquire()
+            try:
+                response = await self.client.post("/chat/completions", content=content)
+            except httpx.TimeoutException:
+                if final_attempt:
+                    raise
+                await asyncio.sleep(_retry_delay(attempt))
+                continue
+            if response.status_code in RETRIABLE_STATUSES and not final_attempt:
+                logger.warning(f"xAI API returned {response.status_code}, retrying")
+                await asyncio.sleep(_retry_delay(attempt, response))
+                continue
+            response.raise_for_status()
+            return orjson.loads(response.content)["choices"][0]["message"]["content"]
+    
+    async def _chat_stream(self, payload: Dict, stream_callback: StreamCallback) -> str:
+        """Stream a chat completion as server-sent events and return the reply text."""
+        request = self.client.build_request(
+            "POST", "/chat/completions", content=orjson.dumps({**payload, "stream": True})
+        )
+        for attempt in range(settings.ai_max_retries + 1):
+            final_attempt = attempt == settings.ai_max_retries
+            await self._limiter.acquire()
+            try:
+                response = await self.client.send(request, stream=True)
+            except httpx.TimeoutException:
+                if final_attempt:
+                    raise
+                await asyncio.sleep(_retry_delay(attempt))
+                continue
+            if response.status_code in RETRIABLE_STATUSES and not final_attempt:
+                await response.aclose()
+                logger.warning(f"xAI API returned {response.status_code}, retrying")
+                await asyncio.sleep(_retry_delay(attempt, response))
+                continue
+            break
+        
+        chunks = []
+        try:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                choices = orjson.loads(data).get("choices")
+                text = choices[0].get("delta", {}).get("content") if choices else None
+                if text:
+                    chunks.append(text)
+                    stream_callback(text)
+        finally:
+            await response.aclose()
+        return "".join(chunks)
+    
+    async def warmup(self) -> None:
+        """Open a connection with a free model listing request."""
+        await self.client.get("/models")
+    
     async def __aenter__(self):
         return self
     
@@ -261,11 +906,63 @@ class XAIProvider(AIProvider):
         await self.client.aclose()
 
 
+class _Coalescer:
+    """Gather single-email analyses into provider batch requests.
+    
+    Emails wait up to ``window`` seconds for others to join; a full batch is
+    sent at once.
+    """
+    
+    def __init__(self, provider: AIProvider, max_batch: int, window: float) -> None:
+        self.provider = provider
+        self.max_batch = max_batch
+        self.window = window
+        self._pending: List[Tuple[ProcessedEmail, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._dispatches: set = set()
+    
+    async def analyze(self, email: ProcessedEmail) -> Dict[str, any]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((email, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+    
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._pending = self._pending, []
+        if items:
+            # Keep a reference so the task isn't garbage collected mid-flight
+            task = asyncio.ensure_future(self._dispatch(items))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+    
+    async def _dispatch(self, items: List[Tuple[ProcessedEmail, asyncio.Future]]) -> None:
+        try:
+            results = await self.provider.analyze_emails_batch([email for email, _ in items])
+        except Exception as e:
+            results = [{"error": str(e)}] * len(items)
+        for (_, future), result in zip(items, results):
+            if not future.done():
+                future.set_result(result)
+
+
 class AIService:
     """Main AI service coordinator."""
     
-    def __init__(self) -> None:
+    def __init__(self, batch_window_ms: float = 50.0, max_batch: int = 10) -> None:
         self.providers: Dict[str, AIProvider] = {}
+        # Template key -> (stored at, analysis), see _template_key
+        self._template_cache: "OrderedDict[bytes, Tuple[float, Dict]]" = OrderedDict()
+        # Per-provider batching for analyze_email_coalesced
+        self.batch_window_ms = batch_window_ms
+        self.max_batch = max_batch
+        self._coalescers: Dict[str, _Coalescer] = {}
         self._initialize_providers()
     
     def _initialize_providers(self) -> None:
@@ -294,6 +991,18 @@ class AIService:
         if not self.providers:
             logger.warning("No AI providers initialized. AI features will not be available.")
     
+    async def warmup(self, provider_name: Optional[str] = None) -> None:
+        """Connect to the provider ahead of its first request.
+        
+        Run it alongside other startup work, such as fetching mail, to take
+        the TLS handshake off the first request's path. Failures are ignored.
+        """
+        try:
+            provider = self.get_provider(provider_name)
+            await asyncio.wait_for(provider.warmup(), WARMUP_TIMEOUT)
+        except Exception as e:
+            logger.debug(f"Provider warmup skipped: {e}")
+    
     def get_provider(self, provider_name: Optional[str] = None) -> AIProvider:
         """Get AI provider instance."""
         provider_name = provider_name or settings.default_ai_service
@@ -313,9 +1022,13 @@ class AIService:
         emails: List[ProcessedEmail],
         days: int,
         summary_type: str = "daily",
-        provider_name: Optional[str] = None
+        provider_name: Optional[str] = None,
+        stream_callback: Optional[StreamCallback] = None
     ) -> str:
-        """Generate comprehensive email summary."""
+        """Generate comprehensive email summary.
+        
+        ``stream_callback`` receives the summary text as it is generated.
+        """
         if not emails:
             return "No emails found for the specified period."
         
@@ -328,117 +1041,225 @@ class AIService:
         prompt = self._create_summary_prompt(summary_type, days, len(emails))
         
         try:
-            summary = await provider.generate_summary(prompt, context)
+            summary = await provider.generate_summary(
+                prompt, context, stream_callback=stream_callback
+            )
             logger.info(f"Generated {summary_type} email summary using {provider.__class__.__name__}")
             return summary
         except Exception as e:
             logger.error(f"Failed to generate email summary: {e}")
             return f"Failed to generate summary: {str(e)}"
     
-    def _prepare_email_context(self, emails: List[ProcessedEmail], days: int) -> str:
-        """Prepare email context for AI analysis."""
-        # Categorize emails
-        categories = {
-            "critical": [],
-            "receipts": [],
-            "junk": [],
-            "mailing_lists": [],
-            "personal": [],
-            "business": []
+    async def generate_email_summary_speculative(
+        self,
+        emails: List[ProcessedEmail],
+        days: int,
+        summary_type: str = "daily",
+        provider_names: Optional[List[str]] = None
+    ) -> str:
+        """Generate a summary with several providers at once, keeping the first.
+        
+        The slower requests are cancelled once one provider answers, trading
+        extra token spend for lower tail latency. Defaults to every available
+        provider.
+        """
+        if not emails:
+            return "No emails found for the specified period."
+        
+        names = [name for name in (provider_names or self.providers) if name in self.providers]
+        if not names:
+            raise RuntimeError("No AI providers available")
+        
+        context = self._prepare_email_context(emails, days)
+        prompt = self._create_summary_prompt(summary_type, days, len(emails))
+        
+        tasks = {
+            asyncio.ensure_future(self.providers[name].generate_summary(prompt, context)): name
+            for name in names
         }
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        logger.info(f"Generated {summary_type} email summary using {tasks[task]}")
+                        return task.result()
+                    error = task.exception()
+                    logger.warning(f"Provider '{tasks[task]}' failed to generate summary: {error}")
+        finally:
+            for task in pending:
+                task.cancel()
+        
+        logger.error(f"Failed to generate email summary: {error}")
+        return f"Failed to generate summary: {str(error)}"
+    
+    def _prepare_email_context(self, emails: List[ProcessedEmail], days: int) -> str:
+        """Prepare email context for AI analysis.
+        
+        Only the emails shown are kept per category, the rest are just
+        counted; sender, date and snippet are rendered for the shown ones
+        alone, so the other emails' bodies are never decoded.
+        """
+        shown: Dict[str, List[ProcessedEmail]] = {name: [] for name in CONTEXT_CATEGORIES}
+        counts = dict.fromkeys(CONTEXT_CATEGORIES, 0)
         
         for email in emails:
-            email_summary = {
-                "subject": email.subject,
-                "sender": f"{email.sender_name or 'Unknown'} <{email.sender}>",
-                "date": email.date.strftime("%Y-%m-%d"),
-                "snippet": email.body_text[:200] + "..." if len(email.body_text) > 200 else email.body_text
-            }
-            
             if email.is_critical:
-                categories["critical"].append(email_summary)
+                key = "critical"
             elif email.is_receipt:
-                categories["receipts"].append(email_summary)
+                key = "receipts"
             elif email.is_junk:
-                categories["junk"].append(email_summary)
+                key = "junk"
             elif email.is_mailing_list:
-                categories["mailing_lists"].append(email_summary)
+                key = "mailing_lists"
             elif email.sender_name:
-                categories["personal"].append(email_summary)
+                key = "personal"
             else:
-                categories["business"].append(email_summary)
-        
-        # Build context string
-        context_parts = [f"Email Summary for {days} days ({len(emails)} total emails):\n"]
-        
-        for category, email_list in categories.items():
-            if email_list:
-                context_parts.append(f"\n{category.upper()} EMAILS ({len(email_list)}):")
-                for i, email in enumerate(email_list[:10], 1):  # Limit to avoid token limits
-                    context_parts.append(
-                        f"{i}. {email['subject']} - {email['sender']} ({email['date']})"
-                    )
-                    if email['snippet']:
-                        context_parts.append(f"   Preview: {email['snippet']}")
-                
-                if len(email_list) > 10:
-                    context_parts.append(f"   ... and {len(email_list) - 10} more emails")
+                key = "business"
+            counts[key] += 1
+            if counts[key] <= CONTEXT_EMAILS_PER_CATEGORY:
+                shown[key].append(email)
+        
+        # Build context string, category by category while the budget lasts
+        context_parts = [
+            f"Email Summary for {days} days ({len(emails)} total emails):",
+            CONTEXT_LEGEND,
+        ]
+        budget = settings.max_context_tokens - CONTEXT_PROMPT_RESERVE_TOKENS
+        used = sum(_estimate_tokens(part) for part in context_parts)
+        elided = []
+        
+        for category, email_list in shown.items():
+            if not email_list:
+                continue
+            if elided:
+                elided.append(category)
+                continue
+            
+            count = counts[category]
+            block = [f"\n{category.upper()} EMAILS ({count}):"]
+            for i, email in enumerate(email_list, 1):
+                block.append(CONTEXT_LINE_TEMPLATE.format(
+                    number=i,
+                    subject=email.subject,
+                    sender=f"{email.sender_name or 'Unknown'} <{email.sender}>",
+                    date=email.date.date().isoformat(),
+                ))
+                snippet = _shorten(_compress_snippet(email.body_text), CONTEXT_SNIPPET_CHARS)
+                if snippet:
+                    block.append(CONTEXT_PREVIEW_TEMPLATE.format(snippet=snippet))
+            
+            if count > len(email_list):
+                block.append(f"   ... and {count - len(email_list)} more emails")
+            
+            cost = sum(_estimate_tokens(line) for line in block)
+            if used + cost > budget:
+                elided.append(category)
+                continue
+            context_parts.extend(block)
+            used += cost
+        
+        if elided:
+            context_parts.append(
+                f"\n... {len(elided)} categories elided due to context budget: "
+                + ", ".join(category.upper() for category in elided)
+            )
         
         return "\n".join(context_parts)
     
     def _create_summary_prompt(self, summary_type: str, days: int, email_count: int) -> str:
         """Create appropriate summary prompt."""
-        base_prompt = f"""
-        Please analyze and summarize the following {email_count} emails from the past {days} days.
-        
-        Provide a comprehensive {summary_type} summary that includes:
-        1. **Overview**: Total emails and key statistics
-        2. **Important/Critical Items**: Urgent emails that need attention
-        3. **Receipts & Financial**: Purchase confirmations, invoices, financial updates
-        4. **Communication Highlights**: Key personal or business correspondence
-        5. **Mailing Lists & Newsletters**: Subscriptions and automated updates
-        6. **Action Items**: Emails requiring follow-up or response
-        7. **Cleanup Opportunities**: Junk emails and unsubscribe suggestions
-        
-        Format the summary clearly with headers and bullet points for easy reading.
-        Focus on actionable insights and prioritize important information.
-        """
-        
-        if summary_type == "weekly":
-            base_prompt += "\nProvide a week-over-week comparison if applicable and highlight trends."
-        elif summary_type == "monthly":
-            base_prompt += "\nInclude monthly patterns and suggest organizational improvements."
-        
-        return base_prompt
+        template = SUMMARY_PROMPTS.get(summary_type, SUMMARY_PROMPTS["daily"])
+        return template.format(days=days, email_count=email_count, summary_type=summary_type)
     
     async def analyze_batch_emails(
         self,
         emails: List[ProcessedEmail],
-        provider_name: Optional[str] = None
+        provider_name: Optional[str] = None,
+        use_local: bool = True
     ) -> List[Dict[str, any]]:
-        """Analyze a batch of emails for insights."""
+        """Analyze a batch of emails for insights.
+        
+        With ``use_local``, receipts, promotions, mailing lists and automated
+        mail get a rule-based analysis marked ``"source": "local"`` instead
+        of a provider request.
+        """
         provider = self.get_provider(provider_name)
         
         # Limit batch size to avoid API limits
         batch_size = 10
-        results = []
         
-        for i in range(0, len(emails), batch_size):
-            batch = emails[i:i + batch_size]
-            batch_results = await asyncio.gather(
-                *[provider.analyze_email(email) for email in batch],
-                return_exceptions=True
-            )
-            
-            for email, result in zip(batch, batch_results):
-                if isinstance(result, Exception):
-                    logger.warning(f"Failed to analyze email {email.message_id}: {result}")
-                    results.append({"error": str(result), "email_id": email.message_id})
-                else:
-                    result["email_id"] = email.message_id
-                    results.append(result)
+        local = [_local_analysis(email) if use_local else None for email in emails]
+        keys = [
+            None if analysis is not None else _template_key(provider, email)
+            for analysis, email in zip(local, emails)
+        ]
+        
+        # Only the first email of each uncached template goes to the provider,
+        # so repeated templates don't take up slots in the provider batches
+        known: Dict[bytes, Union[Dict, Exception]] = {}
+        pending: Dict[bytes, ProcessedEmail] = {}
+        for key, email in zip(keys, emails):
+            if key is None or key in known or key in pending:
+                continue
+            cached = self._get_template_analysis(key)
+            if cached is not None:
+                known[key] = cached
+            else:
+                pending[key] = email
+        
+        representatives = list(pending.items())
+        for i in range(0, len(representatives), batch_size):
+            batch = representatives[i:i + batch_size]
+            try:
+                fetched = await provider.analyze_emails_batch([email for _, email in batch])
+            except Exception as e:
+                fetched = [e] * len(batch)
+            for (key, _), result in zip(batch, fetched):
+                known[key] = result
+                if isinstance(result, dict) and "error" not in result:
+                    self._put_template_analysis(key, result)
+        
+        results = []
+        for key, email, analysis in zip(keys, emails, local):
+            result = analysis if key is None else known[key]
+            if isinstance(result, Exception):
+                logger.warning(f"Failed to analyze email {email.message_id}: {result}")
+                results.append({"error": str(result), "email_id": email.message_id})
+            else:
+                result = dict(result)
+                result["email_id"] = email.message_id
+                results.append(result)
         
         return results
+
+    async def analyze_email_coalesced(
+        self,
+        email: ProcessedEmail,
+        provider_name: Optional[str] = None
+    ) -> Dict[str, any]:
+        """Analyze one email, batched with other emails analyzed concurrently.
+        
+        Callers handling emails one at a time share provider requests, at the
+        cost of up to ``batch_window_ms`` extra latency.
+        """
+        provider = self.get_provider(provider_name)
+        name = type(provider).__name__
+        coalescer = self._coalescers.get(name)
+        if coalescer is None or coalescer.provider is not provider:
+            coalescer = _Coalescer(provider, self.max_batch, self.batch_window_ms / 1000)
+            self._coalescers[name] = coalescer
+        result = dict(await coalescer.analyze(email))
+        result["email_id"] = email.message_id
+        return result
+
+    def _get_template_analysis(self, key: bytes) -> Optional[Dict]:
+        return _cache_get(self._template_cache, key)
+
+    def _put_template_analysis(self, key: bytes, analysis: Dict) -> None:
+        _cache_put(self._template_cache, key, dict(analysis))
     
     async def get_email_insights(
         self,
@@ -1,10 +1,15 @@
 """Contact management and email address analysis."""
 
 from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional, Set, Tuple
+import heapq
+import os
+import re
 import sqlite3
+import sys
 from pathlib import Path
 
 from ..core.email_processor import ProcessedEmail
@@ -12,8 +17,58 @@ from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-
-@dataclass
+# Domain keywords used by the classification scores, matched against the
+# dot-separated labels of a contact's domains
+PROFESSIONAL_DOMAINS = frozenset({'gov', 'edu', 'org', 'bank', 'insurance', 'legal', 'medical'})
+SUBSCRIPTION_DOMAINS = frozenset({'newsletter', 'marketing', 'promo', 'deals', 'notifications', 'updates'})
+SPAM_DOMAINS = frozenset({'noreply', 'marketing', 'promo', 'newsletter', 'deals'})
+PROMO_LABELS = frozenset({'PROMOTIONS', 'SPAM', 'JUNK'})
+
+# Distinct subjects counted per contact, to bound memory on busy senders
+MAX_SUBJECTS_PER_CONTACT = 200
+
+# Batches of at least two shards are analyzed in worker processes
+CONTACT_SHARD_SIZE = 5000
+
+UNSUBSCRIBE_CONTENT_PATTERN = re.compile(
+    r'unsubscribe|opt.?out|remove.*from.*list|stop.*receiving|'
+    r'update.*preferences|manage.*subscription|email.*preferences',
+    re.IGNORECASE
+)
+
+# Punctuation and spacing ignored when comparing names for duplicates
+NAME_SEPARATOR_PATTERN = re.compile(r'[\W_]+')
+
+# Bumped when the table layout changes; stored in PRAGMA user_version
+CONTACTS_SCHEMA_VERSION = 2
+CONTACT_TABLES = ("contacts", "contact_domains", "contact_subjects")
+
+# Statements reused by every save so SQLite compiles each one once
+SQL_UPSERT_CONTACT = """
+    INSERT OR REPLACE INTO contacts
+    (email, name, first_seen, last_seen, email_count, sent_count,
+     received_count, is_frequent, is_important, is_spam, is_automated,
+     is_subscription, has_unsubscribe, confidence_score, notes)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+SQL_SELECT_CONTACTS = """
+    SELECT email, name, first_seen, last_seen, email_count, sent_count,
+           received_count, is_frequent, is_important, is_spam, is_automated,
+           is_subscription, has_unsubscribe, confidence_score, notes
+    FROM contacts
+"""
+SQL_DELETE_DOMAINS = "DELETE FROM contact_domains WHERE contact_email = ?"
+SQL_DELETE_SUBJECTS = "DELETE FROM contact_subjects WHERE contact_email = ?"
+SQL_INSERT_DOMAIN = "INSERT INTO contact_domains (contact_email, domain) VALUES (?, ?)"
+SQL_INSERT_SUBJECT = "INSERT INTO contact_subjects (contact_email, subject, seen_count) VALUES (?, ?, ?)"
+
+
+# Large mailboxes hold many contacts, so skip the instance dict where the
+# interpreter supports slotted dataclasses (Python 3.10+)
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**DATACLASS_SLOTS)
 class Contact:
     """Represents a contact extracted from email communications."""
     
@@ -35,7 +90,7 @@ class Contact:
     
     # Associated data
     domains: Set[str] = field(default_factory=set)
-    subjects_seen: List[str] = field(default_factory=list)
+    subjects_seen: Counter[str] = field(default_factory=Counter)
     labels_associated: Set[str] = field(default_factory=set)
     
     # Metadata
@@ -43,8 +98,151 @@ class Contact:
     notes: List[str] = field(default_factory=list)
 
 
+def _trigrams(text: str) -> Set[str]:
+    """Return the three-character substrings of text."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _domain_labels(domains: Set[str]) -> Set[str]:
+    """Return every dot-separated label of the given domains."""
+    return {label for domain in domains for label in domain.split('.')}
+
+
+def _name_key(name: str) -> str:
+    """Normalize a display name for duplicate detection.
+    
+    Case, punctuation and spacing are ignored, so "John Doe" and "john.doe"
+    share a key.
+    """
+    return NAME_SEPARATOR_PATTERN.sub('', name).casefold()
+
+
+def _contact_key(address: str) -> str:
+    """Normalize an address for use as a contact key.
+    
+    Keys are interned so the contacts dict and Contact.email share one string.
+    """
+    return sys.intern(address.lower())
+
+
+def _update_contact(
+    contacts: Dict[str, Contact],
+    email_addr: str,
+    email: ProcessedEmail,
+    is_sender: bool
+) -> Tuple[Contact, str]:
+    """Fold one email into the contact keyed by email_addr, creating it if needed.
+    
+    Returns the contact and whether it was "new" or "updated".
+    """
+    normalized_email_date = _normalize_datetime(email.date)
+    
+    # Get or create contact
+    contact = contacts.get(email_addr)
+    if contact is None:
+        contact = Contact(
+            email=email_addr,
+            first_seen=normalized_email_date,
+            last_seen=normalized_email_date,
+        )
+        contacts[email_addr] = contact
+        result = "new"
+    else:
+        result = "updated"
+
+    # Update contact information
+    last_seen = contact.last_seen
+    if last_seen is None or normalized_email_date > _normalize_datetime(last_seen):
+        contact.last_seen = normalized_email_date
+        
+    first_seen = contact.first_seen
+    if first_seen is None or normalized_email_date < _normalize_datetime(first_seen):
+        contact.first_seen = normalized_email_date
+    
+    # Update name if available and not set
+    if not contact.name and is_sender and email.sender_name:
+        contact.name = email.sender_name
+
+    # Update counts
+    contact.email_count += 1
+    if is_sender:
+        contact.received_count += 1
+    else:
+        contact.sent_count += 1
+
+    # Add domain
+    domain = email_addr.rpartition('@')[2]
+    contact.domains.add(domain)
+
+    # Count subjects (limit distinct subjects to prevent memory issues)
+    subject = email.subject[:100]
+    if len(contact.subjects_seen) < MAX_SUBJECTS_PER_CONTACT or subject in contact.subjects_seen:
+        contact.subjects_seen[subject] += 1
+
+    # Add labels
+    contact.labels_associated.update(email.labels)
+
+    # Update classification flags based on email
+    if email.is_junk:
+        contact.is_spam = True
+    if email.is_automated:
+        contact.is_automated = True
+    # Check if this email contains unsubscribe options
+    if email.unsubscribe_link or _has_unsubscribe_content(email):
+        contact.has_unsubscribe = True
+
+    return contact, result
+
+
+def _has_unsubscribe_content(email: ProcessedEmail) -> bool:
+    """Check if email contains unsubscribe-related content."""
+    # Combine subject and body content for analysis
+    content = f"{email.subject} {email.body_text}"
+    return UNSUBSCRIBE_CONTENT_PATTERN.search(content) is not None
+
+
+def _analyze_shard(emails: List[ProcessedEmail]) -> Dict[str, Contact]:
+    """Build contacts from a slice of emails; runs in worker processes."""
+    contacts: Dict[str, Contact] = {}
+    for email in emails:
+        _update_contact(contacts, _contact_key(email.sender), email, is_sender=True)
+        for recipient in email.recipients:
+            _update_contact(contacts, _contact_key(recipient), email, is_sender=False)
+    return contacts
+
+
+def _merge_contact(contact: Contact, other: Contact) -> None:
+    """Fold a contact built from a later slice of emails into contact."""
+    if contact.first_seen:
+        contact.first_seen = min(_normalize_datetime(contact.first_seen), other.first_seen)
+    else:
+        contact.first_seen = other.first_seen
+    if contact.last_seen:
+        contact.last_seen = max(_normalize_datetime(contact.last_seen), other.last_seen)
+    else:
+        contact.last_seen = other.last_seen
+    if not contact.name:
+        contact.name = other.name
+    
+    contact.email_count += other.email_count
+    contact.sent_count += other.sent_count
+    contact.received_count += other.received_count
+    contact.domains |= other.domains
+    contact.labels_associated |= other.labels_associated
+    
+    for subject, count in other.subjects_seen.items():
+        if len(contact.subjects_seen) < MAX_SUBJECTS_PER_CONTACT or subject in contact.subjects_seen:
+            contact.subjects_seen[subject] += count
+    
+    contact.is_spam = contact.is_spam or other.is_spam
+    contact.is_automated = contact.is_automated or other.is_automated
+    contact.has_unsubscribe = contact.has_unsubscribe or other.has_unsubscribe
+
+
 def _normalize_datetime(dt: datetime) -> datetime:
     """Normalize datetime to timezone-aware UTC or timezone-naive."""
+    if dt.tzinfo is timezone.utc:
+        return dt
     if dt.tzinfo is None:
         # If naive, assume UTC
         return dt.replace(tzinfo=timezone.utc)
@@ -59,13 +257,35 @@ class ContactManager:
     def __init__(self, db_path: Optional[str] = None) -> None:
         self.db_path = db_path or str(Path.home() / ".kit_gmail" / "contacts.db")
         self.contacts: Dict[str, Contact] = {}
+        # Saves only write contacts changed since they were last loaded or
+        # saved, plus any added to self.contacts that were never saved
+        self._dirty: Set[str] = set()
+        self._persisted: Set[str] = set()
+        # Lowercased email/name trigrams -> contact emails, for find_contacts
+        self._trigram_index: Dict[str, Set[str]] = defaultdict(set)
+        # Contact email -> the name it was indexed under
+        self._indexed: Dict[str, Optional[str]] = {}
         self._ensure_db_setup()
 
+    def _connect(self) -> sqlite3.Connection:
+        """Open a database connection tuned for bulk writes.
+        
+        WAL with synchronous=NORMAL syncs at checkpoints rather than on
+        every commit, while staying safe across process crashes.
+        """
+        conn = sqlite3.connect(self.db_path, uri=self.db_path.startswith("file:"))
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-64000")
+        return conn
+
     def _ensure_db_setup(self) -> None:
         """Ensure database is set up with required tables."""
-        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        if not self.db_path.startswith("file:"):
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             # Check if we need to add new columns to existing table
             cursor = conn.execute("PRAGMA table_info(contacts)")
             columns = [row[1] for row in cursor.fetchall()]
@@ -80,6 +300,15 @@ class ContactManager:
                 conn.execute("ALTER TABLE contacts ADD COLUMN has_unsubscribe BOOLEAN DEFAULT 0")
                 logger.info("Added has_unsubscribe column to existing contacts table")
                 
+            # Tables are keyed on their natural primary keys WITHOUT ROWID;
+            # databases from before that layout are copied into it once
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            migrate = version < 1 and 'email' in columns
+            if migrate:
+                conn.execute("BEGIN")
+                for table in CONTACT_TABLES:
+                    conn.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+                
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS contacts (
                     email TEXT PRIMARY KEY,
@@ -97,15 +326,16 @@ class ContactManager:
                     has_unsubscribe BOOLEAN DEFAULT 0,
                     confidence_score REAL DEFAULT 0.0,
                     notes TEXT
-                )
+                ) WITHOUT ROWID
             ''')
             
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS contact_domains (
                     contact_email TEXT,
                     domain TEXT,
+                    PRIMARY KEY (contact_email, domain),
                     FOREIGN KEY (contact_email) REFERENCES contacts (email)
-                )
+                ) WITHOUT ROWID
             ''')
             
             conn.execute('''
@@ -113,9 +343,64 @@ class ContactManager:
                     contact_email TEXT,
                     subject TEXT,
                     seen_count INTEGER DEFAULT 1,
+                    PRIMARY KEY (contact_email, subject),
                     FOREIGN KEY (contact_email) REFERENCES contacts (email)
-                )
+                ) WITHOUT ROWID
             ''')
+            
+            if migrate:
+                # Duplicate domain/subject rows collapse onto the new keys
+                for table in CONTACT_TABLES:
+                    table_columns = ", ".join(
+                        row[1] for row in conn.execute(f"PRAGMA table_info({table})")
+                    )
+                    conn.execute(
+                        f"INSERT OR IGNORE INTO {table} ({table_columns}) "
+                        f"SELECT {table_columns} FROM {table}_legacy"
+                    )
+                    conn.execute(f"DROP TABLE {table}_legacy")
+                logger.info("Migrated contacts database to WITHOUT ROWID tables")
+            
+            # Contacts are keyed on lowercased addresses; rows saved before
+            # that are folded into their lowercased key once
+            if version < 2 and 'email' in columns:
+                self._merge_contact_keys(conn)
+            conn.execute(f"PRAGMA user_version = {CONTACTS_SCHEMA_VERSION}")
+
+    @staticmethod
+    def _merge_contact_keys(conn: sqlite3.Connection) -> None:
+        """Lowercase stored contact keys, merging rows that collide."""
+        mixed = "contact_email != lower(contact_email)"
+        conn.execute(
+            "INSERT OR IGNORE INTO contact_domains (contact_email, domain) "
+            f"SELECT lower(contact_email), domain FROM contact_domains WHERE {mixed}"
+        )
+        conn.execute(
+            "INSERT INTO contact_subjects (contact_email, subject, seen_count) "
+            "SELECT lower(contact_email), subject, SUM(seen_count) FROM contact_subjects "
+            f"WHERE {mixed} GROUP BY lower(contact_email), subject "
+            "ON CONFLICT (contact_email, subject) "
+            "DO UPDATE SET seen_count = seen_count + excluded.seen_count"
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO contacts "
+            "(email, name, first_seen, last_seen, email_count, sent_count, "
+            " received_count, is_frequent, is_important, is_spam, is_automated, "
+            " is_subscription, has_unsubscribe, confidence_score, notes) "
+            "SELECT lower(email), MAX(name), MIN(first_seen), MAX(last_seen), "
+            "       SUM(email_count), SUM(sent_count), SUM(received_count), "
+            "       MAX(is_frequent), MAX(is_important), MAX(is_spam), MAX(is_automated), "
+            "       MAX(is_subscription), MAX(has_unsubscribe), MAX(confidence_score), "
+            "       group_concat(notes, '; ') "
+            "FROM contacts WHERE lower(email) IN "
+            "    (SELECT lower(email) FROM contacts WHERE email != lower(email)) "
+            "GROUP BY lower(email)"
+        )
+        conn.execute(f"DELETE FROM contact_domains WHERE {mixed}")
+        conn.execute(f"DELETE FROM contact_subjects WHERE {mixed}")
+        merged = conn.execute("DELETE FROM contacts WHERE email != lower(email)").rowcount
+        if merged:
+            logger.info(f"Merged {merged} contacts into lowercased addresses")
 
     def analyze_emails(self, emails: List[ProcessedEmail]) -> Dict[str, any]:
         """Analyze a batch of emails to extract and update contact information."""
@@ -128,6 +413,10 @@ class ContactManager:
             "subscription_contacts": 0,
         }
         
+        if len(emails) >= 2 * CONTACT_SHARD_SIZE and (os.cpu_count() or 1) > 1:
+            self._analyze_emails_parallel(emails, stats)
+            emails = []
+        
         for email in emails:
             stats["emails_processed"] += 1
             
@@ -164,6 +453,30 @@ class ContactManager:
         logger.info(f"Contact analysis completed: {stats}")
         return stats
 
+    def _analyze_emails_parallel(self, emails: List[ProcessedEmail], stats: Dict[str, int]) -> None:
+        """Build contacts from shards of emails in worker processes and merge them."""
+        shards = [
+            emails[i:i + CONTACT_SHARD_SIZE]
+            for i in range(0, len(emails), CONTACT_SHARD_SIZE)
+        ]
+        with ProcessPoolExecutor(max_workers=min(os.cpu_count(), len(shards))) as executor:
+            partials = executor.map(_analyze_shard, shards)
+            
+            # Merge in shard order so names and dates resolve as a serial pass would
+            for partial in partials:
+                for email_addr, other in partial.items():
+                    self._dirty.add(email_addr)
+                    contact = self.contacts.get(email_addr)
+                    if contact is None:
+                        self.contacts[email_addr] = other
+                        stats["new_contacts"] += 1
+                    else:
+                        _merge_contact(contact, other)
+        
+        occurrences = sum(1 + len(email.recipients) for email in emails)
+        stats["emails_processed"] += len(emails)
+        stats["updated_contacts"] += occurrences - stats["new_contacts"]
+
     def _update_contact_from_email(
         self, 
         email: ProcessedEmail, 
@@ -171,105 +484,26 @@ class ContactManager:
         contact_email: Optional[str] = None
     ) -> str:
         """Update contact information from an email."""
-        email_addr = contact_email or email.sender
-        
-        # Get or create contact
-        if email_addr not in self.contacts:
-            normalized_email_date = _normalize_datetime(email.date)
-            contact = Contact(
-                email=email_addr,
-                first_seen=normalized_email_date,
-                last_seen=normalized_email_date,
-            )
-            self.contacts[email_addr] = contact
-            result = "new"
-        else:
-            contact = self.contacts[email_addr]
-            result = "updated"
-
-        # Update contact information
-        normalized_email_date = _normalize_datetime(email.date)
-        
-        if contact.last_seen:
-            contact.last_seen = max(_normalize_datetime(contact.last_seen), normalized_email_date)
-        else:
-            contact.last_seen = normalized_email_date
-            
-        if contact.first_seen:
-            contact.first_seen = min(_normalize_datetime(contact.first_seen), normalized_email_date)
-        else:
-            contact.first_seen = normalized_email_date
+        email_addr = _contact_key(contact_email or email.sender)
+        self._dirty.add(email_addr)
         
-        # Update name if available and not set
-        if not contact.name and is_sender and email.sender_name:
-            contact.name = email.sender_name
-
-        # Update counts
-        contact.email_count += 1
-        if is_sender:
-            contact.received_count += 1
-        else:
-            contact.sent_count += 1
-
-        # Add domain
-        domain = email_addr.split('@')[-1].lower()
-        contact.domains.add(domain)
-
-        # Track subjects (limit to prevent memory issues)
-        if len(contact.subjects_seen) < 50:
-            contact.subjects_seen.append(email.subject[:100])
-
-        # Add labels
-        contact.labels_associated.update(email.labels)
-
-        # Update classification flags based on email
-        if email.is_junk:
-            contact.is_spam = True
-        if email.is_automated:
-            contact.is_automated = True
-        # Check if this email contains unsubscribe options
-        if email.unsubscribe_link or self._has_unsubscribe_content(email):
-            contact.has_unsubscribe = True
-
+        _, result = _update_contact(self.contacts, email_addr, email, is_sender)
         return result
 
-    def _has_unsubscribe_content(self, email) -> bool:
-        """Check if email contains unsubscribe-related content."""
-        import re
-        
-        # Combine subject and body content for analysis
-        content = f"{email.subject} {email.body_text}".lower()
-        
-        # Pattern to detect unsubscribe-related content
-        unsubscribe_patterns = [
-            r'unsubscribe',
-            r'opt.?out',
-            r'remove.*from.*list',
-            r'stop.*receiving',
-            r'click.*here.*to.*unsubscribe',
-            r'update.*preferences',
-            r'manage.*subscription',
-            r'email.*preferences'
-        ]
-        
-        # Check if any pattern matches
-        for pattern in unsubscribe_patterns:
-            if re.search(pattern, content, re.IGNORECASE):
-                return True
-                
-        return False
-
     def _classify_contacts(self) -> None:
         """Classify contacts based on interaction patterns."""
         if not self.contacts:
             return
 
         # Calculate thresholds
-        email_counts = [c.email_count for c in self.contacts.values()]
-        avg_count = sum(email_counts) / len(email_counts)
+        avg_count = sum(c.email_count for c in self.contacts.values()) / len(self.contacts)
         frequent_threshold = max(10, avg_count * 1.5)
 
         for contact in self.contacts.values():
+            before = (
+                contact.is_frequent, contact.is_important, contact.is_subscription,
+                contact.is_spam, contact.confidence_score, contact.notes,
+            )
             confidence_factors = []
             
             # Mark frequent contacts
@@ -298,8 +532,16 @@ class ContactManager:
             # Calculate confidence score
             contact.confidence_score = min(1.0, len(confidence_factors) * 0.3)
             contact.notes = confidence_factors
+            
+            after = (
+                contact.is_frequent, contact.is_important, contact.is_subscription,
+                contact.is_spam, contact.confidence_score, contact.notes,
+            )
+            if after != before:
+                self._dirty.add(contact.email)
 
-    def _calculate_importance_score(self, contact: Contact) -> float:
+    @staticmethod
+    def _calculate_importance_score(contact: Contact) -> float:
         """Calculate importance score for a contact."""
         score = 0.0
         
@@ -312,11 +554,7 @@ class ContactManager:
             score += 0.4
         
         # Professional domains
-        professional_domains = {
-            'gov', 'edu', 'org', 'bank', 'insurance', 'legal', 'medical'
-        }
-        if any(domain_part in ' '.join(contact.domains) 
-               for domain_part in professional_domains):
+        if not PROFESSIONAL_DOMAINS.isdisjoint(_domain_labels(contact.domains)):
             score += 0.3
         
         # Long-term correspondence
@@ -331,14 +569,13 @@ class ContactManager:
 
         return min(1.0, score)
 
-    def _calculate_subscription_score(self, contact: Contact) -> float:
+    @staticmethod
+    def _calculate_subscription_score(contact: Contact) -> float:
         """Calculate subscription probability for a contact."""
         score = 0.0
         
         # Marketing/newsletter domains
-        subscription_domains = {'newsletter', 'marketing', 'promo', 'deals', 'notifications', 'updates'}
-        if any(sub_term in ' '.join(contact.domains) 
-               for sub_term in subscription_domains):
+        if not SUBSCRIPTION_DOMAINS.isdisjoint(_domain_labels(contact.domains)):
             score += 0.4
         
         # One-way communication (they send, you don't reply)
@@ -355,22 +592,30 @@ class ContactManager:
         
         return min(1.0, score)
 
-    def _calculate_spam_score(self, contact: Contact) -> float:
+    @staticmethod
+    def _calculate_spam_score(contact: Contact) -> float:
         """Calculate spam probability for a contact."""
+        one_way = contact.email_count > 10 and contact.sent_count == 0
+        no_name = not contact.name or contact.name.lower() in ['noreply', 'no-reply']
+        promotional = not PROMO_LABELS.isdisjoint(contact.labels_associated)
+        
+        # Splitting domains into labels is the costliest check; skip it when
+        # the other signals alone already reach the cap
+        if one_way and promotional and (no_name or contact.is_automated):
+            return 1.0
+        
         score = 0.0
         
         # High volume, one-way communication
-        if contact.email_count > 10 and contact.sent_count == 0:
+        if one_way:
             score += 0.4
         
         # Spam-like domains
-        spam_domains = {'noreply', 'marketing', 'promo', 'newsletter', 'deals'}
-        if any(spam_term in ' '.join(contact.domains) 
-               for spam_term in spam_domains):
+        if not SPAM_DOMAINS.isdisjoint(_domain_labels(contact.domains)):
             score += 0.3
         
         # No personal name
-        if not contact.name or contact.name.lower() in ['noreply', 'no-reply']:
+        if no_name:
             score += 0.2
         
         # Automated messages
@@ -378,8 +623,7 @@ class ContactManager:
             score += 0.3
         
         # Promotional labels
-        promo_labels = {'PROMOTIONS', 'SPAM', 'JUNK'}
-        if any(label in contact.labels_associated for label in promo_labels):
+        if promotional:
             score += 0.4
 
         return min(1.0, score)
@@ -425,8 +669,10 @@ class ContactManager:
 
     def get_frequent_contacts(self, limit: int = 50) -> List[Contact]:
         """Get most frequent contacts."""
-        frequent = [c for c in self.contacts.values() if c.is_frequent]
-        return sorted(frequent, key=lambda x: x.email_count, reverse=True)[:limit]
+        # Equivalent to sorting and slicing, ties included, without
+        # sorting every frequent contact
+        frequent = (c for c in self.contacts.values() if c.is_frequent)
+        return heapq.nlargest(limit, frequent, key=lambda x: x.email_count)
 
     def get_spam_contacts(self) -> List[Contact]:
         """Get contacts identified as spam."""
@@ -436,20 +682,52 @@ class ContactManager:
         """Get contacts marked as important."""
         return [c for c in self.contacts.values() if c.is_important]
 
+    def _index_contact(self, contact: Contact) -> None:
+        """Add a contact's email and name to the search index."""
+        trigrams = _trigrams(contact.email.lower())
+        if contact.name:
+            trigrams |= _trigrams(contact.name.lower())
+        for trigram in trigrams:
+            self._trigram_index[trigram].add(contact.email)
+        self._indexed[contact.email] = contact.name
+
     def find_contacts(self, query: str) -> List[Contact]:
         """Search contacts by email or name."""
         query = query.lower()
         matches = []
         
-        for contact in self.contacts.values():
+        if len(query) >= 3:
+            # Index contacts added, replaced or renamed since the last search.
+            # Trigrams of old names are left behind; the substring test below
+            # drops the stale candidates they produce.
+            indexed = self._indexed
+            for email, contact in self.contacts.items():
+                if email not in indexed or indexed[email] != contact.name:
+                    self._index_contact(contact)
+            
+            # Candidates contain every trigram of the query; confirm with a substring test
+            trigram_sets = sorted(
+                (self._trigram_index.get(trigram, set()) for trigram in _trigrams(query)),
+                key=len
+            )
+            candidates = set.intersection(*trigram_sets)
+            contacts = [self.contacts[email] for email in candidates if email in self.contacts]
+        else:
+            contacts = self.contacts.values()
+        
+        for contact in contacts:
             if (query in contact.email.lower() or 
                 (contact.name and query in contact.name.lower())):
                 matches.append(contact)
         
         return sorted(matches, key=lambda x: x.email_count, reverse=True)
 
-    def get_contact_suggestions(self) -> Dict[str, List[str]]:
-        """Get suggestions for contact management actions."""
+    def get_contact_suggestions(self, now: Optional[datetime] = None) -> Dict[str, List[str]]:
+        """Get suggestions for contact management actions.
+        
+        ``now`` is the reference time for inactivity; it defaults to the
+        current time.
+        """
         suggestions = {
             "contacts_to_block": [],
             "contacts_to_whitelist": [],
@@ -457,122 +735,128 @@ class ContactManager:
             "inactive_contacts": [],
         }
 
-        # Contacts to potentially block (high spam score)
+        name_to_emails = defaultdict(list)
+        # Contacts may hold naive or aware dates, so compare everything in UTC
+        cutoff_date = _normalize_datetime(now or datetime.now(timezone.utc)) - timedelta(days=365)
+        
+        # All four suggestion lists are filled in one pass over the contacts
         for contact in self.contacts.values():
-            spam_score = self._calculate_spam_score(contact)
-            if spam_score > 0.8:
+            # Contacts to potentially block (high spam score)
+            if self._calculate_spam_score(contact) > 0.8:
                 suggestions["contacts_to_block"].append(contact.email)
 
-        # Contacts to whitelist (important but not marked)
-        for contact in self.contacts.values():
+            # Contacts to whitelist (important but not marked)
             if (not contact.is_important and 
                 self._calculate_importance_score(contact) > 0.7):
                 suggestions["contacts_to_whitelist"].append(contact.email)
 
-        # Find potential duplicates (same name, different emails)
-        name_to_emails = defaultdict(list)
-        for contact in self.contacts.values():
-            if contact.name:
-                name_to_emails[contact.name.lower()].append(contact.email)
-        
-        for name, emails in name_to_emails.items():
-            if len(emails) > 1:
-                suggestions["potential_duplicates"].extend(emails)
+            # Group by name to find potential duplicates
+            name_key = _name_key(contact.name) if contact.name else ''
+            if name_key:
+                name_to_emails[name_key].append(contact.email)
 
-        # Inactive contacts (no recent activity)
-        cutoff_date = datetime.now() - timedelta(days=365)
-        for contact in self.contacts.values():
+            # Inactive contacts (no recent activity)
             if (contact.last_seen and 
-                contact.last_seen < cutoff_date and 
+                _normalize_datetime(contact.last_seen) < cutoff_date and 
                 not contact.is_important):
                 suggestions["inactive_contacts"].append(contact.email)
 
+        # Potential duplicates (same name, different emails)
+        for name, emails in name_to_emails.items():
+            if len(emails) > 1:
+                suggestions["potential_duplicates"].extend(emails)
+
         return suggestions
 
     def _save_contacts_to_db(self) -> None:
-        """Save contacts to SQLite database."""
-        with sqlite3.connect(self.db_path) as conn:
-            # Clear existing data
-            conn.execute("DELETE FROM contact_subjects")
-            conn.execute("DELETE FROM contact_domains")
-            conn.execute("DELETE FROM contacts")
-            
-            # Insert contacts
-            for contact in self.contacts.values():
-                conn.execute('''
-                    INSERT OR REPLACE INTO contacts 
-                    (email, name, first_seen, last_seen, email_count, sent_count, 
-                     received_count, is_frequent, is_important, is_spam, is_automated, 
-                     is_subscription, has_unsubscribe, confidence_score, notes)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    contact.email, contact.name, contact.first_seen, contact.last_seen,
-                    contact.email_count, contact.sent_count, contact.received_count,
-                    contact.is_frequent, contact.is_important, contact.is_spam,
-                    contact.is_automated, contact.is_subscription, contact.has_unsubscribe,
-                    contact.confidence_score, '; '.join(contact.notes)
-                ))
-                
-                # Insert domains
-                for domain in contact.domains:
-                    conn.execute(
-                        "INSERT INTO contact_domains (contact_email, domain) VALUES (?, ?)",
-                        (contact.email, domain)
-                    )
-                
-                # Insert subjects (limit to recent ones)
-                subject_counter = Counter(contact.subjects_seen)
-                for subject, count in subject_counter.most_common(20):
-                    conn.execute(
-                        "INSERT INTO contact_subjects (contact_email, subject, seen_count) VALUES (?, ?, ?)",
-                        (contact.email, subject, count)
-                    )
+        """Save new and changed contacts to SQLite database."""
+        changed = (self._dirty | (self.contacts.keys() - self._persisted)) & self.contacts.keys()
+        if not changed:
+            return
+        contacts = [self.contacts[email] for email in changed]
+        
+        contact_rows = (
+            (
+                contact.email, contact.name, contact.first_seen, contact.last_seen,
+                contact.email_count, contact.sent_count, contact.received_count,
+                contact.is_frequent, contact.is_important, contact.is_spam,
+                contact.is_automated, contact.is_subscription, contact.has_unsubscribe,
+                contact.confidence_score, '; '.join(contact.notes)
+            )
+            for contact in contacts
+        )
+        domain_rows = (
+            (contact.email, domain)
+            for contact in contacts
+            for domain in contact.domains
+        )
+        # Subjects are limited to the most frequent ones
+        subject_rows = (
+            (contact.email, subject, count)
+            for contact in contacts
+            for subject, count in contact.subjects_seen.most_common(20)
+        )
+        
+        # All rows go in one transaction, committed when the block exits.
+        # Child rows of changed contacts are replaced, so subjects that fell
+        # out of the top 20 do not linger.
+        keys = [(contact.email,) for contact in contacts]
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(SQL_UPSERT_CONTACT, contact_rows)
+            cursor.executemany(SQL_DELETE_DOMAINS, keys)
+            cursor.executemany(SQL_DELETE_SUBJECTS, keys)
+            cursor.executemany(SQL_INSERT_DOMAIN, domain_rows)
+            cursor.executemany(SQL_INSERT_SUBJECT, subject_rows)
+        
+        self._persisted |= changed
+        self._dirty.clear()
 
     def load_contacts_from_db(self) -> None:
         """Load contacts from SQLite database."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._connect() as conn:
+                # Load domains and subjects for all contacts up front
+                domains_by_email: Dict[str, Set[str]] = defaultdict(set)
+                for email, domain in conn.execute("SELECT contact_email, domain FROM contact_domains"):
+                    domains_by_email[email].add(domain)
                 
-                # Load contacts
-                contacts_cursor = conn.execute('''
-                    SELECT * FROM contacts
-                ''')
+                subjects_by_email: Dict[str, Counter[str]] = defaultdict(Counter)
+                for email, subject, count in conn.execute(
+                    "SELECT contact_email, subject, seen_count FROM contact_subjects"
+                ):
+                    subjects_by_email[email][subject] += count
                 
-                for row in contacts_cursor:
-                    contact = Contact(
-                        email=row['email'],
-                        name=row['name'],
-                        first_seen=_normalize_datetime(datetime.fromisoformat(row['first_seen'])) if row['first_seen'] else None,
-                        last_seen=_normalize_datetime(datetime.fromisoformat(row['last_seen'])) if row['last_seen'] else None,
-                        email_count=row['email_count'],
-                        sent_count=row['sent_count'],
-                        received_count=row['received_count'],
-                        is_frequent=bool(row['is_frequent']),
-                        is_important=bool(row['is_important']),
-                        is_spam=bool(row['is_spam']),
-                        is_automated=bool(row['is_automated']),
-                        is_subscription=bool(row['is_subscription'] if 'is_subscription' in row.keys() else 0),
-                        has_unsubscribe=bool(row['has_unsubscribe'] if 'has_unsubscribe' in row.keys() else 0),
-                        confidence_score=row['confidence_score'],
-                        notes=row['notes'].split('; ') if row['notes'] else [],
-                    )
-                    
-                    # Load domains
-                    domains_cursor = conn.execute(
-                        "SELECT domain FROM contact_domains WHERE contact_email = ?",
-                        (contact.email,)
-                    )
-                    contact.domains = {row[0] for row in domains_cursor}
-                    
-                    # Load subjects
-                    subjects_cursor = conn.execute(
-                        "SELECT subject FROM contact_subjects WHERE contact_email = ?",
-                        (contact.email,)
+                # Load contacts as plain tuples in one fetch
+                rows = conn.execute(SQL_SELECT_CONTACTS).fetchall()
+                
+                fromisoformat = datetime.fromisoformat
+                normalize = _normalize_datetime
+                contacts = [
+                    Contact(
+                        email=r[0],
+                        name=r[1],
+                        first_seen=normalize(fromisoformat(r[2])) if r[2] else None,
+                        last_seen=normalize(fromisoformat(r[3])) if r[3] else None,
+                        email_count=r[4],
+                        sent_count=r[5],
+                        received_count=r[6],
+                        is_frequent=bool(r[7]),
+                        is_important=bool(r[8]),
+                        is_spam=bool(r[9]),
+                        is_automated=bool(r[10]),
+                        is_subscription=bool(r[11]),
+                        has_unsubscribe=bool(r[12]),
+                        confidence_score=r[13],
+                        notes=r[14].split('; ') if r[14] else [],
+                        domains=domains_by_email.get(r[0], set()),
+                        subjects_seen=subjects_by_email.get(r[0], Counter()),
                     )
-                    contact.subjects_seen = [row[0] for row in subjects_cursor]
-                    
-                    self.contacts[contact.email] = contact
+                    for r in rows
+                ]
+                
+                self.contacts.update((contact.email, contact) for contact in contacts)
+                self._persisted.update(contact.email for contact in contacts)
 
                 logger.info(f"Loaded {len(self.contacts)} contacts from database")
                 
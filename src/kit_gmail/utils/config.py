@@ -18,6 +18,15 @@ class Settings(BaseSettings):
     openai_api_key: Optional[str] = None
     xai_api_key: Optional[str] = None
     default_ai_service: str = "anthropic"
+    # Requests per minute sent to each AI provider, and retries for rate
+    # limits, timeouts and server errors
+    ai_requests_per_minute: int = 50
+    ai_max_retries: int = 5
+    # Input token budget for summary requests, prompt included
+    max_context_tokens: int = 8000
+    # SQLite file keeping AI responses between runs; off ("") by default
+    # because responses quote email content
+    ai_response_cache_path: str = ""
     
     # Database Configuration
     database_url: str = "sqlite:///kit_gmail.db"
@@ -27,6 +36,10 @@ class Settings(BaseSettings):
     log_level: str = "INFO"
     max_email_batch_size: int = 100
     default_summary_days: int = 7
+    # Gmail per-user quota budget used to size concurrent fetches
+    gmail_quota_units_per_sec: int = 250
+    # Concurrent async Gmail requests
+    gmail_max_concurrent_requests: int = 20
     
     # Security
     secret_key: Optional[str] = None
@@ -35,6 +48,13 @@ class Settings(BaseSettings):
     receipt_keywords: str = "receipt,invoice,order,purchase,payment"
     junk_keywords: str = "unsubscribe,promotion,deal,offer,sale"
     critical_senders: str = "bank,insurance,government,tax"
+    # Characters of each body scanned during classification (0 = no limit)
+    classification_scan_chars: int = 16384
+    # Fall back to dateparser for Date headers that are not RFC 2822; needs
+    # the optional dateparser package (pip install "kit-gmail[dates]")
+    date_parser_fallback: bool = False
+    # Worker processes for batch classification (0 = thread pool in-process)
+    classification_processes: int = 0
     
     class Config:
         env_file = ".env"
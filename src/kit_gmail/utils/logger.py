@@ -1,19 +1,60 @@
 """Logging configuration and utilities."""
 
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from typing import Optional
 
 from .config import settings
 
+# Records are queued and written by a background thread, so logging from
+# async code never blocks the event loop on console or disk I/O
+_queue_listener: Optional[QueueListener] = None
+
+# Default configuration is applied when the first record is logged rather
+# than on import, and never once setup_logging has run. Until then only the
+# package logger carries a placeholder handler and level; the root logger is
+# left alone.
+PACKAGE_LOGGER = "kit_gmail"
+_configured = False
+
+
+def _stop_queue_listener() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
 
 def setup_logging(
     level: Optional[str] = None,
     log_file: Optional[str] = None,
     format_string: Optional[str] = None
 ) -> None:
-    """Set up application logging."""
+    """Set up application logging, replacing any existing root handlers."""
+    _configure(level, log_file, format_string, replace=True)
+
+
+def _configure(
+    level: Optional[str],
+    log_file: Optional[str],
+    format_string: Optional[str],
+    replace: bool,
+) -> None:
+    """Install the console/file handlers on the root logger.
+    
+    With ``replace`` the root level is set and existing root handlers are
+    removed; otherwise the handlers are added alongside any already there
+    and only the package logger's level is set.
+    """
+    global _configured
+    _configured = True
+    _stop_queue_listener()
+    _remove_deferred_handler()
     
     # Determine log level
     log_level = level or settings.log_level
@@ -33,25 +74,37 @@ def setup_logging(
     
     # Configure root logger
     root_logger = logging.getLogger()
-    root_logger.setLevel(numeric_level)
-    
-    # Remove existing handlers
-    for handler in root_logger.handlers[:]:
-        root_logger.removeHandler(handler)
+    package_logger = logging.getLogger(PACKAGE_LOGGER)
+    if replace:
+        root_logger.setLevel(numeric_level)
+        package_logger.setLevel(logging.NOTSET)
+        
+        # Remove existing handlers
+        for handler in root_logger.handlers[:]:
+            root_logger.removeHandler(handler)
+    else:
+        package_logger.setLevel(numeric_level)
     
-    # Add console handler
+    # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
+    handlers = [console_handler]
     
-    # Add file handler if specified
+    # File handler if specified
     if log_file:
         log_path = Path(log_file)
         log_path.parent.mkdir(parents=True, exist_ok=True)
         
         file_handler = logging.FileHandler(log_path)
         file_handler.setFormatter(formatter)
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
+    
+    # Hand records to the writer thread
+    global _queue_listener
+    record_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root_logger.addHandler(QueueHandler(record_queue))
+    _queue_listener = QueueListener(record_queue, *handlers, respect_handler_level=True)
+    _queue_listener.start()
     
     # Set levels for external libraries
     logging.getLogger("httpx").setLevel(logging.WARNING)
@@ -61,10 +114,45 @@ def setup_logging(
     logging.getLogger("google.auth").setLevel(logging.WARNING)
 
 
+class _DeferredSetupHandler(logging.Handler):
+    """Package logger handler that applies the default configuration on first use.
+    
+    The triggering record then propagates to the root handlers just added.
+    """
+    
+    def handle(self, record: logging.LogRecord) -> bool:
+        if not _configured:
+            _configure(None, None, None, replace=False)
+        _remove_deferred_handler()
+        return True
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        pass
+
+
+_deferred_handler: Optional[_DeferredSetupHandler] = None
+
+
+def _remove_deferred_handler() -> None:
+    global _deferred_handler
+    if _deferred_handler is not None:
+        logging.getLogger(PACKAGE_LOGGER).removeHandler(_deferred_handler)
+        _deferred_handler = None
+
+
 def get_logger(name: str) -> logging.Logger:
-    """Get a logger instance for a specific module."""
+    """Get a logger instance for a specific module.
+    
+    Only a placeholder handler is installed here; handlers, files and the
+    writer thread are set up by the first record actually logged.
+    """
+    global _deferred_handler
+    if not _configured and _deferred_handler is None:
+        _deferred_handler = _DeferredSetupHandler()
+        package_logger = logging.getLogger(PACKAGE_LOGGER)
+        package_logger.setLevel(getattr(logging, settings.log_level.upper(), logging.INFO))
+        package_logger.addHandler(_deferred_handler)
     return logging.getLogger(name)
 
 
-# Initialize logging when module is imported
-setup_logging()
\ No newline at end of file
+atexit.register(_stop_queue_listener)
\ No newline at end of file
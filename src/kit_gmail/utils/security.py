@@ -1,9 +1,13 @@
 """Security utilities and helpers."""
 
 import hashlib
+import ipaddress
+import re
 import secrets
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
+from urllib.parse import urlparse
 import keyring
 
 from .logger import get_logger
@@ -12,15 +16,20 @@ logger = get_logger(__name__)
 
 SERVICE_NAME = "kit-gmail"
 
+UNSAFE_HOSTS = frozenset({'localhost', '127.0.0.1', '0.0.0.0', '::1'})
+
+EMAIL_ADDRESS_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
 
 def generate_secret_key(length: int = 32) -> str:
     """Generate a cryptographically secure secret key."""
     return secrets.token_urlsafe(length)
 
 
+@lru_cache(maxsize=8192)
 def hash_email(email: str) -> str:
     """Hash email address for privacy in logs."""
-    return hashlib.sha256(email.encode()).hexdigest()[:8]
+    return hashlib.blake2b(email.encode(), digest_size=4).hexdigest()
 
 
 def store_api_key(service: str, api_key: str) -> bool:
@@ -59,9 +68,7 @@ def delete_api_key(service: str) -> bool:
 
 def validate_email_address(email: str) -> bool:
     """Basic email address validation."""
-    import re
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return EMAIL_ADDRESS_PATTERN.match(email) is not None
 
 
 def sanitize_filename(filename: str) -> str:
@@ -74,8 +81,6 @@ def sanitize_filename(filename: str) -> str:
 
 def is_safe_url(url: str) -> bool:
     """Check if URL is safe (basic validation)."""
-    from urllib.parse import urlparse
-    
     try:
         parsed = urlparse(url)
         # Only allow http/https
@@ -84,9 +89,15 @@ def is_safe_url(url: str) -> bool:
         # Require hostname
         if not parsed.hostname:
             return False
-        # Block localhost and private IPs (basic check)
-        if parsed.hostname in ['localhost', '127.0.0.1', '0.0.0.0']:
+        # Block localhost and private IPs
+        if parsed.hostname in UNSAFE_HOSTS:
             return False
+        try:
+            if ipaddress.ip_address(parsed.hostname).is_private:
+                return False
+        except ValueError:
+            # Not an IP literal
+            pass
         return True
     except Exception:
         return False
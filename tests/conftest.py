@@ -1,54 +1,105 @@
 """Pytest configuration and fixtures."""
 
+import base64
+import copy
 import pytest
-from unittest.mock import Mock, MagicMock
+from unittest.mock import AsyncMock, Mock, MagicMock
 from datetime import datetime, timedelta
-import os
-import tempfile
-from pathlib import Path
+import shutil
+import sqlite3
+from uuid import uuid4
 
-# Set up test environment
-os.environ["DATABASE_URL"] = "sqlite:///:memory:"
-os.environ["DEBUG"] = "true"
+from googleapiclient.errors import HttpError
 
+# Test environment, applied before collection imports the settings module
+TEST_ENV = {
+    "DATABASE_URL": "sqlite:///:memory:",
+    "DEBUG": "true",
+}
+_env_patch = pytest.MonkeyPatch()
 
-@pytest.fixture
-def mock_gmail_service():
-    """Mock Gmail API service."""
-    service = Mock()
+
+def pytest_configure(config):
+    """Set the test environment variables for the whole run."""
+    for name, value in TEST_ENV.items():
+        _env_patch.setenv(name, value)
+
+
+def pytest_unconfigure(config):
+    """Restore the environment variables changed by pytest_configure."""
+    _env_patch.undo()
+
+
+# Sample message body, encoded as the Gmail API delivers it and decoded once
+SAMPLE_BODY_B64 = "VGVzdCBlbWFpbCBib2R5IGNvbnRlbnQ="
+SAMPLE_BODY_TEXT = base64.urlsafe_b64decode(SAMPLE_BODY_B64).decode()
+
+# Fixed clock for sample objects, matching the sample message's Date header
+SAMPLE_NOW = datetime(2023, 11, 15, 10, 30)
+
+
+class FakeBatchHttpRequest:
+    """Stand-in for BatchHttpRequest that executes requests sequentially."""
+    
+    def __init__(self, callback=None):
+        self._callback = callback
+        self._requests = []
     
-    # Mock users()
-    service.users.return_value = Mock()
-    service.users().getProfile.return_value.execute.return_value = {
+    def add(self, request, callback=None, request_id=None):
+        request_id = request_id or str(len(self._requests) + 1)
+        self._requests.append((request_id, request, callback or self._callback))
+    
+    def execute(self):
+        for request_id, request, callback in self._requests:
+            try:
+                response, exception = request.execute(), None
+            except HttpError as error:
+                response, exception = None, error
+            if callback:
+                callback(request_id, response, exception)
+
+
+# Canned Gmail API responses, keyed by the call chain that returns them
+GMAIL_RESPONSES = {
+    "users.getProfile.execute": {
         "emailAddress": "test@example.com",
         "messagesTotal": 1000,
         "threadsTotal": 800
-    }
-    
-    # Mock messages
-    service.users().messages.return_value = Mock()
-    service.users().messages().list.return_value.execute.return_value = {
+    },
+    "users.messages.list.execute": {
         "messages": [
             {"id": "msg1", "threadId": "thread1"},
             {"id": "msg2", "threadId": "thread2"}
         ]
-    }
-    
-    # Mock labels
-    service.users().labels.return_value = Mock()
-    service.users().labels().list.return_value.execute.return_value = {
+    },
+    "users.labels.list.execute": {
         "labels": [
             {"id": "INBOX", "name": "INBOX"},
             {"id": "SENT", "name": "SENT"}
         ]
-    }
+    },
+}
+
+
+@pytest.fixture
+def mock_gmail_service():
+    """Mock Gmail API service."""
+    service = Mock()
+    service.new_batch_http_request.side_effect = FakeBatchHttpRequest
+    
+    # Wire every call chain in one configure_mock pass, e.g.
+    # "users.labels.list.execute" -> users().labels().list().execute()
+    service.configure_mock(**{
+        ".return_value.".join(path.split(".")) + ".return_value": response
+        for path, response in copy.deepcopy(GMAIL_RESPONSES).items()
+    })
     
     return service
 
 
-@pytest.fixture
-def sample_gmail_message():
-    """Sample Gmail API message."""
+@pytest.fixture(scope="session")
+def sample_gmail_message_template():
+    """Sample Gmail API message, built once per session."""
     return {
         "id": "test_message_id",
         "threadId": "test_thread_id",
@@ -62,15 +113,27 @@ def sample_gmail_message():
             ],
             "mimeType": "text/plain",
             "body": {
-                "data": "VGVzdCBlbWFpbCBib2R5IGNvbnRlbnQ="  # Base64: "Test email body content"
+                "data": SAMPLE_BODY_B64
             }
         }
     }
 
 
 @pytest.fixture
-def sample_processed_email():
-    """Sample processed email object."""
+def sample_gmail_message(sample_gmail_message_template):
+    """Sample Gmail API message."""
+    return copy.deepcopy(sample_gmail_message_template)
+
+
+@pytest.fixture(scope="session")
+def sample_body_text():
+    """Decoded body of the sample Gmail message."""
+    return SAMPLE_BODY_TEXT
+
+
+@pytest.fixture(scope="session")
+def sample_processed_email_template():
+    """Sample processed email object, built once per session."""
     from kit_gmail.core.email_processor import ProcessedEmail
     
     return ProcessedEmail(
@@ -80,48 +143,132 @@ def sample_processed_email():
         sender="john@example.com",
         sender_name="John Doe",
         recipients=["test@example.com"],
-        date=datetime.now(),
-        body_text="Test email body content",
+        date=SAMPLE_NOW,
+        body_text=SAMPLE_BODY_TEXT,
         labels=["INBOX", "UNREAD"]
     )
 
 
 @pytest.fixture
-def mock_anthropic_client():
+def sample_processed_email(sample_processed_email_template):
+    """Sample processed email object."""
+    return copy.deepcopy(sample_processed_email_template)
+
+
+@pytest.fixture(scope="module")
+def anthropic_client():
+    """Mock Anthropic client shared by the tests of a module."""
+    return Mock()
+
+
+@pytest.fixture
+def mock_anthropic_client(anthropic_client, monkeypatch):
     """Mock Anthropic client."""
-    client = Mock()
-    
-    # Mock message creation
+    # Mock message creation; tests may reconfigure it, so it is swapped in
+    # per test and restored afterwards
     mock_message = Mock()
     mock_message.content = [Mock(text="Test AI response")]
-    client.messages.create.return_value = mock_message
+    monkeypatch.setattr(anthropic_client.messages, "create", AsyncMock(return_value=mock_message))
     
-    return client
+    return anthropic_client
+
+
+@pytest.fixture(scope="module")
+def openai_client():
+    """Mock OpenAI client shared by the tests of a module."""
+    return Mock()
 
 
 @pytest.fixture
-def mock_openai_client():
+def mock_openai_client(openai_client, monkeypatch):
     """Mock OpenAI client."""
-    client = Mock()
-    
-    # Mock chat completion
+    # Mock chat completion, swapped in per test like the Anthropic one
     mock_response = Mock()
     mock_response.choices = [Mock(message=Mock(content="Test AI response"))]
-    client.chat.completions.create.return_value = mock_response
+    monkeypatch.setattr(openai_client.chat.completions, "create", Mock(return_value=mock_response))
+    
+    return openai_client
+
+
+@pytest.fixture(scope="session")
+def async_return():
+    """Factory for plain async stubs that return a fixed value."""
+    def make(value):
+        async def stub(*args, **kwargs):
+            return value
+        return stub
     
-    return client
+    return make
+
+
+@pytest.fixture(scope="session")
+def ai_service_template():
+    """AIService built once per session; tests reset its state."""
+    from kit_gmail.services.ai_service import AIService
+    
+    return AIService()
+
+
+@pytest.fixture(scope="session")
+def temp_db_root(tmp_path_factory):
+    """Directory shared by the test databases of one session."""
+    return tmp_path_factory.mktemp("db")
 
 
 @pytest.fixture
-def temp_db_path():
+def temp_db_path(temp_db_root):
     """Temporary database path for testing."""
-    with tempfile.TemporaryDirectory() as temp_dir:
-        db_path = Path(temp_dir) / "test.db"
-        yield str(db_path)
+    return str(temp_db_root / f"test_{uuid4().hex}.db")
+
+
+@pytest.fixture(scope="session")
+def memory_db_root():
+    """Shared-cache in-memory contacts database, with the schema created once."""
+    from kit_gmail.services.contact_manager import ContactManager
+    
+    path = f"file:contacts_{uuid4().hex}?mode=memory&cache=shared"
+    # The database lives only while a connection to it is open
+    keeper = sqlite3.connect(path, uri=True)
+    ContactManager(db_path=path)
+    yield keeper, path
+    keeper.close()
 
 
 @pytest.fixture
-def mock_keyring():
+def memory_db_path(memory_db_root):
+    """Shared-cache in-memory SQLite URI, emptied for the test."""
+    from kit_gmail.services.contact_manager import CONTACT_TABLES
+    
+    keeper, path = memory_db_root
+    with keeper:
+        for table in CONTACT_TABLES:
+            keeper.execute(f"DELETE FROM {table}")
+    return path
+
+
+@pytest.fixture(scope="session")
+def contact_db_template(temp_db_root):
+    """Contacts database with the schema already created."""
+    from kit_gmail.services.contact_manager import ContactManager
+    
+    path = str(temp_db_root / "contacts_template.db")
+    ContactManager(db_path=path)
+    # Fold the WAL into the main file so a plain copy carries the schema
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def contact_db_path(contact_db_template, temp_db_path):
+    """Temporary contacts database copied from the session template."""
+    shutil.copyfile(contact_db_template, temp_db_path)
+    return temp_db_path
+
+
+@pytest.fixture
+def mock_keyring(monkeypatch):
     """Mock keyring for secure storage testing."""
     storage = {}
     
@@ -136,23 +283,22 @@ def mock_keyring():
         if key in storage:
             del storage[key]
     
-    with pytest.MonkeyPatch().context() as m:
-        m.setattr("keyring.set_password", set_password)
-        m.setattr("keyring.get_password", get_password) 
-        m.setattr("keyring.delete_password", delete_password)
-        yield storage
+    monkeypatch.setattr("keyring.set_password", set_password)
+    monkeypatch.setattr("keyring.get_password", get_password)
+    monkeypatch.setattr("keyring.delete_password", delete_password)
+    return storage
 
 
-@pytest.fixture
-def sample_contact():
-    """Sample contact for testing."""
+@pytest.fixture(scope="session")
+def sample_contact_template():
+    """Sample contact, built once per session."""
     from kit_gmail.services.contact_manager import Contact
     
     return Contact(
         email="john@example.com",
         name="John Doe",
-        first_seen=datetime.now() - timedelta(days=30),
-        last_seen=datetime.now() - timedelta(days=1),
+        first_seen=SAMPLE_NOW - timedelta(days=30),
+        last_seen=SAMPLE_NOW - timedelta(days=1),
         email_count=25,
         sent_count=5,
         received_count=20,
@@ -161,9 +307,26 @@ def sample_contact():
     )
 
 
+@pytest.fixture
+def sample_contact(sample_contact_template):
+    """Sample contact for testing."""
+    return copy.deepcopy(sample_contact_template)
+
+
+@pytest.fixture(autouse=True)
+def no_persistent_ai_cache(monkeypatch):
+    """Keep AI responses out of the user's on-disk cache during tests."""
+    from kit_gmail.utils.config import settings
+
+    monkeypatch.setattr(settings, "ai_response_cache_path", "")
+
+
 @pytest.fixture(autouse=True)
 def reset_singletons():
-    """Reset any singleton instances between tests."""
-    # Clear any cached instances
+    """Clear module-level caches after each test."""
+    from kit_gmail.core.gmail_manager import clear_mailbox_stats_cache
+    from kit_gmail.services.ai_service import clear_response_cache
+
     yield
-    # Cleanup after test
\ No newline at end of file
+    clear_mailbox_stats_cache()
+    clear_response_cache()
\ No newline at end of file
@@ -1,8 +1,10 @@
 """Integration tests for Gmail functionality."""
 
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, call, patch
 import asyncio
+import queue
+from types import SimpleNamespace
 
 from kit_gmail.core import GmailManager
 from kit_gmail.services import ContactManager
@@ -33,6 +35,18 @@ class TestGmailIntegration:
         assert messages[0]["id"] == "msg1"
         assert messages[1]["id"] == "msg2"
     
+    def test_get_message_ids(self, gmail_manager, mock_gmail_service):
+        """Test id-only listing trims the response to message ids."""
+        messages_api = mock_gmail_service.users().messages()
+        messages_api.list().execute.return_value = {
+            "messages": [{"id": "msg1"}, {"id": "msg2"}]
+        }
+        
+        message_ids = gmail_manager.get_message_ids(query="test", max_results=10)
+        
+        assert message_ids == ["msg1", "msg2"]
+        assert messages_api.list.call_args.kwargs["fields"] == "messages/id,nextPageToken"
+    
     def test_get_message_details(self, gmail_manager, mock_gmail_service, sample_gmail_message):
         """Test detailed message retrieval."""
         mock_gmail_service.users().messages().get().execute.return_value = sample_gmail_message
@@ -54,6 +68,170 @@ class TestGmailIntegration:
         assert len(results) == 3
         assert all(r == sample_gmail_message for r in results)
     
+    def test_batch_get_messages_skips_failures(self, gmail_manager, mock_gmail_service):
+        """Test batch retrieval keeps order and skips failed messages."""
+        from googleapiclient.errors import HttpError
+        
+        def get_message(userId, id, format):
+            request = Mock()
+            if id == "bad":
+                request.execute.side_effect = HttpError(Mock(status=404), b"not found")
+            else:
+                request.execute.return_value = {"id": id}
+            return request
+        
+        mock_gmail_service.users().messages().get.side_effect = get_message
+        
+        results = gmail_manager.batch_get_messages(["msg1", "bad", "msg2", "msg1"])
+        
+        assert [r["id"] for r in results] == ["msg1", "msg2", "msg1"]
+        assert mock_gmail_service.new_batch_http_request.call_count == 1
+    
+    def test_batch_get_messages_concurrent(self, gmail_manager, mock_gmail_service):
+        """Test chunks are fetched on worker threads and reassembled in order."""
+        mock_gmail_service.users().messages().get.side_effect = (
+            lambda userId, id, format: Mock(**{"execute.return_value": {"id": id}})
+        )
+        message_ids = [f"msg{i}" for i in range(7)]
+        
+        with patch("kit_gmail.core.gmail_manager.settings.max_email_batch_size", 2), \
+                patch.object(gmail_manager.auth, "build_gmail_service", return_value=mock_gmail_service) as mock_build:
+            results = gmail_manager.batch_get_messages(message_ids)
+        
+        assert [r["id"] for r in results] == message_ids
+        assert mock_gmail_service.new_batch_http_request.call_count == 4
+        assert 1 <= mock_build.call_count <= 4
+    
+    def test_batch_get_messages_reuses_worker_services(self, gmail_manager, mock_gmail_service):
+        """Test worker services are pooled across calls instead of rebuilt."""
+        mock_gmail_service.users().messages().get.side_effect = (
+            lambda userId, id, format: Mock(**{"execute.return_value": {"id": id}})
+        )
+        message_ids = [f"msg{i}" for i in range(4)]
+        
+        with patch("kit_gmail.core.gmail_manager.settings.max_email_batch_size", 2), \
+                patch("kit_gmail.core.gmail_manager.MAX_FETCH_WORKERS", 1), \
+                patch.object(gmail_manager.auth, "build_gmail_service", return_value=mock_gmail_service) as mock_build:
+            gmail_manager.batch_get_messages(message_ids)
+            gmail_manager.batch_get_messages(message_ids)
+        
+        assert mock_build.call_count == 1
+    
+    def test_batch_get_messages_metadata_only(self, gmail_manager, mock_gmail_service):
+        """Test metadata fetches request a partial response."""
+        messages_api = mock_gmail_service.users().messages()
+        messages_api.get.side_effect = (
+            lambda userId, id, **params: Mock(**{"execute.return_value": {"id": id}})
+        )
+        
+        gmail_manager.batch_get_messages(["msg1"], full=False)
+        
+        params = messages_api.get.call_args.kwargs
+        assert params["format"] == "metadata"
+        assert params["fields"] == GmailManager.METADATA_FIELDS
+        assert "Subject" in params["metadataHeaders"]
+    
+    @pytest.mark.asyncio
+    async def test_abatch_get_messages(self, gmail_manager):
+        """Test async message retrieval over the REST API."""
+        import httpx
+        
+        def handler(request):
+            message_id = request.url.path.rsplit("/", 1)[-1]
+            assert request.headers["Authorization"] == "Bearer test-token"
+            if message_id == "bad":
+                return httpx.Response(404)
+            return httpx.Response(200, json={"id": message_id})
+        
+        real_client = httpx.AsyncClient
+        with patch.object(gmail_manager.auth, "get_access_token", return_value="test-token"), \
+                patch("kit_gmail.core.gmail_manager.httpx.AsyncClient",
+                      side_effect=lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs)):
+            results = await gmail_manager.abatch_get_messages(["msg1", "bad", "msg2"])
+        
+        assert [r["id"] for r in results] == ["msg1", "msg2"]
+    
+    @pytest.mark.asyncio
+    async def test_afetch_messages(self, gmail_manager, mock_gmail_service):
+        """Test listing pages feed concurrent detail fetches in order."""
+        import httpx
+        
+        mock_gmail_service.users().messages().list().execute.side_effect = [
+            {"messages": [{"id": "msg1"}, {"id": "msg2"}], "nextPageToken": "page2"},
+            {"messages": [{"id": "msg3"}]},
+        ]
+        
+        def handler(request):
+            return httpx.Response(200, json={"id": request.url.path.rsplit("/", 1)[-1]})
+        
+        real_client = httpx.AsyncClient
+        with patch.object(gmail_manager.auth, "get_access_token", return_value="test-token"), \
+                patch("kit_gmail.core.gmail_manager.httpx.AsyncClient",
+                      side_effect=lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs)):
+            results = await gmail_manager.afetch_messages(query="newer_than:7d", max_results=10)
+        
+        assert [r["id"] for r in results] == ["msg1", "msg2", "msg3"]
+    
+    @pytest.mark.asyncio
+    async def test_quota_pacer(self):
+        """Test async requests wait once the per-second quota is spent."""
+        from unittest.mock import AsyncMock
+        from kit_gmail.core.gmail_manager import _QuotaPacer
+        
+        pacer = _QuotaPacer(units_per_sec=10, units_per_request=5)
+        with patch("kit_gmail.core.gmail_manager.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            await pacer.wait(None)
+            await pacer.wait(None)
+            mock_sleep.assert_not_called()
+            await pacer.wait(None)
+        
+        assert mock_sleep.await_args.args[0] == pytest.approx(0.5, abs=0.05)
+    
+    def test_execute_with_retry(self):
+        """Test rate-limited requests are retried with backoff."""
+        from googleapiclient.errors import HttpError
+        from kit_gmail.core.gmail_manager import _execute_with_retry
+        
+        request = Mock()
+        request.execute.side_effect = [
+            HttpError(Mock(status=429), b"rate limited"),
+            HttpError(Mock(status=503), b"unavailable"),
+            {"id": "msg1"},
+        ]
+        with patch("kit_gmail.core.gmail_manager.time.sleep") as mock_sleep:
+            assert _execute_with_retry(request) == {"id": "msg1"}
+        assert mock_sleep.call_count == 2
+        
+        # Client errors are not retried
+        request.execute.side_effect = HttpError(Mock(status=404), b"not found")
+        with patch("kit_gmail.core.gmail_manager.time.sleep") as mock_sleep:
+            with pytest.raises(HttpError):
+                _execute_with_retry(request)
+        mock_sleep.assert_not_called()
+    
+    def test_batch_get_messages_retries_rate_limited(self, gmail_manager, mock_gmail_service):
+        """Test messages rate limited inside a batch are re-sent."""
+        from googleapiclient.errors import HttpError
+        
+        attempts = {}
+        
+        def get_message(userId, id, format):
+            request = Mock()
+            attempts[id] = attempts.get(id, 0) + 1
+            if id == "msg2" and attempts[id] == 1:
+                request.execute.side_effect = HttpError(Mock(status=429), b"rate limited")
+            else:
+                request.execute.return_value = {"id": id}
+            return request
+        
+        mock_gmail_service.users().messages().get.side_effect = get_message
+        
+        with patch("kit_gmail.core.gmail_manager.time.sleep"):
+            results = gmail_manager.batch_get_messages(["msg1", "msg2", "msg3"])
+        
+        assert [r["id"] for r in results] == ["msg1", "msg2", "msg3"]
+        assert attempts == {"msg1": 1, "msg2": 2, "msg3": 1}
+    
     def test_organize_message(self, gmail_manager, mock_gmail_service, sample_gmail_message):
         """Test message organization."""
         # Mock processed email
@@ -73,8 +251,67 @@ class TestGmailIntegration:
         
         gmail_manager.organize_message(sample_gmail_message, processed_email)
         
-        # Should attempt to modify message labels
-        mock_gmail_service.users().messages().modify.assert_called_once()
+        # Existing labels are reused and the merchant label is created
+        assert mock_gmail_service.users().messages().modify.call_args_list == [
+            call(userId="me", id="test_message_id",
+                 body={"addLabelIds": ["receipts_id", "new_label_id"], "removeLabelIds": []}),
+        ]
+    
+    def test_organize_messages(self, gmail_manager, mock_gmail_service):
+        """Test messages that get the same labels share one batchModify."""
+        def receipt(message_id):
+            return Mock(message_id=message_id, is_receipt=True, merchant=None,
+                        is_mailing_list=False, is_critical=False)
+        
+        mock_gmail_service.users().labels().list().execute.return_value = {
+            "labels": [{"id": "receipts_id", "name": "Receipts"}]
+        }
+        
+        gmail_manager.organize_messages([receipt("msg1"), receipt("msg2")])
+        
+        mock_gmail_service.users().messages().batchModify.assert_called_once_with(
+            userId="me",
+            body={"ids": ["msg1", "msg2"], "addLabelIds": ["receipts_id"], "removeLabelIds": []},
+        )
+        mock_gmail_service.users().messages().modify.assert_not_called()
+    
+    def test_label_cache(self, gmail_manager, mock_gmail_service):
+        """Test labels are listed once and created labels are cached."""
+        labels_api = mock_gmail_service.users().labels()
+        labels_api.list().execute.return_value = {
+            "labels": [{"id": "receipts_id", "name": "Receipts"}]
+        }
+        labels_api.create().execute.return_value = {"id": "new_label_id"}
+        labels_api.list.reset_mock()
+        labels_api.create.reset_mock()
+        
+        assert gmail_manager.get_or_create_label("Receipts") == "receipts_id"
+        assert gmail_manager.get_or_create_label("Lists/news") == "new_label_id"
+        assert gmail_manager.get_or_create_label("Lists/news") == "new_label_id"
+        assert gmail_manager.get_label_id("Receipts") == "receipts_id"
+        assert gmail_manager.get_label_id("Missing") is None
+        
+        labels_api.list.assert_called_once()
+        labels_api.create.assert_called_once()
+        
+        gmail_manager.clear_label_cache()
+        gmail_manager.get_label_id("Receipts")
+        assert labels_api.list.call_count == 2
+    
+    def test_api_resources_cached(self, gmail_manager, mock_gmail_service):
+        """Test users() resources are built once per service."""
+        mock_gmail_service.users.reset_mock()
+        
+        gmail_manager.delete_message("msg1")
+        gmail_manager.archive_message("msg2")
+        gmail_manager.get_label_id("INBOX")
+        assert mock_gmail_service.users.call_count == 1
+        
+        # A replaced service gets fresh resources
+        new_service = Mock()
+        gmail_manager._service = new_service
+        gmail_manager.delete_message("msg3")
+        new_service.users().messages().delete.assert_called_with(userId="me", id="msg3")
     
     def test_delete_message(self, gmail_manager, mock_gmail_service):
         """Test message deletion."""
@@ -88,11 +325,19 @@ class TestGmailIntegration:
         """Test message archiving."""
         gmail_manager.archive_message("test_message_id")
         
-        mock_gmail_service.users().messages().modify.assert_called_once_with(
-            userId="me",
-            id="test_message_id", 
-            body={"removeLabelIds": ["INBOX"]}
-        )
+        assert mock_gmail_service.users().messages().modify.call_args_list == [
+            call(userId="me", id="test_message_id", body={"removeLabelIds": ["INBOX"]}),
+        ]
+    
+    def test_batch_delete_messages(self, gmail_manager, mock_gmail_service):
+        """Test bulk deletion is chunked to the batchDelete limit."""
+        message_ids = [f"msg{i}" for i in range(1500)]
+        
+        gmail_manager.batch_delete_messages(message_ids)
+        
+        calls = mock_gmail_service.users().messages().batchDelete.call_args_list
+        assert [len(c.kwargs["body"]["ids"]) for c in calls] == [1000, 500]
+        mock_gmail_service.users().messages().delete.assert_not_called()
     
     def test_cleanup_mailbox_integration(self, gmail_manager, mock_gmail_service, sample_gmail_message):
         """Test full mailbox cleanup workflow."""
@@ -114,6 +359,99 @@ class TestGmailIntegration:
         assert "archived" in stats
         assert "organized" in stats
         
+    def test_cleanup_mailbox_batches_label_changes(self, gmail_manager, mock_gmail_service, sample_gmail_message):
+        """Test messages with the same label change share one batchModify."""
+        import copy
+        
+        messages = []
+        for message_id in ("msg1", "msg2"):
+            message = copy.deepcopy(sample_gmail_message)
+            message["id"] = message_id
+            messages.append(message)
+        
+        mock_gmail_service.users().labels().list().execute.return_value = {"labels": []}
+        
+        with patch.object(gmail_manager, "_iter_message_pages", return_value=iter([["msg1", "msg2"]])), \
+                patch.object(gmail_manager, "batch_get_messages", return_value=messages):
+            stats = gmail_manager.cleanup_mailbox(days_old=30, delete_junk=True, archive_old=True)
+        
+        assert stats["archived"] == 2
+        assert stats["organized"] == 2
+        mock_gmail_service.users().messages().batchModify.assert_called_once_with(
+            userId="me",
+            body={"ids": ["msg1", "msg2"], "addLabelIds": [], "removeLabelIds": ["INBOX"]},
+        )
+        mock_gmail_service.users().messages().modify.assert_not_called()
+        
+    def test_cleanup_mailbox_streams_pages(self, gmail_manager, mock_gmail_service, sample_gmail_message):
+        """Test each listed page is fetched and flushed before the next."""
+        import copy
+        
+        pages = [["msg1"], ["msg2"]]
+        
+        def fetch(message_ids, full=True):
+            message = copy.deepcopy(sample_gmail_message)
+            message["id"] = message_ids[0]
+            return [message]
+        
+        mock_gmail_service.users().labels().list().execute.return_value = {"labels": []}
+        
+        with patch.object(gmail_manager, "_iter_message_pages", return_value=iter(pages)), \
+                patch.object(gmail_manager, "batch_get_messages", side_effect=fetch) as mock_fetch:
+            stats = gmail_manager.cleanup_mailbox(days_old=30)
+        
+        assert stats["processed"] == 2
+        assert [c.args[0] for c in mock_fetch.call_args_list] == [["msg1"], ["msg2"]]
+        assert mock_gmail_service.users().messages().batchModify.call_count == 2
+        
+    def test_cleanup_mailbox_single_listing(self, gmail_manager, mock_gmail_service):
+        """Test cleanup lists the newest messages across all categories once."""
+        from kit_gmail.core.gmail_manager import CLEANUP_MAX_MESSAGES
+        
+        with patch.object(gmail_manager, "_iter_message_pages", return_value=iter([])) as mock_pages:
+            gmail_manager.cleanup_mailbox(days_old=30)
+        
+        mock_pages.assert_called_once_with(
+            query="older_than:30d", max_results=CLEANUP_MAX_MESSAGES, ids_only=True
+        )
+        
+    def test_cleanup_mailbox_promotions_fetched_in_full(self, gmail_manager, mock_gmail_service, sample_gmail_message):
+        """Test promotional junk is fetched in full, classified and deleted."""
+        import base64
+        
+        message = dict(sample_gmail_message, labelIds=["INBOX", "CATEGORY_PROMOTIONS"])
+        body = b"FREE!!! Win cash prizes! Click here to unsubscribe. Buy now, 50% off!!!"
+        message["payload"]["headers"][0] = {"name": "From", "value": "deals@marketing.shop.com"}
+        message["payload"]["headers"][2] = {"name": "Subject", "value": "FREE!!! Limited time offer - act now!!!"}
+        message["payload"]["body"] = {"data": base64.urlsafe_b64encode(body).decode()}
+        mock_gmail_service.users().labels().list().execute.return_value = {"labels": []}
+        
+        with patch.object(gmail_manager, "_iter_message_pages", return_value=iter([[message["id"]]])), \
+                patch.object(gmail_manager, "batch_get_messages", return_value=[message]) as mock_fetch:
+            stats = gmail_manager.cleanup_mailbox(days_old=30)
+        
+        mock_fetch.assert_called_once_with([message["id"]])
+        assert stats["processed"] == 1
+        assert stats["deleted"] == 1
+        mock_gmail_service.users().messages().batchDelete.assert_called_once_with(
+            userId="me", body={"ids": [message["id"]]}
+        )
+        
+    def test_cleanup_mailbox_deletes_junk(self, gmail_manager, mock_gmail_service, sample_gmail_message):
+        """Test junk is bucketed for batchDelete and kept out of label changes."""
+        junk = dict(sample_gmail_message, id="junk_id", labelIds=["SPAM"])
+        mock_gmail_service.users().labels().list().execute.return_value = {"labels": []}
+        
+        with patch.object(gmail_manager, "_iter_message_pages", return_value=iter([["junk_id"]])), \
+                patch.object(gmail_manager, "batch_get_messages", return_value=[junk]):
+            stats = gmail_manager.cleanup_mailbox(days_old=30)
+        
+        assert stats == {"processed": 1, "deleted": 1, "archived": 0, "organized": 0}
+        mock_gmail_service.users().messages().batchDelete.assert_called_once_with(
+            userId="me", body={"ids": ["junk_id"]}
+        )
+        mock_gmail_service.users().messages().batchModify.assert_not_called()
+        
     def test_get_mailbox_stats(self, gmail_manager, mock_gmail_service):
         """Test mailbox statistics retrieval."""
         # Mock labels list
@@ -139,44 +477,91 @@ class TestGmailIntegration:
         assert stats["INBOX"]["messages_total"] == 1000
         assert stats["INBOX"]["messages_unread"] == 50
 
+    def test_get_mailbox_stats_reuses_label_cache(self, gmail_manager, mock_gmail_service):
+        """Test stats skip labels.list when the label cache is loaded."""
+        gmail_manager._label_cache = {"INBOX": "INBOX"}
+        mock_gmail_service.users().labels().get().execute.return_value = {"messagesTotal": 3}
+        labels_api = mock_gmail_service.users().labels()
+        labels_api.list.reset_mock()
+        
+        stats = gmail_manager.get_mailbox_stats()
+        
+        assert stats["INBOX"]["messages_total"] == 3
+        labels_api.list.assert_not_called()
+        
+    def test_get_labels_batch(self, gmail_manager, mock_gmail_service):
+        """Test label statistics are fetched through one batch request."""
+        mock_gmail_service.users().labels().get().execute.return_value = {
+            "messagesTotal": 10,
+            "messagesUnread": 2,
+        }
+        
+        stats = gmail_manager.get_labels_batch(["INBOX", "SPAM"])
+        
+        mock_gmail_service.new_batch_http_request.assert_called_once()
+        assert set(stats) == {"INBOX", "SPAM"}
+        assert stats["SPAM"]["messages_unread"] == 2
+        
+    def test_get_mailbox_stats_cached(self, gmail_manager, mock_gmail_service):
+        """Test mailbox statistics are reused within the cache TTL."""
+        mock_gmail_service.users().labels().list().execute.return_value = {
+            "labels": [{"id": "INBOX", "name": "INBOX"}]
+        }
+        mock_gmail_service.users().labels().get().execute.return_value = {
+            "messagesTotal": 1000
+        }
+        mock_gmail_service.users().labels().list.reset_mock()
+        
+        first = gmail_manager.get_mailbox_stats()
+        second = GmailManager()
+        second._service = mock_gmail_service
+        
+        assert second.get_mailbox_stats() == first
+        assert mock_gmail_service.users().labels().list.call_count == 1
+        
+        # Callers get copies, so mutating a result leaves the cache intact
+        first["INBOX"]["messages_total"] = 0
+        second.get_mailbox_stats()["INBOX"].clear()
+        assert gmail_manager.get_mailbox_stats()["INBOX"]["messages_total"] == 1000
+        
+        gmail_manager.get_mailbox_stats(use_cache=False)
+        assert mock_gmail_service.users().labels().list.call_count == 2
+
 
 class TestContactIntegration:
     
     @pytest.fixture
-    def contact_manager(self, temp_db_path):
+    def contact_manager(self, contact_db_path):
         """ContactManager with temporary database."""
-        return ContactManager(db_path=temp_db_path)
+        return ContactManager(db_path=contact_db_path)
     
     def test_full_contact_analysis_workflow(self, contact_manager, sample_processed_email):
         """Test complete contact analysis workflow."""
-        # Create multiple emails from different senders
-        emails = []
-        
-        # Email from frequent sender
-        for i in range(10):
-            email = Mock(spec=sample_processed_email)
-            email.sender = "frequent@example.com"
-            email.sender_name = "Frequent Sender"
-            email.recipients = ["me@example.com"]
-            email.date = sample_processed_email.date
-            email.subject = f"Email {i}"
-            email.labels = ["INBOX"]
-            email.is_junk = False
-            email.is_automated = False
-            emails.append(email)
-        
-        # Email from spam sender
-        for i in range(5):
-            email = Mock(spec=sample_processed_email)
-            email.sender = "spam@marketing.com"
-            email.sender_name = None
-            email.recipients = ["me@example.com"]
-            email.date = sample_processed_email.date
-            email.subject = "PROMOTIONAL EMAIL!!!"
-            email.labels = ["INBOX", "PROMOTIONS"]
-            email.is_junk = True
-            email.is_automated = True
-            emails.append(email)
+        # Create multiple emails from different senders: a frequent sender
+        # and a spam sender, as (sender, name, subject, labels, junk/automated,
+        # unsubscribe link, count)
+        senders = [
+            ("frequent@example.com", "Frequent Sender", "Email {}", ("INBOX",),
+             False, None, 10),
+            ("spam@marketing.com", None, "PROMOTIONAL EMAIL!!!", ("INBOX", "PROMOTIONS"),
+             True, "https://marketing.com/unsubscribe", 5),
+        ]
+        emails = [
+            SimpleNamespace(
+                sender=sender,
+                sender_name=name,
+                recipients=["me@example.com"],
+                date=sample_processed_email.date,
+                subject=subject.format(i),
+                body_text="",
+                labels=list(labels),
+                is_junk=flagged,
+                is_automated=flagged,
+                unsubscribe_link=unsubscribe_link,
+            )
+            for sender, name, subject, labels, flagged, unsubscribe_link, count in senders
+            for i in range(count)
+        ]
         
         # Analyze emails
         stats = contact_manager.analyze_emails(emails)
@@ -210,13 +595,23 @@ class TestContactIntegration:
         assert loaded_contact.is_frequent == sample_contact.is_frequent
 
 
+@pytest.fixture(scope="class")
+def workflow_gmail_manager():
+    """GmailManager shared by the tests of a class; full_setup resets it."""
+    return GmailManager()
+
+
 class TestEndToEndWorkflow:
     
     @pytest.fixture
-    def full_setup(self, mock_gmail_service, temp_db_path):
+    def full_setup(self, workflow_gmail_manager, mock_gmail_service, temp_db_path):
         """Full application setup for end-to-end testing."""
-        gmail_manager = GmailManager()
+        gmail_manager = workflow_gmail_manager
+        # A new service also rebuilds the cached API resources
         gmail_manager._service = mock_gmail_service
+        gmail_manager._service_pool = queue.SimpleQueue()
+        gmail_manager.clear_label_cache()
+        gmail_manager.processor.clear_cache()
         
         contact_manager = ContactManager(db_path=temp_db_path)
         
@@ -2,44 +2,209 @@
 
 import pytest
 import asyncio
+import orjson
+from types import SimpleNamespace
 from unittest.mock import Mock, patch, AsyncMock
 
 from kit_gmail.services.ai_service import AIService, AnthropicProvider, OpenAIProvider, XAIProvider
 
 
-class TestAnthropicProvider:
+class TestProviders:
+    """Behaviour shared by every provider."""
     
-    @pytest.fixture
-    def provider(self, mock_anthropic_client):
-        """Anthropic provider with mocked client."""
-        with patch('anthropic.Anthropic', return_value=mock_anthropic_client):
-            return AnthropicProvider("test-api-key")
+    @pytest.fixture(params=["anthropic", "openai", "xai"])
+    def ai_provider(self, request, mock_anthropic_client, mock_openai_client):
+        """Provider with a mocked client, its request method and a reply setter."""
+        if request.param == "anthropic":
+            with patch('anthropic.AsyncAnthropic', return_value=mock_anthropic_client):
+                provider = AnthropicProvider("test-api-key")
+            create = mock_anthropic_client.messages.create
+            
+            def reply(text):
+                create.return_value = Mock(content=[Mock(text=text)])
+        elif request.param == "openai":
+            with patch('openai.AsyncOpenAI', return_value=mock_openai_client):
+                provider = OpenAIProvider("test-api-key")
+            create = mock_openai_client.chat.completions.create = AsyncMock()
+            
+            def reply(text):
+                create.return_value = Mock(choices=[Mock(message=Mock(content=text))])
+        else:
+            provider = XAIProvider("test-api-key")
+            create = provider.client.post = AsyncMock()
+            
+            def reply(text):
+                content = orjson.dumps({"choices": [{"message": {"content": text}}]})
+                create.return_value = Mock(status_code=200, content=content)
+        
+        return provider, create, reply
     
     @pytest.mark.asyncio
-    async def test_generate_summary(self, provider, mock_anthropic_client):
+    async def test_generate_summary(self, ai_provider):
         """Test summary generation."""
-        prompt = "Summarize these emails"
-        context = "Email 1: Test email content"
+        provider, create, reply = ai_provider
+        reply("Test AI response")
         
-        result = await provider.generate_summary(prompt, context)
+        result = await provider.generate_summary("Summarize these emails", "Email 1: Test email content")
         
         assert result == "Test AI response"
-        mock_anthropic_client.messages.create.assert_called_once()
-        
+        create.assert_called_once()
+    
     @pytest.mark.asyncio
-    async def test_analyze_email(self, provider, mock_anthropic_client, sample_processed_email):
+    async def test_analyze_email(self, ai_provider, sample_processed_email):
         """Test email analysis."""
-        # Mock response with JSON content
-        mock_message = Mock()
-        mock_message.content = [Mock(text='{"sentiment": "positive", "category": "personal"}')]
-        mock_anthropic_client.messages.create.return_value = mock_message
+        provider, create, reply = ai_provider
+        reply('{"sentiment": "positive", "category": "personal"}')
         
         result = await provider.analyze_email(sample_processed_email)
         
         assert isinstance(result, dict)
         assert "sentiment" in result or "analysis" in result  # Either parsed JSON or raw text
+        create.assert_called_once()
+    
+    def test_rate_limiter_lock_created_in_loop(self):
+        """Test the limiter builds its lock inside the loop that first uses it."""
+        from kit_gmail.services.ai_service import _RateLimiter
+        
+        limiter = _RateLimiter(requests_per_minute=600)
+        assert limiter._lock is None
+        
+        asyncio.run(limiter.acquire())
+        assert isinstance(limiter._lock, asyncio.Lock)
 
 
+class TestAnthropicProvider:
+    
+    @pytest.fixture
+    def provider(self, mock_anthropic_client):
+        """Anthropic provider with mocked client."""
+        with patch('anthropic.AsyncAnthropic', return_value=mock_anthropic_client):
+            return AnthropicProvider("test-api-key")
+    
+    @pytest.mark.asyncio
+    async def test_analyze_email_tool_use(self, provider, mock_anthropic_client, sample_processed_email):
+        """Test analyses are read from a forced tool call without JSON parsing."""
+        analysis = {"sentiment": "neutral", "category": "business", "priority": "low",
+                    "topics": [], "action": "none"}
+        mock_anthropic_client.messages.create.return_value = Mock(
+            content=[Mock(type="tool_use", input=analysis)]
+        )
+        
+        result = await provider.analyze_email(sample_processed_email)
+        
+        assert result == analysis
+        kwargs = mock_anthropic_client.messages.create.call_args.kwargs
+        assert kwargs["tool_choice"] == {"type": "tool", "name": kwargs["tools"][0]["name"]}
+    
+    @pytest.mark.asyncio
+    async def test_analyze_email_static_prefix(self, provider, mock_anthropic_client, sample_processed_email):
+        """Test instructions go in a cacheable system prompt and the email in the user turn."""
+        await provider.analyze_email(sample_processed_email)
+        
+        kwargs = mock_anthropic_client.messages.create.call_args.kwargs
+        assert kwargs["system"][0]["cache_control"] == {"type": "ephemeral"}
+        assert sample_processed_email.subject not in kwargs["system"][0]["text"]
+        assert kwargs["messages"][0]["content"].startswith(f"Subject: {sample_processed_email.subject}")
+    
+    @pytest.mark.asyncio
+    async def test_responses_cached(self, provider, mock_anthropic_client, sample_processed_email):
+        """Test repeated requests are answered from the response cache."""
+        assert await provider.generate_summary("Summarize", "ctx") == "Test AI response"
+        assert await provider.generate_summary("Summarize", "ctx") == "Test AI response"
+        assert mock_anthropic_client.messages.create.call_count == 1
+        
+        mock_anthropic_client.messages.create.return_value = Mock(
+            content=[Mock(text='{"sentiment": "positive"}')]
+        )
+        first = await provider.analyze_email(sample_processed_email)
+        first["email_id"] = "annotated"
+        second = await provider.analyze_email(sample_processed_email)
+        
+        assert second == {"sentiment": "positive"}
+        assert mock_anthropic_client.messages.create.call_count == 2
+    
+    def test_analysis_keys_follow_prompt_body(self, provider, sample_processed_email):
+        """Test cache keys change whenever the prompt's body snippet does."""
+        import copy
+        from kit_gmail.services.ai_service import _analysis_key, _email_fields, _template_key
+        
+        # Identical first 1000 characters, different compressed snippets
+        first = copy.copy(sample_processed_email)
+        first.body_text = "\n" * 1200 + "Please pay the attached invoice"
+        second = copy.copy(sample_processed_email)
+        second.body_text = "\n" * 1200 + "Your account has been suspended"
+        
+        assert _email_fields(first) != _email_fields(second)
+        assert _analysis_key(provider, first) != _analysis_key(provider, second)
+        assert _template_key(provider, first) != _template_key(provider, second)
+    
+    @pytest.mark.asyncio
+    async def test_responses_persist_across_runs(self, provider, mock_anthropic_client, tmp_path, monkeypatch):
+        """Test cached responses are served from disk once memory is cleared."""
+        from kit_gmail.services.ai_service import clear_response_cache
+        from kit_gmail.utils.config import settings
+        monkeypatch.setattr(settings, "ai_response_cache_path", str(tmp_path / "ai_cache.db"))
+        
+        assert await provider.generate_summary("Summarize", "ctx") == "Test AI response"
+        clear_response_cache()
+        assert await provider.generate_summary("Summarize", "ctx") == "Test AI response"
+        assert mock_anthropic_client.messages.create.call_count == 1
+        
+        clear_response_cache(persistent=True)
+        await provider.generate_summary("Summarize", "ctx")
+        assert mock_anthropic_client.messages.create.call_count == 2
+        assert (tmp_path / "ai_cache.db").stat().st_mode & 0o777 == 0o600
+    
+    def test_disk_cache_shared_between_threads(self, tmp_path):
+        """Test the persistent cache serializes access to its one connection."""
+        from concurrent.futures import ThreadPoolExecutor
+        from kit_gmail.services.ai_service import _DiskResponseCache
+        from kit_gmail.utils.config import Settings
+        
+        assert Settings().ai_response_cache_path == ""
+        cache = _DiskResponseCache(str(tmp_path / "ai_cache.db"))
+        
+        def round_trip(i):
+            key = str(i).encode()
+            cache.put(key, {"n": i}, 60)
+            return cache.get(key)
+        
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(round_trip, range(200)))
+        assert results == [{"n": i} for i in range(200)]
+    
+    @pytest.mark.asyncio
+    async def test_analyze_emails_batch(self, provider, mock_anthropic_client, sample_processed_email):
+        """Test several emails are analyzed with one request."""
+        import copy
+        other = copy.copy(sample_processed_email)
+        other.subject = "Another subject"
+        mock_anthropic_client.messages.create.return_value = Mock(content=[Mock(
+            text='Here you go: {"results": [{"sentiment": "positive"}, {"sentiment": "neutral"}]}'
+        )])
+        
+        results = await provider.analyze_emails_batch([sample_processed_email, other])
+        
+        assert results == [{"sentiment": "positive"}, {"sentiment": "neutral"}]
+        prompt = mock_anthropic_client.messages.create.call_args.kwargs["messages"][0]["content"]
+        assert "[[2]]" in prompt and "Another subject" in prompt
+        assert mock_anthropic_client.messages.create.call_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_analyze_emails_batch_mismatch(self, provider, mock_anthropic_client, sample_processed_email):
+        """Test a response that does not fit the batch falls back to single analyses."""
+        import copy
+        other = copy.copy(sample_processed_email)
+        other.subject = "Another subject"
+        mock_anthropic_client.messages.create.return_value = Mock(content=[Mock(
+            text='{"results": [{"sentiment": "positive"}]}'
+        )])
+        
+        results = await provider.analyze_emails_batch([sample_processed_email, other])
+        
+        assert len(results) == 2
+        assert mock_anthropic_client.messages.create.call_count == 3
+
 class TestOpenAIProvider:
     
     @pytest.fixture
@@ -49,24 +214,29 @@ class TestOpenAIProvider:
             return OpenAIProvider("test-api-key")
     
     @pytest.mark.asyncio
-    async def test_generate_summary(self, provider, mock_openai_client):
-        """Test summary generation."""
-        mock_openai_client.chat.completions.create = AsyncMock()
-        mock_response = Mock()
-        mock_response.choices = [Mock(message=Mock(content="Test AI response"))]
-        mock_openai_client.chat.completions.create.return_value = mock_response
+    async def test_generate_summary_streaming(self, provider, mock_openai_client):
+        """Test streamed summary chunks reach the callback as they arrive."""
+        async def stream():
+            for text in ["Test ", None, "AI response"]:
+                yield Mock(choices=[Mock(delta=Mock(content=text))])
         
-        prompt = "Summarize these emails"
-        context = "Email 1: Test email content"
+        mock_openai_client.chat.completions.create = AsyncMock(return_value=stream())
+        chunks = []
         
-        result = await provider.generate_summary(prompt, context)
+        result = await provider.generate_summary("Summarize", "ctx", stream_callback=chunks.append)
         
         assert result == "Test AI response"
-        mock_openai_client.chat.completions.create.assert_called_once()
+        assert chunks == ["Test ", "AI response"]
+        assert mock_openai_client.chat.completions.create.call_args.kwargs["stream"] is True
+        
+        # A cached summary is replayed to the callback in one chunk
+        chunks.clear()
+        assert await provider.generate_summary("Summarize", "ctx", stream_callback=chunks.append) == result
+        assert chunks == ["Test AI response"]
     
     @pytest.mark.asyncio
-    async def test_analyze_email(self, provider, mock_openai_client, sample_processed_email):
-        """Test email analysis."""
+    async def test_analyze_email_strict_schema(self, provider, mock_openai_client, sample_processed_email):
+        """Test analyses request a strict JSON schema."""
         mock_openai_client.chat.completions.create = AsyncMock()
         mock_response = Mock()
         mock_response.choices = [Mock(message=Mock(content='{"sentiment": "neutral"}'))]
@@ -74,8 +244,10 @@ class TestOpenAIProvider:
         
         result = await provider.analyze_email(sample_processed_email)
         
-        assert isinstance(result, dict)
-        assert "sentiment" in result or "analysis" in result
+        assert result == {"sentiment": "neutral"}
+        response_format = mock_openai_client.chat.completions.create.call_args.kwargs["response_format"]
+        assert response_format["type"] == "json_schema"
+        assert response_format["json_schema"]["strict"] is True
 
 
 class TestXAIProvider:
@@ -86,68 +258,77 @@ class TestXAIProvider:
         return XAIProvider("test-api-key")
     
     @pytest.mark.asyncio
-    async def test_generate_summary(self, provider):
-        """Test summary generation."""
-        with patch.object(provider.client, 'post') as mock_post:
-            mock_response = Mock()
-            mock_response.json.return_value = {
-                "choices": [{"message": {"content": "Test AI response"}}]
-            }
-            mock_response.raise_for_status.return_value = None
-            mock_post.return_value = mock_response
-            
-            prompt = "Summarize these emails"
-            context = "Email 1: Test email content"
-            
-            result = await provider.generate_summary(prompt, context)
-            
-            assert result == "Test AI response"
-            mock_post.assert_called_once_with(
-                "/chat/completions", 
-                json=pytest.approx({
-                    "model": "grok-beta",
-                    "messages": [
-                        {"role": "system", "content": pytest.any_string_},
-                        {"role": "user", "content": f"{prompt}\n\nContext:\n{context}"}
-                    ],
-                    "max_tokens": 1000,
-                    "temperature": 0.3
-                }, rel=1e-9)
-            )
-
+    async def test_analyze_email_pre_encoded(self, provider, sample_processed_email):
+        """Test request bodies are sent pre-encoded and replies parsed."""
+        reply = {"choices": [{"message": {"content": '{"sentiment": "neutral"}'}}]}
+        mock_response = Mock(content=orjson.dumps(reply))
+        
+        with patch.object(provider.client, 'post', new_callable=AsyncMock, return_value=mock_response) as mock_post:
+            result = await provider.analyze_email(sample_processed_email)
+        
+        assert result == {"sentiment": "neutral"}
+        body = orjson.loads(mock_post.call_args.kwargs["content"])
+        assert body["model"] == "grok-beta"
+    
+    @pytest.mark.asyncio
+    async def test_chat_retries_rate_limits(self, provider):
+        """Test 429 replies are retried after the Retry-After delay."""
+        limited = Mock(status_code=429, headers={"retry-after": "2"})
+        reply = Mock(
+            status_code=200,
+            content=orjson.dumps({"choices": [{"message": {"content": "Test AI response"}}]}),
+        )
+        
+        with patch.object(provider.client, 'post', new_callable=AsyncMock, side_effect=[limited, reply]) as mock_post, \
+             patch('kit_gmail.services.ai_service.asyncio.sleep', new_callable=AsyncMock) as mock_sleep:
+            result = await provider._chat({"model": "grok-beta", "messages": []})
+        
+        assert result == "Test AI response"
+        assert mock_post.call_count == 2
+        mock_sleep.assert_awaited_once_with(2.0)
 
 class TestAIService:
     
+    @pytest.fixture(autouse=True)
+    def ai_settings(self, monkeypatch):
+        """Settings read by AIService, with no keys or default provider.
+        
+        Tests assign attributes directly; the originals are restored afterwards.
+        """
+        from kit_gmail.utils.config import settings
+        for name in ("default_ai_service", "anthropic_api_key", "openai_api_key", "xai_api_key"):
+            monkeypatch.setattr(settings, name, None)
+        return settings
+    
     @pytest.fixture
-    def ai_service(self):
-        """AIService instance."""
-        return AIService()
+    def ai_service(self, ai_service_template):
+        """AIService instance with no providers and empty caches."""
+        ai_service_template.providers = {}
+        ai_service_template._template_cache.clear()
+        ai_service_template._coalescers = {}
+        return ai_service_template
     
-    def test_initialize_providers(self):
+    def test_initialize_providers(self, ai_settings):
         """Test provider initialization."""
-        with patch('kit_gmail.utils.config.settings') as mock_settings:
-            mock_settings.anthropic_api_key = "test-key"
-            mock_settings.openai_api_key = None
-            mock_settings.xai_api_key = None
-            
-            service = AIService()
-            
-            assert "anthropic" in service.providers
-            assert "openai" not in service.providers
-            assert "xai" not in service.providers
+        ai_settings.anthropic_api_key = "test-key"
+        
+        service = AIService()
+        
+        assert "anthropic" in service.providers
+        assert "openai" not in service.providers
+        assert "xai" not in service.providers
     
-    def test_get_provider_default(self, ai_service):
+    def test_get_provider_default(self, ai_service, ai_settings):
         """Test getting default provider."""
         # Mock a provider
         mock_provider = Mock()
         ai_service.providers["test_provider"] = mock_provider
         
-        with patch('kit_gmail.utils.config.settings') as mock_settings:
-            mock_settings.default_ai_service = "test_provider"
-            
-            provider = ai_service.get_provider()
-            assert provider == mock_provider
-    
+        ai_settings.default_ai_service = "test_provider"
+        
+        provider = ai_service.get_provider()
+        assert provider == mock_provider
+        
     def test_get_provider_fallback(self, ai_service):
         """Test provider fallback when requested provider not available."""
         mock_provider = Mock()
@@ -179,6 +360,39 @@ class TestAIService:
         assert sample_processed_email.subject in context
         assert sample_processed_email.sender in context
     
+    def test_prepare_email_context_compresses_snippets(self, ai_service, sample_processed_email):
+        """Test previews drop quoted replies, footers and extra whitespace."""
+        sample_processed_email.body_text = (
+            "Thanks   for the\n\nupdate.\n"
+            "On Mon, Jan 1, 2024 Jane <jane@example.com> wrote:\n"
+            "> earlier message\n"
+            "Click here to unsubscribe"
+        )
+        
+        context = ai_service._prepare_email_context([sample_processed_email], 7)
+        
+        assert "P:Thanks for the update." in context
+        assert "earlier message" not in context
+        assert "unsubscribe" not in context
+    
+    def test_prepare_email_context_token_budget(self, ai_service, sample_processed_email, monkeypatch):
+        """Test low-priority categories are dropped to stay within the token budget."""
+        import copy
+        from kit_gmail.services.ai_service import CONTEXT_PROMPT_RESERVE_TOKENS
+        from kit_gmail.utils.config import settings
+        monkeypatch.setattr(settings, "max_context_tokens", CONTEXT_PROMPT_RESERVE_TOKENS + 60)
+        
+        critical = copy.copy(sample_processed_email)
+        critical.is_critical = True
+        junk = copy.copy(sample_processed_email)
+        junk.is_junk = True
+        
+        context = ai_service._prepare_email_context([junk, critical], 7)
+        
+        assert "CRITICAL EMAILS (1)" in context
+        assert "JUNK EMAILS" not in context
+        assert "1 categories elided due to context budget: JUNK" in context
+    
     def test_create_summary_prompt(self, ai_service):
         """Test summary prompt creation."""
         prompt = ai_service._create_summary_prompt("daily", 7, 100)
@@ -190,21 +404,59 @@ class TestAIService:
         assert "Action Items" in prompt
     
     @pytest.mark.asyncio
-    async def test_generate_email_summary(self, ai_service, sample_processed_email):
+    async def test_generate_email_summary(self, ai_service, ai_settings, sample_processed_email):
         """Test email summary generation."""
         # Mock provider
         mock_provider = AsyncMock()
         mock_provider.generate_summary.return_value = "Test summary"
         ai_service.providers["test"] = mock_provider
         
-        with patch('kit_gmail.utils.config.settings') as mock_settings:
-            mock_settings.default_ai_service = "test"
-            
-            emails = [sample_processed_email]
-            result = await ai_service.generate_email_summary(emails, 7, "daily")
-            
-            assert result == "Test summary"
-            mock_provider.generate_summary.assert_called_once()
+        ai_settings.default_ai_service = "test"
+        
+        emails = [sample_processed_email]
+        result = await ai_service.generate_email_summary(emails, 7, "daily")
+        
+        assert result == "Test summary"
+        mock_provider.generate_summary.assert_called_once()
+        
+    @pytest.mark.asyncio
+    async def test_generate_email_summary_speculative(self, ai_service, sample_processed_email):
+        """Test the first provider to answer wins and the others are cancelled."""
+        slow_cancelled = asyncio.Event()
+        
+        async def slow_summary(prompt, context):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                slow_cancelled.set()
+                raise
+        
+        failing, slow, fast = AsyncMock(), AsyncMock(), AsyncMock()
+        failing.generate_summary.side_effect = RuntimeError("boom")
+        slow.generate_summary.side_effect = slow_summary
+        fast.generate_summary.return_value = "Fast summary"
+        ai_service.providers = {"failing": failing, "slow": slow, "fast": fast}
+        
+        result = await ai_service.generate_email_summary_speculative([sample_processed_email], 7)
+        await asyncio.sleep(0)
+        
+        assert result == "Fast summary"
+        assert slow_cancelled.is_set()
+    
+    @pytest.mark.asyncio
+    async def test_warmup(self, ai_service):
+        """Test warmup connects the selected provider and ignores failures."""
+        mock_provider = AsyncMock()
+        ai_service.providers = {"test": mock_provider}
+        
+        await ai_service.warmup("test")
+        mock_provider.warmup.assert_awaited_once()
+        
+        mock_provider.warmup.side_effect = ConnectionError("offline")
+        await ai_service.warmup("test")
+        
+        ai_service.providers = {}
+        await ai_service.warmup()
     
     @pytest.mark.asyncio
     async def test_generate_email_summary_no_emails(self, ai_service):
@@ -213,38 +465,128 @@ class TestAIService:
         assert "No emails found" in result
     
     @pytest.mark.asyncio
-    async def test_analyze_batch_emails(self, ai_service, sample_processed_email):
+    async def test_analyze_batch_emails(self, ai_service, ai_settings, sample_processed_email):
         """Test batch email analysis."""
-        # Mock provider
+        async def analyze_emails_batch(emails):
+            return [{"sentiment": "positive"} for _ in emails]
+        
+        ai_service.providers["test"] = SimpleNamespace(analyze_emails_batch=analyze_emails_batch)
+        
+        ai_settings.default_ai_service = "test"
+        
+        emails = [sample_processed_email] * 3
+        results = await ai_service.analyze_batch_emails(emails)
+        
+        assert len(results) == 3
+        assert all("sentiment" in r for r in results)
+        assert all("email_id" in r for r in results)
+        
+    @pytest.mark.asyncio
+    async def test_analyze_batch_emails_shares_templates(self, ai_service, sample_processed_email):
+        """Test emails differing only in numbers share one provider analysis."""
+        import copy
         mock_provider = AsyncMock()
-        mock_provider.analyze_email.return_value = {"sentiment": "positive"}
-        ai_service.providers["test"] = mock_provider
+        mock_provider.analyze_emails_batch.side_effect = (
+            lambda emails: [{"category": "receipt"} for _ in emails]
+        )
+        ai_service.providers = {"test": mock_provider}
         
-        with patch('kit_gmail.utils.config.settings') as mock_settings:
-            mock_settings.default_ai_service = "test"
-            
-            emails = [sample_processed_email] * 3
-            results = await ai_service.analyze_batch_emails(emails)
-            
-            assert len(results) == 3
-            assert all("sentiment" in r for r in results)
-            assert all("email_id" in r for r in results)
+        receipt = copy.copy(sample_processed_email)
+        receipt.body_text = "Your order 1234 total $19.99"
+        other = copy.copy(receipt)
+        other.message_id = "other_id"
+        other.body_text = "Your order 5678 total $5.00"
+        
+        results = await ai_service.analyze_batch_emails([receipt, other])
+        
+        assert mock_provider.analyze_emails_batch.call_args.args[0] == [receipt]
+        assert [r["email_id"] for r in results] == [receipt.message_id, "other_id"]
+        
+        # Later batches hit the cache too
+        await ai_service.analyze_batch_emails([other])
+        assert mock_provider.analyze_emails_batch.await_count == 1
     
     @pytest.mark.asyncio
-    async def test_get_email_insights(self, ai_service, sample_processed_email):
-        """Test email insights generation."""
-        # Mock provider
+    async def test_analyze_batch_emails_dedupes_before_batching(self, ai_service, sample_processed_email):
+        """Test repeated templates don't take up provider batch slots."""
+        import copy
         mock_provider = AsyncMock()
-        mock_provider.generate_summary.return_value = "Test insights"
-        ai_service.providers["test"] = mock_provider
+        mock_provider.analyze_emails_batch.side_effect = (
+            lambda emails: [{"category": "automated"} for _ in emails]
+        )
+        ai_service.providers = {"test": mock_provider}
         
-        with patch('kit_gmail.utils.config.settings') as mock_settings:
-            mock_settings.default_ai_service = "test"
-            
-            emails = [sample_processed_email]
-            result = await ai_service.get_email_insights(emails, "patterns")
-            
-            assert result["insight_type"] == "patterns"
-            assert result["insights"] == "Test insights"
-            assert result["email_count"] == 1
-            assert "generated_at" in result
\ No newline at end of file
+        emails = []
+        for i in range(12):
+            email = copy.copy(sample_processed_email)
+            email.message_id = f"msg{i}"
+            email.body_text = f"Shipment {i} is on its way: https://track.example.com/{i}?u=abc"
+            emails.append(email)
+        
+        results = await ai_service.analyze_batch_emails(emails)
+        
+        assert mock_provider.analyze_emails_batch.await_count == 1
+        assert mock_provider.analyze_emails_batch.call_args.args[0] == [emails[0]]
+        assert [r["email_id"] for r in results] == [f"msg{i}" for i in range(12)]
+    
+    @pytest.mark.asyncio
+    async def test_analyze_batch_emails_local_fast_path(self, ai_service, sample_processed_email):
+        """Test obvious emails are analyzed locally and the rest go to the provider."""
+        import copy
+        mock_provider = AsyncMock()
+        mock_provider.analyze_emails_batch.side_effect = (
+            lambda emails: [{"category": "personal"} for _ in emails]
+        )
+        ai_service.providers = {"test": mock_provider}
+        
+        receipt = copy.copy(sample_processed_email)
+        receipt.message_id = "receipt_id"
+        receipt.is_receipt = True
+        notice = copy.copy(sample_processed_email)
+        notice.message_id = "notice_id"
+        notice.sender = "no-reply@service.com"
+        
+        results = await ai_service.analyze_batch_emails([receipt, sample_processed_email, notice])
+        
+        assert mock_provider.analyze_emails_batch.call_args.args[0] == [sample_processed_email]
+        assert [r["category"] for r in results] == ["automated", "personal", "automated"]
+        assert results[0]["source"] == "local"
+        assert [r["email_id"] for r in results] == ["receipt_id", "test_message_id", "notice_id"]
+    
+    @pytest.mark.asyncio
+    async def test_analyze_email_coalesced(self, ai_service, sample_processed_email):
+        """Test concurrent single-email analyses share one batch request."""
+        import copy
+        mock_provider = AsyncMock()
+        mock_provider.analyze_emails_batch.side_effect = (
+            lambda emails: [{"category": email.subject} for email in emails]
+        )
+        ai_service.providers = {"test": mock_provider}
+        
+        emails = []
+        for i in range(3):
+            email = copy.copy(sample_processed_email)
+            email.message_id = f"msg{i}"
+            email.subject = f"Subject {i}"
+            emails.append(email)
+        
+        results = await asyncio.gather(*(ai_service.analyze_email_coalesced(e) for e in emails))
+        
+        assert mock_provider.analyze_emails_batch.await_count == 1
+        assert [r["category"] for r in results] == ["Subject 0", "Subject 1", "Subject 2"]
+        assert [r["email_id"] for r in results] == ["msg0", "msg1", "msg2"]
+    
+    @pytest.mark.asyncio
+    async def test_get_email_insights(self, ai_service, ai_settings, async_return, sample_processed_email):
+        """Test email insights generation."""
+        ai_service.providers["test"] = SimpleNamespace(generate_summary=async_return("Test insights"))
+        
+        ai_settings.default_ai_service = "test"
+        
+        emails = [sample_processed_email]
+        result = await ai_service.get_email_insights(emails, "patterns")
+        
+        assert result["insight_type"] == "patterns"
+        assert result["insights"] == "Test insights"
+        assert result["email_count"] == 1
+        assert "generated_at" in result
\ No newline at end of file
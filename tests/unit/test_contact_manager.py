@@ -1,22 +1,58 @@
 """Unit tests for ContactManager."""
 
 import pytest
-from datetime import datetime, timedelta
+from collections import Counter
+from datetime import datetime, timedelta, timezone
 from unittest.mock import patch, Mock
 import sqlite3
+import sys
 
 from kit_gmail.services.contact_manager import ContactManager, Contact
 
 
+@pytest.fixture(scope="module")
+def contact_sets():
+    """Contacts shared by the read-only query tests, built once per module."""
+    return {
+        "stats": (
+            Contact(email="freq@example.com", email_count=50, is_frequent=True),
+            Contact(email="imp@bank.com", email_count=10, is_important=True),
+            Contact(email="spam@marketing.com", email_count=5, is_spam=True),
+            Contact(email="auto@system.com", email_count=15, is_automated=True),
+        ),
+        # Different email counts
+        "frequent": (
+            Contact(email="high@example.com", email_count=100, is_frequent=True),
+            Contact(email="medium@example.com", email_count=50, is_frequent=True),
+            Contact(email="low@example.com", email_count=5, is_frequent=False),
+        ),
+        "search": (
+            Contact(email="john.doe@example.com", name="John Doe", email_count=10),
+            Contact(email="jane.smith@company.com", name="Jane Smith", email_count=8),
+            Contact(email="support@service.com", name="Support Team", email_count=15),
+        ),
+        # Various types of contacts
+        "suggestions": (
+            Contact(email="spam@marketing.com", is_spam=True, email_count=50),
+            Contact(email="important@bank.com", email_count=20, is_important=False),  # Should be important
+            Contact(email="old@inactive.com", email_count=5,
+                    last_seen=datetime.now() - timedelta(days=400)),
+            Contact(email="duplicate1@same.com", name="Same Person", email_count=10),
+            Contact(email="duplicate2@same.com", name="Same Person", email_count=8),
+        ),
+    }
+
+
 class TestContactManager:
     
     @pytest.fixture
-    def contact_manager(self, temp_db_path):
-        """ContactManager instance with temporary database."""
-        return ContactManager(db_path=temp_db_path)
+    def contact_manager(self, memory_db_path):
+        """ContactManager instance with in-memory database."""
+        return ContactManager(db_path=memory_db_path)
     
-    def test_init(self, contact_manager, temp_db_path):
+    def test_init(self, temp_db_path):
         """Test ContactManager initialization."""
+        contact_manager = ContactManager(db_path=temp_db_path)
         assert contact_manager.db_path == temp_db_path
         assert contact_manager.contacts == {}
         
@@ -26,10 +62,29 @@ class TestContactManager:
             cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
             tables = [row[0] for row in cursor.fetchall()]
             
+            # Lookups by email are served by the clustered primary keys
+            plans = [
+                conn.execute(f"EXPLAIN QUERY PLAN SELECT * FROM {table} WHERE {column} = ?", ("a",)).fetchone()[3]
+                for table, column in [("contacts", "email"), ("contact_domains", "contact_email"),
+                                      ("contact_subjects", "contact_email")]
+            ]
+            
         assert "contacts" in tables
         assert "contact_domains" in tables
         assert "contact_subjects" in tables
+        assert all("USING PRIMARY KEY" in plan for plan in plans)
     
+    def test_pragmas_applied(self, temp_db_path):
+        """Test connections use WAL with relaxed syncing and in-memory temp storage."""
+        contact_manager = ContactManager(db_path=temp_db_path)
+        conn = contact_manager._connect()
+        try:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+            assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+        finally:
+            conn.close()
+        
     def test_update_contact_from_email_new(self, contact_manager, sample_processed_email):
         """Test updating contact from email (new contact)."""
         result = contact_manager._update_contact_from_email(
@@ -65,6 +120,17 @@ class TestContactManager:
         assert contact.received_count == 1
         assert contact.sent_count == 1
         
+    def test_update_contact_from_email_ignores_case(self, contact_manager, sample_processed_email):
+        """Test that addresses differing only in case share one contact."""
+        contact_manager._update_contact_from_email(sample_processed_email, is_sender=True)
+        result = contact_manager._update_contact_from_email(
+            sample_processed_email, is_sender=False, contact_email="John@Example.COM"
+        )
+        
+        assert result == "updated"
+        assert list(contact_manager.contacts) == ["john@example.com"]
+        assert contact_manager.contacts["john@example.com"].email_count == 2
+        
     def test_analyze_emails(self, contact_manager, sample_processed_email):
         """Test email analysis for contact extraction."""
         emails = [sample_processed_email] * 5  # 5 emails from same sender
@@ -75,6 +141,21 @@ class TestContactManager:
         assert stats["new_contacts"] >= 1
         assert len(contact_manager.contacts) >= 1
         
+    def test_analyze_emails_parallel_matches_serial(self, temp_db_path, sample_processed_email):
+        """Test that sharded analysis in worker processes matches a serial pass."""
+        emails = [sample_processed_email] * 5
+        
+        serial = ContactManager(db_path=temp_db_path + ".serial")
+        serial_stats = serial.analyze_emails(emails)
+        
+        parallel = ContactManager(db_path=temp_db_path)
+        with patch("kit_gmail.services.contact_manager.CONTACT_SHARD_SIZE", 2), \
+                patch("kit_gmail.services.contact_manager.os.cpu_count", return_value=2):
+            parallel_stats = parallel.analyze_emails(emails)
+        
+        assert parallel_stats == serial_stats
+        assert parallel.contacts == serial.contacts
+        
     def test_classify_contacts(self, contact_manager):
         """Test contact classification."""
         # Add high-frequency contact
@@ -100,76 +181,61 @@ class TestContactManager:
         assert frequent_contact.is_frequent
         assert not regular_contact.is_frequent
         
-    def test_calculate_importance_score(self, contact_manager):
-        """Test importance score calculation."""
-        # Important contact (high volume, bidirectional, professional domain)
-        important_contact = Contact(
-            email="admin@bank.com",
-            email_count=30,
-            sent_count=5,
-            received_count=25,
-            first_seen=datetime.now() - timedelta(days=400),
-            last_seen=datetime.now() - timedelta(days=1),
-            is_automated=False
-        )
-        important_contact.domains.add("bank.com")
-        
-        score = contact_manager._calculate_importance_score(important_contact)
-        assert score > 0.6
+    @pytest.mark.skipif(sys.version_info < (3, 10), reason="slotted dataclasses need Python 3.10")
+    def test_contact_has_no_instance_dict(self, sample_contact):
+        """Test that contacts use slots instead of a per-instance dict."""
+        assert not hasattr(sample_contact, "__dict__")
         
+    @pytest.mark.parametrize("contact, important", [
+        # Important contact (high volume, bidirectional, professional domain)
+        (Contact(email="admin@bank.com", email_count=30, sent_count=5, received_count=25,
+                 first_seen=datetime(2022, 10, 1), last_seen=datetime(2023, 11, 14),
+                 is_automated=False, domains={"bank.com"}), True),
         # Unimportant contact
-        unimportant_contact = Contact(
-            email="marketing@shop.com",
-            email_count=2,
-            sent_count=0,
-            received_count=2,
-            is_automated=True
-        )
-        
-        score = contact_manager._calculate_importance_score(unimportant_contact)
-        assert score < 0.4
-        
-    def test_calculate_spam_score(self, contact_manager):
-        """Test spam score calculation."""
+        (Contact(email="marketing@shop.com", email_count=2, sent_count=0, received_count=2,
+                 is_automated=True), False),
+    ])
+    def test_calculate_importance_score(self, contact, important):
+        """Test importance score calculation."""
+        score = ContactManager._calculate_importance_score(contact)
+        assert score > 0.6 if important else score < 0.4
+        
+    @pytest.mark.parametrize("email, domain, expected", [
+        # Domain keywords match whole labels, not substrings
+        ("clerk@mail.state.gov", "mail.state.gov", 0.3),
+        ("info@georgia.com", "georgia.com", 0.0),
+    ])
+    def test_professional_domain_matches_whole_labels(self, email, domain, expected):
+        """Test that domain keywords match whole labels, not substrings."""
+        contact = Contact(email=email, is_automated=True, domains={domain})
+        assert ContactManager._calculate_importance_score(contact) == pytest.approx(expected)
+        
+    @pytest.mark.parametrize("contact, spam", [
         # Spam-like contact
-        spam_contact = Contact(
-            email="noreply@marketing.com",
-            email_count=20,
-            sent_count=0,
-            received_count=20,
-            is_automated=True
-        )
-        spam_contact.domains.add("marketing.com")
-        spam_contact.labels_associated.add("PROMOTIONS")
-        
-        score = contact_manager._calculate_spam_score(spam_contact)
-        assert score > 0.7
-        
+        (Contact(email="noreply@marketing.com", email_count=20, sent_count=0, received_count=20,
+                 is_automated=True, domains={"marketing.com"},
+                 labels_associated={"PROMOTIONS"}), True),
         # Regular contact
-        regular_contact = Contact(
-            email="friend@gmail.com",
-            name="Friend Name",
-            email_count=10,
-            sent_count=5,
-            received_count=5,
-            is_automated=False
-        )
+        (Contact(email="friend@gmail.com", name="Friend Name", email_count=10, sent_count=5,
+                 received_count=5, is_automated=False), False),
+    ])
+    def test_calculate_spam_score(self, contact, spam):
+        """Test spam score calculation."""
+        score = ContactManager._calculate_spam_score(contact)
+        assert score > 0.7 if spam else score < 0.3
         
-        score = contact_manager._calculate_spam_score(regular_contact)
-        assert score < 0.3
+    def test_spam_score_skips_domains_at_cap(self):
+        """Test the domain check is skipped once other signals reach the cap."""
+        contact = Contact(email="deals@shop.com", email_count=20, is_automated=True,
+                          domains={"shop.com"}, labels_associated={"PROMOTIONS"})
         
-    def test_get_contact_stats(self, contact_manager):
-        """Test contact statistics generation."""
-        # Add some test contacts
-        contacts = [
-            Contact(email="freq@example.com", email_count=50, is_frequent=True),
-            Contact(email="imp@bank.com", email_count=10, is_important=True),
-            Contact(email="spam@marketing.com", email_count=5, is_spam=True),
-            Contact(email="auto@system.com", email_count=15, is_automated=True)
-        ]
+        with patch("kit_gmail.services.contact_manager._domain_labels") as mock_labels:
+            assert ContactManager._calculate_spam_score(contact) == 1.0
+            mock_labels.assert_not_called()
         
-        for contact in contacts:
-            contact_manager.contacts[contact.email] = contact
+    def test_get_contact_stats(self, contact_manager, contact_sets):
+        """Test contact statistics generation."""
+        contact_manager.contacts.update((c.email, c) for c in contact_sets["stats"])
         
         stats = contact_manager.get_contact_stats()
         
@@ -181,17 +247,9 @@ class TestContactManager:
         assert stats["total_emails"] == 80  # Sum of email counts
         assert stats["avg_emails_per_contact"] == 20.0
         
-    def test_get_frequent_contacts(self, contact_manager):
+    def test_get_frequent_contacts(self, contact_manager, contact_sets):
         """Test getting frequent contacts."""
-        # Add contacts with different email counts
-        contacts = [
-            Contact(email="high@example.com", email_count=100, is_frequent=True),
-            Contact(email="medium@example.com", email_count=50, is_frequent=True),
-            Contact(email="low@example.com", email_count=5, is_frequent=False)
-        ]
-        
-        for contact in contacts:
-            contact_manager.contacts[contact.email] = contact
+        contact_manager.contacts.update((c.email, c) for c in contact_sets["frequent"])
         
         frequent = contact_manager.get_frequent_contacts(limit=10)
         
@@ -200,17 +258,12 @@ class TestContactManager:
         assert frequent[0].email_count >= frequent[1].email_count
         assert all(c.is_frequent for c in frequent)
         
-    def test_find_contacts(self, contact_manager):
-        """Test contact search."""
-        # Add test contacts
-        contacts = [
-            Contact(email="john.doe@example.com", name="John Doe", email_count=10),
-            Contact(email="jane.smith@company.com", name="Jane Smith", email_count=8),
-            Contact(email="support@service.com", name="Support Team", email_count=15)
-        ]
+        # The limit keeps the most frequent ones
+        assert [c.email for c in contact_manager.get_frequent_contacts(limit=1)] == ["high@example.com"]
         
-        for contact in contacts:
-            contact_manager.contacts[contact.email] = contact
+    def test_find_contacts(self, contact_manager, contact_sets):
+        """Test contact search."""
+        contact_manager.contacts.update((c.email, c) for c in contact_sets["search"])
         
         # Search by email
         results = contact_manager.find_contacts("john")
@@ -226,20 +279,22 @@ class TestContactManager:
         results = contact_manager.find_contacts("example")
         assert len(results) == 1
         
-    def test_get_contact_suggestions(self, contact_manager):
-        """Test contact management suggestions."""
-        # Add various types of contacts
-        contacts = [
-            Contact(email="spam@marketing.com", is_spam=True, email_count=50),
-            Contact(email="important@bank.com", email_count=20, is_important=False),  # Should be important
-            Contact(email="old@inactive.com", email_count=5, 
-                   last_seen=datetime.now() - timedelta(days=400)),
-            Contact(email="duplicate1@same.com", name="Same Person", email_count=10),
-            Contact(email="duplicate2@same.com", name="Same Person", email_count=8)
-        ]
+    def test_find_contacts_many(self, contact_manager):
+        """Test search over many contacts, including matches inside words."""
+        for i in range(10000):
+            email = f"user{i}@example.com"
+            contact_manager.contacts[email] = Contact(email=email, name=f"User {i}")
+        contact_manager.contacts["john.doe@example.com"] = Contact(
+            email="john.doe@example.com", name="John Doe", email_count=10
+        )
         
-        for contact in contacts:
-            contact_manager.contacts[contact.email] = contact
+        assert [c.email for c in contact_manager.find_contacts("ohn.d")] == ["john.doe@example.com"]
+        assert [c.email for c in contact_manager.find_contacts("user 9999")] == ["user9999@example.com"]
+        assert contact_manager.find_contacts("nobody") == []
+        
+    def test_get_contact_suggestions(self, contact_manager, contact_sets):
+        """Test contact management suggestions."""
+        contact_manager.contacts.update((c.email, c) for c in contact_sets["suggestions"])
         
         suggestions = contact_manager.get_contact_suggestions()
         
@@ -252,6 +307,29 @@ class TestContactManager:
         # Should suggest inactive contacts
         assert len(suggestions["inactive_contacts"]) >= 1
         
+    def test_inactive_contacts_mixed_timezones(self, contact_manager, sample_processed_email):
+        """Test inactivity handles analyzed (aware) and hand-built (naive) dates."""
+        now = datetime(2024, 6, 1, tzinfo=timezone.utc)
+        sample_processed_email.date = datetime(2023, 1, 1, tzinfo=timezone.utc)
+        contact_manager._update_contact_from_email(sample_processed_email, is_sender=True)
+        contact_manager.contacts["naive@example.com"] = Contact(
+            email="naive@example.com", last_seen=datetime(2024, 5, 1)
+        )
+        
+        inactive = contact_manager.get_contact_suggestions(now=now)["inactive_contacts"]
+        assert inactive == [sample_processed_email.sender]
+        
+    def test_potential_duplicates_ignore_punctuation(self, contact_manager):
+        """Test duplicate names match regardless of case, spacing and punctuation."""
+        names = ["Mary-Ann O'Neil", "mary ann oneil", "MARY ANN O NEIL", "Mary Ann", "---"]
+        for i, name in enumerate(names):
+            contact_manager.contacts[f"mary{i}@example.com"] = Contact(email=f"mary{i}@example.com", name=name)
+        for i in range(1000):
+            contact_manager.contacts[f"user{i}@example.com"] = Contact(email=f"user{i}@example.com", name=f"User {i}")
+        
+        duplicates = contact_manager.get_contact_suggestions()["potential_duplicates"]
+        assert sorted(duplicates) == ["mary0@example.com", "mary1@example.com", "mary2@example.com"]
+        
     def test_save_and_load_contacts(self, contact_manager):
         """Test saving and loading contacts from database."""
         # Add test contact
@@ -268,7 +346,7 @@ class TestContactManager:
             confidence_score=0.8
         )
         contact.domains.add("example.com")
-        contact.subjects_seen = ["Test Subject 1", "Test Subject 2"]
+        contact.subjects_seen = Counter({"Test Subject 1": 3, "Test Subject 2": 1})
         contact.notes = ["High engagement", "Regular correspondent"]
         
         contact_manager.contacts[contact.email] = contact
@@ -289,4 +367,167 @@ class TestContactManager:
         assert loaded_contact.email_count == contact.email_count
         assert loaded_contact.is_frequent == contact.is_frequent
         assert "example.com" in loaded_contact.domains
-        assert len(loaded_contact.subjects_seen) == 2
\ No newline at end of file
+        assert len(loaded_contact.subjects_seen) == 2        
+    def test_save_writes_only_changed_contacts(self, contact_manager):
+        """Test that saving skips contacts unchanged since the last save."""
+        for address in ("a@example.com", "b@example.com"):
+            contact_manager.contacts[address] = Contact(
+                email=address,
+                first_seen=datetime.now(),
+                last_seen=datetime.now(),
+                email_count=1
+            )
+        contact_manager._save_contacts_to_db()
+        
+        # Change one contact in memory and another only in the database
+        contact_manager.contacts["a@example.com"].email_count = 5
+        contact_manager._dirty.add("a@example.com")
+        with sqlite3.connect(contact_manager.db_path, uri=True) as conn:
+            conn.execute("UPDATE contacts SET name = 'Edited' WHERE email = 'b@example.com'")
+        contact_manager._save_contacts_to_db()
+        
+        contact_manager.contacts.clear()
+        contact_manager.load_contacts_from_db()
+        
+        assert contact_manager.contacts["a@example.com"].email_count == 5
+        assert contact_manager.contacts["b@example.com"].name == "Edited"
+        
+    def test_find_contacts_after_name_update(self, contact_manager, sample_processed_email):
+        """Test that search sees contacts and names added by email analysis."""
+        contact_manager.contacts["jo@example.com"] = Contact(email="jo@example.com", email_count=3)
+        sample_processed_email.sender = "jo@example.com"
+        sample_processed_email.sender_name = "Joanna Smith"
+        
+        assert contact_manager.find_contacts("joanna") == []
+        
+        contact_manager._update_contact_from_email(sample_processed_email, is_sender=True)
+        
+        results = contact_manager.find_contacts("joanna")
+        assert [c.email for c in results] == ["jo@example.com"]
+        assert len(contact_manager.find_contacts("jo")) == 1
+        assert contact_manager.find_contacts("jo@example.org") == []
+        
+    def test_find_contacts_after_direct_rename(self, contact_manager):
+        """Test that search sees names changed or replaced outside analysis."""
+        contact = Contact(email="a@example.com", name="Alice", email_count=1)
+        contact_manager.contacts[contact.email] = contact
+        assert contact_manager.find_contacts("alice") == [contact]
+        
+        contact.name = "Bobby"
+        assert contact_manager.find_contacts("bob") == [contact]
+        assert contact_manager.find_contacts("alice") == []
+        
+        replacement = Contact(email="a@example.com", name="Carol", email_count=1)
+        contact_manager.contacts[replacement.email] = replacement
+        assert contact_manager.find_contacts("carol") == [replacement]
+        
+    def test_repeated_saves_do_not_duplicate_rows(self, contact_manager):
+        """Test that re-saving a contact upserts its domains and subjects."""
+        contact = Contact(email="a@example.com", email_count=1)
+        contact.domains.add("example.com")
+        contact.subjects_seen["Hello"] += 1
+        contact_manager.contacts[contact.email] = contact
+        contact_manager._save_contacts_to_db()
+        
+        contact.subjects_seen["Hello"] += 1
+        contact_manager._dirty.add(contact.email)
+        contact_manager._save_contacts_to_db()
+        
+        with sqlite3.connect(contact_manager.db_path, uri=True) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM contact_domains").fetchone()[0] == 1
+            assert conn.execute("SELECT seen_count FROM contact_subjects").fetchall() == [(2,)]
+        
+    def test_resave_replaces_stale_subjects(self, contact_manager):
+        """Test that subjects dropped from the top 20 are removed on re-save."""
+        contact = Contact(email="a@example.com", email_count=1)
+        contact.subjects_seen.update({f"Old {i}": 1 for i in range(20)})
+        contact_manager.contacts[contact.email] = contact
+        contact_manager._save_contacts_to_db()
+        
+        contact.subjects_seen.update({f"New {i}": 5 for i in range(20)})
+        contact_manager._dirty.add(contact.email)
+        contact_manager._save_contacts_to_db()
+        
+        contact_manager.contacts.clear()
+        contact_manager.load_contacts_from_db()
+        
+        subjects = contact_manager.contacts["a@example.com"].subjects_seen
+        assert len(subjects) == 20
+        assert all(subject.startswith("New") for subject in subjects)
+        
+    def test_save_batches_rows_in_one_transaction(self, contact_manager):
+        """Test that a save issues no per-contact reads and commits once."""
+        for i in range(3):
+            contact = Contact(email=f"user{i}@example.com", email_count=1)
+            contact.domains.update({"example.com", "example.org"})
+            contact.subjects_seen.update({"Hello": 2, "Invoice": 1})
+            contact_manager.contacts[contact.email] = contact
+        
+        statements = []
+        connect = contact_manager._connect
+        
+        def traced_connect():
+            conn = connect()
+            conn.set_trace_callback(statements.append)
+            return conn
+        
+        with patch.object(contact_manager, "_connect", side_effect=traced_connect) as mock_connect:
+            contact_manager._save_contacts_to_db()
+        
+        mock_connect.assert_called_once()
+        keywords = [sql.split(None, 1)[0].upper() for sql in statements]
+        assert keywords.count("BEGIN") == keywords.count("COMMIT") == 1
+        assert "SELECT" not in keywords
+        
+    def test_migrates_legacy_rowid_tables(self, temp_db_path):
+        """Test that databases from the rowid layout are copied into the keyed tables."""
+        with sqlite3.connect(temp_db_path) as conn:
+            conn.execute("CREATE TABLE contacts (email TEXT PRIMARY KEY, name TEXT, first_seen TIMESTAMP, "
+                         "last_seen TIMESTAMP, email_count INTEGER, sent_count INTEGER, "
+                         "received_count INTEGER, is_frequent BOOLEAN, is_important BOOLEAN, "
+                         "is_spam BOOLEAN, is_automated BOOLEAN, confidence_score REAL, notes TEXT)")
+            conn.execute("CREATE TABLE contact_domains (contact_email TEXT, domain TEXT)")
+            conn.execute("CREATE TABLE contact_subjects (contact_email TEXT, subject TEXT, seen_count INTEGER)")
+            conn.execute("INSERT INTO contacts (email, name, email_count) VALUES ('a@example.com', 'A', 3)")
+            conn.executemany("INSERT INTO contact_domains VALUES (?, ?)",
+                             [("a@example.com", "example.com")] * 2)
+            conn.execute("INSERT INTO contact_subjects VALUES ('a@example.com', 'Hi', 3)")
+        
+        manager = ContactManager(db_path=temp_db_path)
+        manager.load_contacts_from_db()
+        
+        contact = manager.contacts["a@example.com"]
+        assert contact.name == "A"
+        assert contact.domains == {"example.com"}
+        assert contact.subjects_seen == Counter({"Hi": 3})
+        with sqlite3.connect(temp_db_path) as conn:
+            tables = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table'").fetchall()
+            assert sorted(name for name, _ in tables) == ["contact_domains", "contact_subjects", "contacts"]
+            assert all("WITHOUT ROWID" in sql for _, sql in tables)
+            
+    def test_merges_mixed_case_contact_keys(self, temp_db_path, sample_processed_email):
+        """Test that stored keys are lowercased once and merged with new updates."""
+        ContactManager(db_path=temp_db_path)
+        with sqlite3.connect(temp_db_path) as conn:
+            conn.executemany(
+                "INSERT INTO contacts (email, name, email_count) VALUES (?, ?, ?)",
+                [("John@Example.com", "John", 3), ("john@example.com", None, 2)],
+            )
+            conn.executemany(
+                "INSERT INTO contact_subjects VALUES (?, ?, ?)",
+                [("John@Example.com", "Hi", 3), ("john@example.com", "Hi", 2)],
+            )
+            conn.execute("INSERT INTO contact_domains VALUES ('John@Example.com', 'example.com')")
+            conn.execute("PRAGMA user_version = 1")
+        
+        manager = ContactManager(db_path=temp_db_path)
+        manager.load_contacts_from_db()
+        sample_processed_email.sender = "JOHN@example.com"
+        manager.analyze_emails([sample_processed_email])
+        
+        assert [key for key in manager.contacts if key.lower() == "john@example.com"] == ["john@example.com"]
+        contact = manager.contacts["john@example.com"]
+        assert contact.name == "John"
+        assert contact.email_count == 6
+        assert contact.domains == {"example.com"}
+        assert contact.subjects_seen["Hi"] == 5
@@ -1,15 +1,28 @@
 """Unit tests for EmailProcessor."""
 
+import copy
 import pytest
-from datetime import datetime
-from unittest.mock import patch
+from datetime import datetime, timezone
+from unittest.mock import Mock, patch
 
-from kit_gmail.core.email_processor import EmailProcessor, ProcessedEmail
+from kit_gmail.core.email_processor import (
+    EmailProcessor,
+    ProcessedEmail,
+    PROMOTIONAL_BIT,
+    RECEIPT_BIT,
+    score_features,
+)
+
+
+@pytest.fixture(scope="module")
+def processor():
+    """EmailProcessor shared by the tests that don't change its state."""
+    return EmailProcessor()
 
 
 class TestEmailProcessor:
     
-    def test_process_email_basic(self, sample_gmail_message):
+    def test_process_email_basic(self, sample_gmail_message, sample_body_text):
         """Test basic email processing."""
         processor = EmailProcessor()
         result = processor.process_email(sample_gmail_message)
@@ -21,21 +34,160 @@ class TestEmailProcessor:
         assert result.sender == "john@example.com"
         assert result.sender_name == "John Doe"
         assert "test@example.com" in result.recipients
-        assert result.body_text == "Test email body content"
+        assert result.body_text == sample_body_text
         
-    def test_extract_headers(self, sample_gmail_message):
-        """Test header extraction."""
+    def test_process_email_cached(self, sample_gmail_message):
+        """Test processed emails are cached by message id and historyId."""
         processor = EmailProcessor()
-        headers = processor._extract_headers(sample_gmail_message)
+        sample_gmail_message["historyId"] = "100"
         
-        assert headers["From"] == "John Doe <john@example.com>"
-        assert headers["To"] == "test@example.com"
-        assert headers["Subject"] == "Test Email Subject"
+        first = processor.process_email(sample_gmail_message)
+        with patch.object(processor, "_extract_headers") as mock_extract_headers:
+            assert processor.process_email(sample_gmail_message) is first
+            mock_extract_headers.assert_not_called()
+        
+        # A new historyId means the message changed
+        sample_gmail_message["historyId"] = "101"
+        assert processor.process_email(sample_gmail_message) is not first
+        
+        processor.clear_cache()
+        assert not processor._cache
+        
+    def test_process_email_decodes_body_once(self, sample_gmail_message, sample_body_text):
+        """Test a re-processed message reuses its decoded body."""
+        processor = EmailProcessor()
+        sample_gmail_message["historyId"] = "100"
+        
+        with patch.object(processor, "_decode_body_data", wraps=processor._decode_body_data) as mock_decode:
+            for _ in range(3):
+                assert processor.process_email(sample_gmail_message).body_text == sample_body_text
+            mock_decode.assert_called_once()
+        
+    def test_process_email_lazy(self, sample_gmail_message, sample_body_text):
+        """Test body and classification are deferred until accessed."""
+        processor = EmailProcessor()
+        
+        with patch.object(processor, "_extract_body", wraps=processor._extract_body) as mock_extract_body, \
+                patch.object(processor, "_classify_email", wraps=processor._classify_email) as mock_classify:
+            result = processor.process_email(sample_gmail_message)
+            assert result.subject == "Test Email Subject"
+            assert not hasattr(result, "__dict__")
+            mock_extract_body.assert_not_called()
+            mock_classify.assert_not_called()
+            
+            assert result.body_text == sample_body_text
+            assert not result.is_junk
+            result.is_receipt = True
+            assert result.is_receipt
+            mock_extract_body.assert_called_once()
+            mock_classify.assert_called_once()
+        
+    def test_process_batch(self, sample_gmail_message):
+        """Test batch processing into flag columns."""
+        import copy
+        processor = EmailProcessor()
+        
+        promo = copy.deepcopy(sample_gmail_message)
+        promo["id"] = "promo_id"
+        promo["labelIds"] = ["CATEGORY_PROMOTIONS"]
+        broken = {"id": "broken_id"}
+        
+        batch = processor.process_batch([sample_gmail_message, promo, broken])
+        
+        assert len(batch) == 2
+        assert batch.ids == ["test_message_id", "promo_id"]
+        assert batch.where(PROMOTIONAL_BIT) == [1]
+        assert batch.where(RECEIPT_BIT) == []
+        assert batch.where(since=datetime(2100, 1, 1, tzinfo=timezone.utc)) == []
+        assert [email.message_id for email in batch.select(PROMOTIONAL_BIT)] == ["promo_id"]
+        assert batch[0] is processor.process_email(sample_gmail_message)
+        
+    def test_process_batch_releases_payloads(self, sample_gmail_message):
+        """Test cached emails drop their raw payload once processed."""
+        import gc
+        import weakref
+        
+        class Payload(dict):
+            pass
         
-    def test_extract_sender_name(self):
-        """Test sender name extraction."""
         processor = EmailProcessor()
+        page = []
+        for index in range(3):
+            message = Payload(copy.deepcopy(sample_gmail_message), id=f"msg{index}")
+            message["payload"] = Payload(message["payload"])
+            page.append(message)
+        refs = [weakref.ref(message) for message in page]
+        refs += [weakref.ref(message["payload"]) for message in page]
+        
+        batch = processor.process_batch(page)
+        assert all(email.body_text for email in batch.select())
+        del batch, page, message
+        gc.collect()
+        
+        assert len(processor._cache) == 3
+        assert all(ref() is None for ref in refs)
+        
+    def test_shared_email_classified_once(self, sample_gmail_message):
+        """Test threads sharing a cached email wait for its classification."""
+        import threading
+        import time
         
+        processor = EmailProcessor()
+        email = processor.process_email(sample_gmail_message)
+        calls = []
+        
+        def slow_classify(processed_email, headers):
+            calls.append(processed_email)
+            time.sleep(0.05)
+            processed_email.is_junk = True
+        
+        results = []
+        with patch.object(processor, "_classify_email", side_effect=slow_classify):
+            threads = [threading.Thread(target=lambda: results.append(email.is_junk)) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        
+        assert results == [True] * 4
+        assert calls == [email]
+        
+    def test_process_batch_in_processes(self, sample_gmail_message):
+        """Test classification on worker processes matches the in-process result."""
+        import copy
+        processor = EmailProcessor()
+        
+        promo = copy.deepcopy(sample_gmail_message)
+        promo["id"] = "promo_id"
+        promo["labelIds"] = ["CATEGORY_PROMOTIONS"]
+        broken = {"id": "broken_id"}
+        
+        with patch("kit_gmail.core.email_processor.settings.classification_processes", 2):
+            batch = processor.process_batch([sample_gmail_message, promo, broken])
+        
+        assert batch.ids == ["test_message_id", "promo_id"]
+        assert batch.where(PROMOTIONAL_BIT) == [1]
+        assert batch[1].is_promotional
+        
+    def test_extract_headers(self, processor, sample_gmail_message):
+        """Test header extraction."""
+        headers = processor._extract_headers(sample_gmail_message)
+        
+        assert headers["from"] == "John Doe <john@example.com>"
+        assert headers["to"] == "test@example.com"
+        assert headers["subject"] == "Test Email Subject"
+        
+        # Names are matched case-insensitively and unused headers are dropped
+        sample_gmail_message["payload"]["headers"].extend([
+            {"name": "LIST-ID", "value": "<news.example.com>"},
+            {"name": "X-Tracking-Id", "value": "abc"},
+        ])
+        headers = processor._extract_headers(sample_gmail_message)
+        assert headers["list-id"] == "<news.example.com>"
+        assert "x-tracking-id" not in headers
+        
+    def test_extract_sender_name(self, processor):
+        """Test sender name extraction."""
         # With name
         name = processor._extract_sender_name("John Doe <john@example.com>")
         assert name == "John Doe"
@@ -48,22 +200,76 @@ class TestEmailProcessor:
         name = processor._extract_sender_name('"John Doe" <john@example.com>')
         assert name == "John Doe"
         
-    def test_parse_date(self):
-        """Test date parsing."""
-        processor = EmailProcessor()
+    def test_parse_email_list(self, processor):
+        """Test recipient list parsing."""
+        header = 'John Doe <john@example.com>, "jane@example.org" <jane@example.org>, not-an-address'
+        assert processor._parse_email_list(header) == ["john@example.com", "jane@example.org"]
+        assert processor._parse_email_list("") == []
         
+        # Strict parsing handles quoted commas in display names
+        with patch("kit_gmail.core.email_processor.validate_email") as mock_validate:
+            mock_validate.side_effect = lambda addr: Mock(email=addr)
+            result = processor._parse_email_list('"Doe, John" <john@example.com>, jane@example.org', strict=True)
+        assert result == ["john@example.com", "jane@example.org"]
+        
+    def test_parse_date(self, processor):
+        """Test date parsing."""
         # Valid date
         date = processor._parse_date("Wed, 15 Nov 2023 10:30:00 +0000")
         assert isinstance(date, datetime)
+        assert date == datetime(2023, 11, 15, 10, 30, tzinfo=timezone.utc)
         
         # Invalid date should return current time
         date = processor._parse_date("invalid date")
         assert isinstance(date, datetime)
         
-    def test_calculate_junk_score(self, sample_processed_email):
-        """Test junk score calculation."""
-        processor = EmailProcessor()
+    def test_extract_body_multipart(self, processor):
+        """Test multipart body extraction with unpadded and malformed data."""
+        import base64
         
+        def encode(data: bytes) -> str:
+            return base64.urlsafe_b64encode(data).decode().rstrip("=")
+        
+        message = {
+            "payload": {
+                "mimeType": "multipart/mixed",
+                "parts": [
+                    {"mimeType": "text/plain", "body": {"data": encode(b"Hello ")}},
+                    {
+                        "mimeType": "multipart/alternative",
+                        "parts": [
+                            {"mimeType": "text/plain", "body": {"data": encode(b"world\xff")}},
+                            {"mimeType": "text/html", "body": {"data": encode(b"<p>Hi</p>")}},
+                        ],
+                    },
+                ],
+            }
+        }
+        
+        body_text, body_html = processor._extract_body(message)
+        assert body_text == "Hello world\ufffd"
+        assert body_html == "<p>Hi</p>"
+        
+    def test_extract_attachments_nested(self, processor):
+        """Test attachments are found at any MIME nesting depth."""
+        message = {
+            "payload": {
+                "parts": [
+                    {"filename": "a.pdf", "mimeType": "application/pdf", "body": {"size": 10}},
+                    {"parts": [{"parts": [
+                        {"filename": "b.png", "mimeType": "image/png",
+                         "body": {"size": 20, "attachmentId": "att_b"}},
+                    ]}]},
+                ],
+            }
+        }
+        
+        attachments = processor._extract_attachments(message)
+        assert [a["filename"] for a in attachments] == ["a.pdf", "b.png"]
+        assert attachments[1]["attachment_id"] == "att_b"
+        
+    def test_calculate_junk_score(self, processor, sample_processed_email):
+        """Test junk score calculation."""
         # Clean email
         content = "hello how are you today"
         score = processor._calculate_junk_score(sample_processed_email, content, {})
@@ -74,10 +280,60 @@ class TestEmailProcessor:
         score = processor._calculate_junk_score(sample_processed_email, content, {})
         assert score > 0.5
         
-    def test_calculate_receipt_score(self, sample_processed_email):
-        """Test receipt score calculation."""
-        processor = EmailProcessor()
+    def test_scan_content(self, processor):
+        """Test single-pass content signal scan."""
+        hits = processor._scan_content("Order #123 for $5.99 - do not reply or unsubscribe")
+        assert {"order", "receipt", "money", "automated", "unsubscribe"} <= set(hits)
+        assert "critical" not in hits
+        
+        # An order number without "#" does not imply the receipt pattern
+        hits = processor._scan_content("order 123")
+        assert "order" in hits
+        assert "receipt" not in hits
+        assert not processor._scan_content("hello how are you today")
+        
+        # Gapped patterns only look a bounded distance ahead
+        assert "unsubscribe" in processor._scan_content("remove me from this list")
+        assert "unsubscribe" not in processor._scan_content("remove" + " filler" * 20 + " list")
+        
+    def test_patterns_shared_between_processors(self):
+        """Test patterns are compiled once rather than per processor."""
+        first, second = EmailProcessor(), EmailProcessor()
+        
+        assert first.signal_pattern is second.signal_pattern
+        assert first.keyword_pattern is second.keyword_pattern
+        
+    def test_scan_content_keywords(self):
+        """Test distinct junk and receipt keyword counting."""
+        with patch('kit_gmail.core.email_processor.settings') as mock_settings:
+            mock_settings.junk_keywords = "sale,wholesale,deal"
+            mock_settings.receipt_keywords = "order"
+            mock_settings.critical_senders = ""
+            processor = EmailProcessor()
+        
+        hits = processor._scan_content("wholesale order, another order")
         
+        # "sale" is found inside "wholesale"; repeated keywords count once
+        assert hits["junk_keywords"] == 2
+        assert hits["receipt_keywords"] == 1
+        
+        # Matching ignores case
+        assert processor._scan_content("Big DEAL")["junk_keywords"] == 1
+        
+    def test_score_features(self):
+        """Test scoring over integer content features."""
+        assert score_features((0,) * 9) == (0.0, 0.0)
+        
+        junk, receipt = score_features((9, 1, 1, 4, 1, 0, 0, 0, 0))
+        assert junk == 1.0
+        assert receipt == 0.0
+        
+        junk, receipt = score_features((0, 0, 0, 0, 0, 1, 1, 1, 1))
+        assert junk == 0.0
+        assert receipt == pytest.approx(0.9)
+        
+    def test_calculate_receipt_score(self, processor, sample_processed_email):
+        """Test receipt score calculation."""
         # Regular email
         content = "hello how are you today"
         score = processor._calculate_receipt_score(sample_processed_email, content)
@@ -88,17 +344,15 @@ class TestEmailProcessor:
         score = processor._calculate_receipt_score(sample_processed_email, content)
         assert score > 0.6
         
-    def test_detect_mailing_list(self):
+    def test_detect_mailing_list(self, processor):
         """Test mailing list detection."""
-        processor = EmailProcessor()
-        
         # With List-Id header
-        headers = {"List-Id": "<newsletter@example.com>"}
+        headers = {"list-id": "<newsletter@example.com>"}
         result = processor._detect_mailing_list(headers, "")
         assert result == "newsletter@example.com"
         
         # With List-Unsubscribe header
-        headers = {"List-Unsubscribe": "<mailto:unsubscribe@newsletter.com>"}
+        headers = {"list-unsubscribe": "<mailto:unsubscribe@newsletter.com>"}
         result = processor._detect_mailing_list(headers, "")
         assert result == "mailto:unsubscribe@newsletter.com"
         
@@ -116,25 +370,28 @@ class TestEmailProcessor:
         assert processor._is_critical_sender("noreply@bank.com")
         assert processor._is_critical_sender("alert@government.org") 
         assert not processor._is_critical_sender("marketing@store.com")
+        assert not processor._is_critical_sender("deals@taxidermy.com")
         
-    def test_has_critical_keywords(self):
-        """Test critical keyword detection."""
-        processor = EmailProcessor()
+        processor.critical_senders = {"irs.gov", "ceo@example.com"}
+        assert processor._is_critical_sender("Notices <notice@mail.irs.gov>")
+        assert processor._is_critical_sender("ceo@example.com")
+        assert not processor._is_critical_sender("intern@example.com")
+        assert not processor._is_critical_sender("fake@notirs.gov")
         
+    def test_has_critical_keywords(self, processor):
+        """Test critical keyword detection."""
         assert processor._has_critical_keywords("URGENT: Account suspended")
         assert processor._has_critical_keywords("Important security alert")
         assert processor._has_critical_keywords("Verify your account immediately")
         assert not processor._has_critical_keywords("Hello how are you")
         
-    def test_is_automated_message(self):
+    def test_is_automated_message(self, processor):
         """Test automated message detection."""
-        processor = EmailProcessor()
-        
         # Header indicators
-        headers = {"X-Auto-Response-Suppress": "OOF"}
+        headers = {"x-auto-response-suppress": "OOF"}
         assert processor._is_automated_message(headers, "")
         
-        headers = {"Auto-Submitted": "auto-generated"}
+        headers = {"auto-submitted": "auto-generated"}
         assert processor._is_automated_message(headers, "")
         
         # Content indicators
@@ -143,10 +400,8 @@ class TestEmailProcessor:
         assert processor._is_automated_message(headers, "This is an automated message")
         assert not processor._is_automated_message(headers, "Please reply when convenient")
         
-    def test_extract_merchant_name(self, sample_processed_email):
+    def test_extract_merchant_name(self, processor, sample_processed_email):
         """Test merchant name extraction."""
-        processor = EmailProcessor()
-        
         # From sender name
         sample_processed_email.sender_name = "Amazon Orders"
         result = processor._extract_merchant_name(sample_processed_email)
@@ -158,10 +413,8 @@ class TestEmailProcessor:
         result = processor._extract_merchant_name(sample_processed_email)
         assert result == "Amazon"
         
-    def test_extract_unsubscribe_link(self):
+    def test_extract_unsubscribe_link(self, processor):
         """Test unsubscribe link extraction."""
-        processor = EmailProcessor()
-        
         # HTML with link
         html_content = '<a href="https://example.com/unsubscribe?id=123">Unsubscribe</a>'
         result = processor._extract_unsubscribe_link(html_content)
@@ -177,6 +430,71 @@ class TestEmailProcessor:
         result = processor._extract_unsubscribe_link(content)
         assert result is None
         
+        # The keyword pre-check is case-insensitive like the pattern
+        content = '<a href="https://example.com/UNSUBSCRIBE?id=1">Opt out</a>'
+        result = processor._extract_unsubscribe_link(content)
+        assert result == "https://example.com/UNSUBSCRIBE?id=1"
+        assert processor._extract_unsubscribe_link("No links here") is None
+        
+    def test_classify_email_definitive_label(self, processor, sample_processed_email):
+        """Test definitive Gmail labels skip content scanning."""
+        sample_processed_email.labels = ["SPAM"]
+        headers = {"list-id": "Deals <deals.shop.com>"}
+        
+        with patch.object(processor, "_scan_content") as mock_scan:
+            processor._classify_email(sample_processed_email, headers)
+            mock_scan.assert_not_called()
+        
+        assert sample_processed_email.is_junk
+        assert sample_processed_email.is_mailing_list
+        assert sample_processed_email.list_name == "deals.shop.com"
+        assert not sample_processed_email.is_critical
+        
+    def test_classify_email_definitive_label_critical_sender(self, sample_processed_email):
+        """Test critical senders stay critical under definitive labels."""
+        processor = EmailProcessor()
+        processor.critical_senders = {"bank"}
+        sample_processed_email.sender = "alerts@bank.com"
+        
+        sample_processed_email.labels = ["SPAM"]
+        processor._classify_email(sample_processed_email, {})
+        assert sample_processed_email.is_critical
+        
+    def test_classify_email_category_tabs(self, sample_processed_email):
+        """Test promotions and social mail still get full classification."""
+        processor = EmailProcessor()
+        processor.critical_senders = {"bank"}
+        
+        critical = copy.deepcopy(sample_processed_email)
+        critical.sender = "offers@bank.com"
+        critical.labels = ["INBOX", "CATEGORY_PROMOTIONS"]
+        processor._classify_email(critical, {})
+        assert critical.is_promotional
+        assert critical.is_critical
+        
+        junk = copy.deepcopy(sample_processed_email)
+        junk.sender = "deals@marketing.shop.com"
+        junk.labels = ["INBOX", "CATEGORY_SOCIAL"]
+        junk.subject = "FREE!!! Limited time offer - act now!!!"
+        junk.body_text = "Win cash prizes! Click here to unsubscribe. Buy now, 50% off!!!"
+        processor._classify_email(junk, {})
+        assert junk.is_social
+        assert junk.is_junk
+        assert not junk.is_critical
+        
+    def test_classify_email_scan_limit(self, processor, sample_processed_email):
+        """Test only a prefix of long bodies is scanned."""
+        from kit_gmail.core.email_processor import settings
+        sample_processed_email.body_text = "x" * 100 + " newsletter"
+        
+        with patch.object(settings, "classification_scan_chars", 50):
+            processor._classify_email(sample_processed_email, {})
+        assert not sample_processed_email.is_mailing_list
+        
+        with patch.object(settings, "classification_scan_chars", 0):
+            processor._classify_email(sample_processed_email, {})
+        assert sample_processed_email.list_name == "newsletter"
+        
     def test_classification_integration(self, sample_gmail_message):
         """Test complete email classification."""
         processor = EmailProcessor()
@@ -1,22 +1,63 @@
 """Unit tests for GmailAuth."""
 
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Optional
+from unittest.mock import ANY, Mock, patch, MagicMock
 from pathlib import Path
 import tempfile
 
-from kit_gmail.core.gmail_auth import GmailAuth
+from kit_gmail.core.gmail_auth import GmailAuth, OrjsonModel
+
+
+@dataclass(eq=False)
+class FakeCreds:
+    """Lightweight stand-in for google.oauth2 Credentials."""
+    
+    valid: bool = True
+    expired: bool = False
+    refresh_token: Optional[str] = "refresh_token"
+    token: str = "test"
+    refresh_count: int = 0
+    revoked: bool = False
+    
+    def to_json(self) -> str:
+        return f'{{"token": "{self.token}"}}'
+    
+    def refresh(self, request) -> None:
+        self.refresh_count += 1
+        self.valid = True
+    
+    def revoke(self, request) -> None:
+        self.revoked = True
+
+
+@pytest.fixture(scope="module")
+def temp_home(tmp_path_factory):
+    """Temporary home directory shared by the tests of this module."""
+    home = tmp_path_factory.mktemp("home")
+    with patch.object(Path, 'home', return_value=home):
+        yield home
 
 
 class TestGmailAuth:
     
     @pytest.fixture
-    def temp_config_dir(self):
-        """Create temporary config directory."""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            config_dir = Path(temp_dir)
-            with patch.object(Path, 'home', return_value=config_dir):
-                yield config_dir / ".kit_gmail"
+    def temp_config_dir(self, temp_home):
+        """Temporary config directory, emptied for each test."""
+        config_dir = temp_home / ".kit_gmail"
+        for name in ("credentials.json", "token.json"):
+            (config_dir / name).unlink(missing_ok=True)
+        return config_dir
+    
+    @pytest.fixture(autouse=True)
+    def google(self, monkeypatch):
+        """Stand-ins for the Google auth and discovery APIs used by GmailAuth."""
+        fakes = SimpleNamespace(Credentials=Mock(), InstalledAppFlow=Mock(), Request=Mock(), build=Mock())
+        for name, fake in vars(fakes).items():
+            monkeypatch.setattr(f"kit_gmail.core.gmail_auth.{name}", fake)
+        return fakes
     
     @pytest.fixture 
     def gmail_auth(self, temp_config_dir):
@@ -48,19 +89,14 @@ class TestGmailAuth:
         with pytest.raises(FileNotFoundError):
             gmail_auth.setup_credentials("non_existent_file.json")
     
-    @patch('kit_gmail.core.gmail_auth.Credentials')
-    @patch('kit_gmail.core.gmail_auth.InstalledAppFlow')
-    @patch('kit_gmail.core.gmail_auth.build')
-    def test_authenticate_new_user(self, mock_build, mock_flow, mock_creds, gmail_auth):
+    def test_authenticate_new_user(self, google, gmail_auth):
         """Test authentication for new user."""
         # Setup mocks
-        mock_credentials = Mock()
-        mock_credentials.valid = True
-        mock_credentials.to_json.return_value = '{"token": "test"}'
+        mock_credentials = FakeCreds()
         
         mock_flow_instance = Mock()
         mock_flow_instance.run_local_server.return_value = mock_credentials
-        mock_flow.from_client_secrets_file.return_value = mock_flow_instance
+        google.InstalledAppFlow.from_client_secrets_file.return_value = mock_flow_instance
         
         # Create dummy credentials file
         gmail_auth.credentials_file.parent.mkdir(exist_ok=True)
@@ -70,16 +106,14 @@ class TestGmailAuth:
         
         assert result == mock_credentials
         assert gmail_auth._creds == mock_credentials
-        mock_flow.from_client_secrets_file.assert_called_once()
+        google.InstalledAppFlow.from_client_secrets_file.assert_called_once()
         mock_flow_instance.run_local_server.assert_called_once_with(port=8080)
     
-    @patch('kit_gmail.core.gmail_auth.Credentials')
-    def test_authenticate_existing_valid_token(self, mock_creds, gmail_auth):
+    def test_authenticate_existing_valid_token(self, google, gmail_auth):
         """Test authentication with existing valid token."""
         # Setup mock credentials
-        mock_credentials = Mock()
-        mock_credentials.valid = True
-        mock_creds.from_authorized_user_file.return_value = mock_credentials
+        mock_credentials = FakeCreds()
+        google.Credentials.from_authorized_user_file.return_value = mock_credentials
         
         # Create dummy token file
         gmail_auth.token_file.parent.mkdir(exist_ok=True)
@@ -89,25 +123,13 @@ class TestGmailAuth:
         
         assert result == mock_credentials
         assert gmail_auth._creds == mock_credentials
-        mock_creds.from_authorized_user_file.assert_called_once()
+        google.Credentials.from_authorized_user_file.assert_called_once()
     
-    @patch('kit_gmail.core.gmail_auth.Credentials')
-    @patch('kit_gmail.core.gmail_auth.Request')
-    def test_authenticate_refresh_expired_token(self, mock_request, mock_creds, gmail_auth):
+    def test_authenticate_refresh_expired_token(self, google, gmail_auth):
         """Test authentication with expired but refreshable token."""
-        # Setup mock credentials
-        mock_credentials = Mock()
-        mock_credentials.valid = False
-        mock_credentials.expired = True
-        mock_credentials.refresh_token = "refresh_token"
-        mock_credentials.to_json.return_value = '{"token": "refreshed"}'
-        mock_creds.from_authorized_user_file.return_value = mock_credentials
-        
-        # Mock refresh success
-        def refresh_side_effect(request):
-            mock_credentials.valid = True
-        
-        mock_credentials.refresh.side_effect = refresh_side_effect
+        # Setup mock credentials; refreshing makes them valid
+        mock_credentials = FakeCreds(valid=False, expired=True, token="refreshed")
+        google.Credentials.from_authorized_user_file.return_value = mock_credentials
         
         # Create dummy token file
         gmail_auth.token_file.parent.mkdir(exist_ok=True)
@@ -116,28 +138,51 @@ class TestGmailAuth:
         result = gmail_auth.authenticate()
         
         assert result == mock_credentials
-        mock_credentials.refresh.assert_called_once()
+        assert mock_credentials.refresh_count == 1
     
-    @patch('kit_gmail.core.gmail_auth.build')
-    def test_get_gmail_service(self, mock_build, gmail_auth):
+    def test_get_gmail_service(self, google, gmail_auth):
         """Test Gmail service creation."""
         # Setup mock credentials
-        mock_credentials = Mock()
+        mock_credentials = FakeCreds()
         gmail_auth._creds = mock_credentials
         
         mock_service = Mock()
-        mock_build.return_value = mock_service
+        google.build.return_value = mock_service
         
         result = gmail_auth.get_gmail_service()
         
         assert result == mock_service
-        mock_build.assert_called_once_with("gmail", "v1", credentials=mock_credentials)
+        google.build.assert_called_once_with(
+            "gmail",
+            "v1",
+            credentials=mock_credentials,
+            cache_discovery=False,
+            static_discovery=True,
+            model=ANY,
+        )
+        assert isinstance(google.build.call_args.kwargs["model"], OrjsonModel)
+        
+        # The service is reused until the credentials change
+        assert gmail_auth.get_gmail_service() is mock_service
+        assert google.build.call_count == 1
+        gmail_auth._creds = FakeCreds()
+        gmail_auth.get_gmail_service()
+        assert google.build.call_count == 2
     
-    @patch('kit_gmail.core.gmail_auth.Request')
-    def test_revoke_credentials(self, mock_request, gmail_auth):
+    def test_orjson_model_deserialize(self):
+        """Test responses are parsed with orjson and non-JSON passes through."""
+        model = OrjsonModel()
+        
+        assert model.deserialize(b'{"id": "msg1", "labelIds": ["INBOX"]}') == {
+            "id": "msg1",
+            "labelIds": ["INBOX"],
+        }
+        assert model.deserialize(b"not json") == "not json"
+    
+    def test_revoke_credentials(self, gmail_auth):
         """Test credential revocation."""
         # Setup mock credentials
-        mock_credentials = Mock()
+        mock_credentials = FakeCreds()
         gmail_auth._creds = mock_credentials
         
         # Create dummy files
@@ -147,7 +192,7 @@ class TestGmailAuth:
         
         gmail_auth.revoke_credentials()
         
-        mock_credentials.revoke.assert_called_once()
+        assert mock_credentials.revoked
         assert not gmail_auth.credentials_file.exists()
         assert not gmail_auth.token_file.exists()
         assert gmail_auth._creds is None
@@ -156,27 +201,25 @@ class TestGmailAuth:
         """Test authentication check with no token."""
         assert not gmail_auth.is_authenticated
     
-    @patch('kit_gmail.core.gmail_auth.Credentials')
-    def test_is_authenticated_valid_token(self, mock_creds, gmail_auth):
+    def test_is_authenticated_valid_token(self, google, gmail_auth):
         """Test authentication check with valid token."""
         # Setup mock credentials
-        mock_credentials = Mock()
-        mock_credentials.valid = True
-        mock_creds.from_authorized_user_file.return_value = mock_credentials
+        google.Credentials.from_authorized_user_file.return_value = FakeCreds()
         
         # Create dummy token file
         gmail_auth.token_file.parent.mkdir(exist_ok=True)
         gmail_auth.token_file.write_text('{"token": "test"}')
         
         assert gmail_auth.is_authenticated
+        
+        # The token file is not re-read while it is unchanged
+        assert gmail_auth.is_authenticated
+        google.Credentials.from_authorized_user_file.assert_called_once()
     
-    @patch('kit_gmail.core.gmail_auth.Credentials')
-    def test_is_authenticated_invalid_token(self, mock_creds, gmail_auth):
+    def test_is_authenticated_invalid_token(self, google, gmail_auth):
         """Test authentication check with invalid token."""
         # Setup mock credentials
-        mock_credentials = Mock()
-        mock_credentials.valid = False
-        mock_creds.from_authorized_user_file.return_value = mock_credentials
+        google.Credentials.from_authorized_user_file.return_value = FakeCreds(valid=False)
         
         # Create dummy token file
         gmail_auth.token_file.parent.mkdir(exist_ok=True)